@@ -0,0 +1,116 @@
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Dict, Iterable
+import numpy as np
+from models import RevenueData, FinancialInsight
+from revenue_store import RevenueStore, BUSINESS_TYPES
+
+# Insight counts are kept per minute, so "last 30 days" is exact to the minute
+INSIGHT_BUCKET = timedelta(minutes=1)
+RECENT_INSIGHT_WINDOW = timedelta(days=30)
+
+
+class RevenueAggregates:
+    """Running totals over revenue history, updated as records come and go"""
+
+    def __init__(self, store: RevenueStore = None):
+        self.reset()
+        if store is not None:
+            self.rebuild(store)
+
+    def reset(self):
+        self.count = 0
+        self.total_revenue = 0.0
+        self.total_expenses = 0.0
+        self.by_business_type: Dict[str, Dict] = {}
+
+    def add(self, record: RevenueData):
+        self.count += 1
+        self.total_revenue += record.revenue
+        self.total_expenses += record.expenses
+        group = self.by_business_type.setdefault(record.business_type.value, {
+            "count": 0, "total_revenue": 0.0, "total_expenses": 0.0, "latest_month": record.month
+        })
+        group["count"] += 1
+        group["total_revenue"] += record.revenue
+        group["total_expenses"] += record.expenses
+        group["latest_month"] = max(group["latest_month"], record.month)
+
+    def replace(self, old: RevenueData, new: RevenueData):
+        """A stored month was corrected; (month, business_type) is unchanged"""
+        self.total_revenue += new.revenue - old.revenue
+        self.total_expenses += new.expenses - old.expenses
+        group = self.by_business_type[old.business_type.value]
+        group["total_revenue"] += new.revenue - old.revenue
+        group["total_expenses"] += new.expenses - old.expenses
+
+    def rebuild(self, store: RevenueStore):
+        """Recompute from the stored columns, e.g. after records were removed"""
+        self.reset()
+        count = len(store)
+        revenue = store.revenue[:count]
+        expenses = store.expenses[:count]
+        codes = store.business_type[:count]
+        self.count = count
+        self.total_revenue = float(revenue.sum())
+        self.total_expenses = float(expenses.sum())
+        for code in np.unique(codes).tolist():
+            rows = codes == code
+            self.by_business_type[BUSINESS_TYPES[code].value] = {
+                "count": int(np.count_nonzero(rows)),
+                "total_revenue": float(revenue[rows].sum()),
+                "total_expenses": float(expenses[rows].sum()),
+                "latest_month": max(store.distinct_month_labels(rows))
+            }
+
+
+class InsightCounter:
+    """Insights generated per time bucket and insight type, for O(1) "recent insights" counts"""
+
+    def __init__(self, insights: Iterable[FinancialInsight] = (), window=RECENT_INSIGHT_WINDOW, bucket=INSIGHT_BUCKET):
+        self.window = window
+        self.bucket = bucket
+        self._lock = threading.Lock()  # read from request threads while ingest adds
+        self.rebuild(insights)
+
+    def rebuild(self, insights: Iterable[FinancialInsight]):
+        with self._lock:
+            self._buckets: Dict[str, deque] = {}  # insight_type -> [bucket start, count], oldest first
+            self._recent: Dict[str, int] = {}
+        for insight in sorted(insights, key=lambda i: i.timestamp):
+            self.add(insight.timestamp, insight_type=insight.insight_type)
+
+    def _bucket_start(self, timestamp: datetime) -> datetime:
+        return timestamp - (timestamp - datetime.min) % self.bucket
+
+    def add(self, timestamp: datetime, count=1, insight_type=None):
+        start = self._bucket_start(timestamp)
+        with self._lock:
+            buckets = self._buckets.setdefault(insight_type, deque())
+            if buckets and start <= buckets[-1][0]:
+                # Same (or an earlier, late-arriving) bucket: count it with the newest
+                buckets[-1][1] += count
+            else:
+                buckets.append([start, count])
+            self._recent[insight_type] = self._recent.get(insight_type, 0) + count
+
+    def add_all(self, insights: Iterable[FinancialInsight]):
+        for insight in insights:
+            self.add(insight.timestamp, insight_type=insight.insight_type)
+
+    def remove_types(self, insight_types: Iterable[str]):
+        """Stop counting insights of these types"""
+        with self._lock:
+            for insight_type in insight_types:
+                self._buckets.pop(insight_type, None)
+                self._recent.pop(insight_type, None)
+
+    def recent(self, now: datetime = None) -> int:
+        """Insights newer than the window; expired buckets are dropped as they age out"""
+        cutoff = (now or datetime.now()) - self.window
+        with self._lock:
+            for insight_type, buckets in self._buckets.items():
+                while buckets and buckets[0][0] + self.bucket <= cutoff:
+                    self._recent[insight_type] -= buckets.popleft()[1]
+            return sum(self._recent.values())
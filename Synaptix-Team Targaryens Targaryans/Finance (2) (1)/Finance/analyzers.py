@@ -0,0 +1,249 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional
+import numpy as np
+from models import FinancialInsight
+
+# Inputs an analyzer can declare
+RECORD = "record"  # the record being analysed
+WINDOW = "window"  # revenue history up to and including that record
+BENCHMARKS = "benchmarks"  # competitor benchmarks in force
+TAX_RULES = "tax_rules"  # tax rules in force
+
+# Threads shared by every agent's analyses
+ANALYSIS_WORKERS = 4
+
+ANOMALY_WINDOW = 12  # months before the record's month that it is compared with
+ANOMALY_THRESHOLD = 3.0  # standard deviations
+OUTLOOK_MONTHS = 3  # months projected by the revenue outlook
+OUTLOOK_CHANGE = 10.0  # percent change from the latest month worth reporting
+
+# Comma-separated analyzers a deployment runs instead of DEFAULT_ANALYZERS
+ANALYZERS_VARIABLE = "FINANCE_ANALYZERS"
+
+
+class Analyzer:
+    """One analysis step: the inputs it reads and a function producing an insight (or None).
+
+    Analyzers only read agent state, so any of them can run at the same time.
+    One that declares WINDOW is skipped until `min_history` records exist.
+    `heavy` ones (milliseconds of NumPy or I/O, which release the GIL) are
+    worth a worker thread; the others cost less than the hand-off.
+    """
+
+    def __init__(self, name: str, func: Callable, inputs: Iterable[str], min_history=1, heavy=False):
+        self.name = name
+        self.func = func
+        self.inputs = frozenset(inputs)
+        self.min_history = min_history
+        self.heavy = heavy
+
+
+# Every known analyzer by name, in the order their insights are reported
+ANALYZERS: Dict[str, Analyzer] = {}
+
+
+def register_analyzer(name: str, inputs: Iterable[str], min_history=1, heavy=False):
+    """Decorator adding `func(context)` to the registry"""
+    def register(func):
+        ANALYZERS[name] = Analyzer(name, func, inputs, min_history, heavy)
+        return func
+    return register
+
+
+class AnalysisContext:
+    """What analyzers see of one record: the agent, the record's position, and the inputs they declared"""
+
+    def __init__(self, agent, index: int, inputs: Iterable[str]):
+        self.agent = agent
+        self.index = index
+        self.history = index + 1  # records up to and including this one
+        # Materialised once here, not by each analyzer on its own thread
+        self.record = agent.revenue_memory[index] if RECORD in inputs else None
+
+
+@register_analyzer("tax_impact", inputs=(RECORD, TAX_RULES))
+def _tax_impact(context: AnalysisContext) -> Optional[FinancialInsight]:
+    return context.agent._analyze_tax_impact(context.record)
+
+
+@register_analyzer("revenue_trend", inputs=(WINDOW,), min_history=2)
+def _revenue_trend(context: AnalysisContext) -> Optional[FinancialInsight]:
+    return context.agent._analyze_trends(context.history)
+
+
+@register_analyzer("competitor_comparison", inputs=(RECORD, BENCHMARKS))
+def _competitor_comparison(context: AnalysisContext) -> Optional[FinancialInsight]:
+    return context.agent._compare_with_competitors(context.record)
+
+
+@register_analyzer("revenue_anomaly", inputs=(RECORD, WINDOW), min_history=ANOMALY_WINDOW + 1, heavy=True)
+def _revenue_anomaly(context: AnalysisContext) -> Optional[FinancialInsight]:
+    """Flags a month whose revenue is far outside the months before it, for the record's business type"""
+    totals = context.agent._monthly_revenue(context.history, ANOMALY_WINDOW + 1)
+    if len(totals) <= ANOMALY_WINDOW:
+        return None
+    current, previous = totals[-1], np.array(totals[:-1])
+    std = float(np.std(previous))
+    if not std:
+        return None
+    score = (current - float(np.mean(previous))) / std
+    if abs(score) < ANOMALY_THRESHOLD:
+        return None
+    direction = "above" if score > 0 else "below"
+    return FinancialInsight(
+        insight_type="anomaly_detection",
+        title=f"Unusual Revenue: {score:+.1f} std dev",
+        description=f"{context.record.business_type.value.title()} revenue of ₹{current:,.2f} in {context.record.month} is far {direction} the previous {ANOMALY_WINDOW} months",
+        impact="An outlier month can distort trends and tax estimates",
+        recommendation="Check the figures for this month before acting on them",
+        confidence=0.7
+    )
+
+
+@register_analyzer("revenue_outlook", inputs=(WINDOW, TAX_RULES), min_history=2, heavy=True)
+def _revenue_outlook(context: AnalysisContext) -> Optional[FinancialInsight]:
+    """Flags a forecast that moves revenue well away from the latest month"""
+    agent = context.agent
+    forecast = agent.forecasts.forecast(OUTLOOK_MONTHS, agent._tax_index)
+    latest = agent.months.last(1)
+    if not forecast["months"] or not latest:
+        return None
+    actual = float(agent.revenue_memory.revenue[latest[0][1]].sum())
+    if actual <= 0:
+        return None
+    projected = float(np.mean(forecast["revenue"]))
+    change = (projected - actual) / actual * 100
+    if abs(change) < OUTLOOK_CHANGE:
+        return None
+    direction = "rise" if change > 0 else "fall"
+    return FinancialInsight(
+        insight_type="forecast",
+        title=f"Revenue Outlook: {change:+.1f}%",
+        description=f"Revenue is projected to {direction} to ₹{projected:,.2f} a month over {forecast['months'][0]}..{forecast['months'][-1]}",
+        impact=f"Projected tax liability over those months: ₹{sum(forecast['tax_liability']):,.2f}",
+        recommendation="Plan cash and tax reserves for the projected change" if change < 0 else "Plan capacity for the projected growth",
+        confidence=0.6
+    )
+
+
+# Analyzers run unless a deployment chooses otherwise; the heavy ones are opt-in
+DEFAULT_ANALYZERS = ("tax_impact", "revenue_trend", "competitor_comparison")
+
+
+def configured_analyzers() -> List[str]:
+    """Analyzers named in FINANCE_ANALYZERS, or DEFAULT_ANALYZERS if it is unset"""
+    names = os.environ.get(ANALYZERS_VARIABLE)
+    if names is None:
+        return list(DEFAULT_ANALYZERS)
+    return [name.strip() for name in names.split(",") if name.strip()]
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=ANALYSIS_WORKERS, thread_name_prefix="analysis")
+        return _pool
+
+
+def shutdown_pool():
+    """Stop the analysis worker threads"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+            _pool = None
+
+
+class AnalysisPipeline:
+    """The enabled analyzers of a deployment, run for one record at a time.
+
+    Analyzers are independent: heavy ones run concurrently on a shared
+    thread pool while the light ones run on the caller's thread
+    (`concurrent=False` runs everything there). Insights come back in registry order
+    whatever order the analyzers finish in. A failing analyzer is counted
+    and skipped rather than failing the others. Latency, insight and error
+    counts are kept per analyzer.
+    """
+
+    def __init__(self, analyzers: Iterable[str] = DEFAULT_ANALYZERS, concurrent=True):
+        self.concurrent = concurrent
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict] = {}
+        self._enabled: List[str] = []
+        for name in analyzers:
+            self.enable(name)
+
+    def enable(self, name: str):
+        if name not in ANALYZERS:
+            raise ValueError(f"Unknown analyzer: {name}")
+        with self._lock:
+            if name not in self._enabled:
+                self._enabled = [n for n in ANALYZERS if n in self._enabled or n == name]
+            self._stats.setdefault(name, {"runs": 0, "insights": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0,
+                                          "last_error": None})
+
+    def disable(self, name: str):
+        with self._lock:
+            self._enabled = [n for n in self._enabled if n != name]
+
+    @property
+    def enabled(self) -> List[str]:
+        return list(self._enabled)
+
+    def _timed_run(self, analyzer: Analyzer, context: AnalysisContext):
+        start = time.perf_counter()
+        error = None
+        try:
+            insight = analyzer.func(context)
+        except Exception as e:
+            insight, error = None, e
+        elapsed = (time.perf_counter() - start) * 1000
+        with self._lock:
+            stats = self._stats[analyzer.name]
+            stats["runs"] += 1
+            stats["total_ms"] += elapsed
+            stats["max_ms"] = max(stats["max_ms"], elapsed)
+            if error is not None:
+                stats["errors"] += 1
+                stats["last_error"] = f"{type(error).__name__}: {error}"
+            elif insight:
+                stats["insights"] += 1
+        return insight
+
+    def run(self, agent, index: int) -> List[FinancialInsight]:
+        """Insights for the record at `index` of the agent's revenue history"""
+        analyzers = [ANALYZERS[name] for name in self._enabled if index + 1 >= ANALYZERS[name].min_history]
+        if not analyzers:
+            return []
+        context = AnalysisContext(agent, index, set().union(*(a.inputs for a in analyzers)))
+        futures = {}
+        if self.concurrent and len(analyzers) > 1:
+            futures = {
+                analyzer.name: _get_pool().submit(self._timed_run, analyzer, context)
+                for analyzer in analyzers if analyzer.heavy
+            }
+        inline = {
+            analyzer.name: self._timed_run(analyzer, context) for analyzer in analyzers if analyzer.name not in futures
+        }
+        results = [futures[a.name].result() if a.name in futures else inline[a.name] for a in analyzers]
+        return [insight for insight in results if insight]
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            return {
+                name: {
+                    **stats,
+                    "enabled": name in self._enabled,
+                    "total_ms": round(stats["total_ms"], 3),
+                    "max_ms": round(stats["max_ms"], 3),
+                    "avg_ms": round(stats["total_ms"] / stats["runs"], 3) if stats["runs"] else 0.0
+                }
+                for name, stats in self._stats.items()
+            }
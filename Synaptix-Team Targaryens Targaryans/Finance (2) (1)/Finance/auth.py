@@ -2,8 +2,12 @@ from pydantic import BaseModel
 from datetime import datetime
 from typing import Optional
 import hashlib
+import os
 import secrets
 
+# Comma-separated emails of users who may change the tax rules shared by every tenant
+ADMIN_EMAILS_VARIABLE = "FINANCE_ADMIN_EMAILS"
+
 class UserRegistration(BaseModel):
     name: str
     mobile: str
@@ -28,9 +32,12 @@ class User(BaseModel):
     created_at: datetime = datetime.now()
 
 class UserAuth:
-    def __init__(self):
+    def __init__(self, admin_emails=None):
         self.users_db = {}  # In-memory for demo
         self.sessions = {}
+        if admin_emails is None:
+            admin_emails = os.environ.get(ADMIN_EMAILS_VARIABLE, "").split(",")
+        self.admin_emails = {email.strip().lower() for email in admin_emails if email.strip()}
     
     def hash_password(self, password: str) -> str:
         return hashlib.sha256(password.encode()).hexdigest()
@@ -101,6 +108,9 @@ class UserAuth:
         
         return {"status": "error", "message": "Invalid email or password"}
     
+    def is_admin(self, user: User) -> bool:
+        return user.email.lower() in self.admin_emails
+    
     def get_user_by_session(self, session_token: str) -> Optional[User]:
         user_id = self.sessions.get(session_token)
         if user_id:
@@ -0,0 +1,1054 @@
+#!/usr/bin/env python3
+"""
+Performance benchmarks for the Live Financial Memory Agent
+Run with: python benchmark.py [name ...]
+"""
+
+import csv
+import io
+import random
+import sys
+import time
+from models import RevenueData, BusinessType, TaxType
+from dataset_parser import iter_validated_batches
+from validation import records_from_frame
+
+
+def _timed(func, *args, repeat=3, **kwargs):
+    """Best-of-`repeat` wall time"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def _synthetic_rows(count, seed=42):
+    """Raw upload rows (strings, as csv.DictReader yields them)"""
+    rng = random.Random(seed)
+    business_types = [b.value for b in BusinessType]
+    rows = []
+    for i in range(count):
+        revenue = rng.uniform(10000, 150000)
+        rows.append({
+            "month": f"{2000 + (i // 12) % 100:04d}-{i % 12 + 1:02d}",
+            "revenue": f"{revenue:.2f}",
+            "expenses": f"{revenue * rng.uniform(0.5, 1.1):.2f}",
+            "business_type": rng.choice(business_types),
+            "tax_type": rng.choice([TaxType.SERVICE_TAX.value, TaxType.PRODUCT_TAX.value]),
+            "service_revenue": f"{revenue * 0.3:.2f}",
+            "product_revenue": f"{revenue * 0.7:.2f}",
+        })
+    return rows
+
+
+def _synthetic_csv(count, seed=42):
+    rows = _synthetic_rows(count, seed)
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(rows[0]))
+    writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+def bench_validation(count=100_000):
+    """CSV bytes to validated RevenueData: per-row models vs columnar validation, over the same work"""
+    payload = _synthetic_csv(count)
+
+    def per_row():
+        return [
+            RevenueData(
+                month=r['month'],
+                revenue=float(r['revenue']),
+                expenses=float(r['expenses']),
+                business_type=BusinessType(r['business_type']),
+                tax_type=TaxType(r['tax_type']),
+                service_revenue=float(r.get('service_revenue', 0)),
+                product_revenue=float(r.get('product_revenue', 0))
+            )
+            for r in csv.DictReader(io.StringIO(payload.decode("utf-8")))
+        ]
+
+    def columnar(materialise):
+        records = []
+        errors = 0
+        for frame, batch_errors in iter_validated_batches(io.BytesIO(payload), "bench.csv", batch_size=count):
+            errors += len(batch_errors)
+            if materialise:
+                records.extend(records_from_frame(frame))
+            else:
+                records.extend(range(len(frame)))
+        return len(records), errors
+
+    rows, row_time = _timed(per_row)
+    (valid, errors), validate_time = _timed(columnar, False)
+    (records, _), ingest_time = _timed(columnar, True)
+    assert records == len(rows)
+    print(f"validation  rows={count:,}  (both paths parse the same CSV bytes)")
+    print(f"  per-row models                     : {row_time:8.3f}s")
+    print(f"  columnar validation only           : {validate_time:8.3f}s  ({row_time / validate_time:.1f}x, "
+          f"{valid:,} valid, {errors} errors)")
+    print(f"  columnar + records_from_frame      : {ingest_time:8.3f}s  ({row_time / ingest_time:.1f}x, "
+          f"what ingest_stream does)")
+
+
+def _statement_pdf(path, pages=500, months=24):
+    """A long bank-style statement: a monthly summary followed by transaction pages"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    pdf = canvas.Canvas(path, pagesize=A4)
+    pages_per_month = max(1, pages // months)
+    for page in range(pages):
+        month = page // pages_per_month
+        y = 800
+        if page % pages_per_month == 0 and month < months:
+            pdf.drawString(50, y, f"Monthly statement {2022 + month // 12}-{month % 12 + 1:02d}")
+            pdf.drawString(50, y - 20, f"Revenue: {50000 + month * 1000:,}.00")
+            pdf.drawString(50, y - 40, f"Expenses: {30000 + month * 500:,}.00")
+            y -= 60
+        for line in range(40):
+            pdf.drawString(50, y - line * 18, f"Txn {page}-{line}  Invoice payment ref ABC{page:04d}{line:02d}  amount 1,234.56")
+        pdf.showPage()
+    pdf.save()
+
+
+def bench_documents(pages=500):
+    """Parallel page-streaming extraction vs sequential full-text extraction"""
+    import os
+    import re
+    import tempfile
+    import PyPDF2
+    from document_extractor import extract_document, shutdown_pool
+
+    path = os.path.join(tempfile.mkdtemp(), "statement.pdf")
+    _statement_pdf(path, pages)
+
+    def sequential():
+        # The original process_document approach
+        text = ""
+        for page in PyPDF2.PdfReader(path).pages:
+            text += page.extract_text()
+        return re.search(r'revenue[:\s]*\$?([0-9,]+(?:\.[0-9]{2})?)', text.lower())
+
+    try:
+        _, sequential_time = _timed(sequential, repeat=1)
+        (months, scanned), full_time = _timed(extract_document, path, "statement.pdf", repeat=1)
+        (_, early_scanned), early_time = _timed(
+            extract_document, path, "statement.pdf", required_months=["2022-01", "2022-02"], repeat=1
+        )
+    finally:
+        shutdown_pool()
+        os.remove(path)
+    print(f"documents  pages={pages}")
+    print(f"  sequential full text   : {sequential_time:8.3f}s")
+    print(f"  parallel, all months   : {full_time:8.3f}s  ({sequential_time / full_time:.1f}x, {len(months)} months, {scanned} pages)")
+    print(f"  parallel, early stop   : {early_time:8.3f}s  ({sequential_time / early_time:.1f}x, {early_scanned} pages)")
+
+
+def bench_database(count=2000):
+    """Pooled WAL connections vs a new connection (and journal commit) per call"""
+    import os
+    import sqlite3
+    import tempfile
+    from database import FinancialDB
+
+    records = [
+        RevenueData(month=r["month"], revenue=float(r["revenue"]), expenses=float(r["expenses"]),
+                    business_type=BusinessType(r["business_type"]), tax_type=TaxType(r["tax_type"]))
+        for r in _synthetic_rows(count)
+    ]
+    directory = tempfile.mkdtemp()
+
+    def connect_per_call(path):
+        # What every FinancialDB method used to do
+        for r in records:
+            conn = sqlite3.connect(path)
+            conn.execute(
+                "INSERT INTO revenue_data (month, revenue, expenses, business_type, tax_type) VALUES (?, ?, ?, ?, ?)",
+                (r.month, r.revenue, r.expenses, r.business_type.value, r.tax_type.value)
+            )
+            conn.commit()
+            conn.close()
+
+    def read_per_call(path):
+        for _ in range(200):
+            conn = sqlite3.connect(path)
+            conn.execute("SELECT * FROM revenue_data ORDER BY month LIMIT 50").fetchall()
+            conn.close()
+
+    def pooled_inserts(db):
+        for r in records:
+            db.save_revenue_data(r)
+
+    def pooled_reads(db):
+        for _ in range(200):
+            with db._transaction() as cursor:
+                cursor.execute("SELECT * FROM revenue_data ORDER BY month LIMIT 50").fetchall()
+
+    legacy_path = os.path.join(directory, "legacy.db")
+    FinancialDB(legacy_path).close()
+    conn = sqlite3.connect(legacy_path)
+    conn.execute("PRAGMA journal_mode=DELETE")
+    conn.close()
+    _, legacy_insert = _timed(connect_per_call, legacy_path, repeat=1)
+    _, legacy_read = _timed(read_per_call, legacy_path, repeat=1)
+
+    db = FinancialDB(os.path.join(directory, "pooled.db"))
+    _, pooled_insert = _timed(pooled_inserts, db, repeat=1)
+    _, pooled_read = _timed(pooled_reads, db, repeat=1)
+    db.close()
+
+    print(f"database  single-row inserts={count:,}, reads=200")
+    print(f"  connect per call : {count / legacy_insert:10,.0f} inserts/s  {200 / legacy_read:10,.0f} reads/s")
+    print(f"  pooled + WAL     : {count / pooled_insert:10,.0f} inserts/s  {200 / pooled_read:10,.0f} reads/s")
+
+
+def bench_insight_writes(count=2000):
+    """Per-request latency of persisting insights: commit per insight vs write-behind"""
+    import os
+    import tempfile
+    from database import FinancialDB
+    from insight_writer import InsightWriter
+    from models import FinancialInsight
+
+    # What one POST /api/revenue produces: three insights
+    requests = [
+        [FinancialInsight(insight_type=kind, title=f"{kind} {i}", description="bench", impact="neutral",
+                          recommendation="none", confidence=0.8)
+         for kind in ("tax_analysis", "trend_analysis", "competitive_analysis")]
+        for i in range(count)
+    ]
+    db = FinancialDB(os.path.join(tempfile.mkdtemp(), "insights.db"))
+
+    def commit_per_insight():
+        latencies = []
+        for insights in requests:
+            start = time.perf_counter()
+            for insight in insights:
+                db.save_tenant_insights([(db.tenant_id, insight)])
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    def write_behind(writer):
+        latencies = []
+        for insights in requests:
+            start = time.perf_counter()
+            writer.submit(insights)
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    direct, direct_time = _timed(commit_per_insight, repeat=1)
+    writer = InsightWriter(db)
+    queued, queued_time = _timed(write_behind, writer, repeat=1)
+    writer.close()
+    metrics = writer.metrics()
+    db.close()
+    print(f"insight writes  requests={count:,} x 3 insights")
+    print(f"  commit per insight : p50 {_percentile(direct, 0.5) * 1e6:8.1f}us  p99 {_percentile(direct, 0.99) * 1e6:8.1f}us"
+          f"  total {direct_time:.3f}s")
+    print(f"  write-behind       : p50 {_percentile(queued, 0.5) * 1e6:8.1f}us  p99 {_percentile(queued, 0.99) * 1e6:8.1f}us"
+          f"  total {queued_time:.3f}s  ({metrics['flushes']} flushes, max queue {metrics['max_queue_depth']})")
+
+
+def bench_insight_store(count=200_000, retention=500, queries=1000):
+    """Latest-N, per-type and clear-by-type queries: unbounded list vs indexed, bounded store"""
+    from models import FinancialInsight
+    from insight_store import InsightStore
+
+    kinds = ("tax_analysis", "trend_analysis", "competitive_analysis")
+    insights = [
+        FinancialInsight(insight_type=kinds[i % 3], title=f"insight {i}", description="bench", impact="neutral",
+                         recommendation="none", confidence=0.8)
+        for i in range(count)
+    ]
+    history = list(insights)
+    store = InsightStore(insights, retention=retention)
+
+    def list_queries():
+        for _ in range(queries):
+            history[-10:][::-1]
+            [i for i in reversed(history) if i.insight_type == "tax_analysis"][:10]
+
+    def store_queries():
+        for _ in range(queries):
+            store.latest(10)
+            store.latest(10, "tax_analysis")
+
+    _, list_time = _timed(list_queries, repeat=1)
+    _, store_time = _timed(store_queries, repeat=1)
+    held = len(store)
+    _, list_clear = _timed(lambda: [i for i in history if i.insight_type not in ("tax_analysis",)], repeat=1)
+    _, store_clear = _timed(store.remove_types, ["tax_analysis"], repeat=1)
+
+    print(f"insight store  {count:,} insights generated, retention {retention:,}")
+    print(f"  list  : latest + per-type {list_time / queries * 1e6:9.1f}us  clear type {list_clear * 1000:8.3f}ms"
+          f"  ({len(history):,} held)")
+    print(f"  store : latest + per-type {store_time / queries * 1e6:9.1f}us  clear type {store_clear * 1000:8.3f}ms"
+          f"  ({held:,} held)")
+
+
+def bench_scenarios(months=120, loop_sample=200):
+    """10k what-if scenarios over the history in one pass vs evaluating them one at a time"""
+    import numpy as np
+    from models import ScenarioGrid
+    from revenue_store import RevenueStore
+    from scenarios import evaluate_scenarios
+    from tax_index import TaxRuleIndex, taxable_base
+
+    rows = _synthetic_rows(months)
+    store = RevenueStore([
+        RevenueData(month=r["month"], revenue=float(r["revenue"]), expenses=float(r["expenses"]),
+                    business_type=BusinessType(r["business_type"]), tax_type=TaxType(r["tax_type"]),
+                    service_revenue=float(r["service_revenue"]), product_revenue=float(r["product_revenue"]))
+        for r in rows
+    ])
+    active = TaxRuleIndex(_synthetic_tax_rules(brackets=50))
+    alternative = TaxRuleIndex(_synthetic_tax_rules(brackets=20, seed=7))
+    grid = ScenarioGrid(
+        revenue_growth=np.linspace(-0.2, 0.3, 25).tolist(),
+        expense_change=np.linspace(-0.3, 0.1, 20).tolist(),
+        service_share=[None, 0.0, 0.1, 0.25, 0.4, 0.5, 0.6, 0.75, 0.9, 1.0]
+    )
+    rule_sets = [("active", active), ("alternative", alternative)]
+    result, elapsed = _timed(evaluate_scenarios, store, grid, rule_sets, [])
+    count = result["scenarios_evaluated"]
+    print(f"scenarios  {count:,} scenarios x {months} months: {elapsed * 1000:.1f}ms in one pass")
+
+    def one(growth, change, share, index):
+        revenue = store.revenue * (1 + growth)
+        expenses = store.expenses * (1 + change)
+        if share is None:
+            taxable = taxable_base(store.tax_type, revenue, store.service_revenue * (1 + growth),
+                                   store.product_revenue * (1 + growth))
+        else:
+            taxable = taxable_base(store.tax_type, revenue, share * revenue, (1 - share) * revenue)
+        rates = np.nan_to_num(index.rates_at(index.find_positions(store.business_type, store.tax_type, revenue - expenses)))
+        return float(((taxable - expenses) * rates).sum())
+
+    combos = [(g, e, s, index) for _, index in rule_sets for g in grid.revenue_growth for e in grid.expense_change
+              for s in grid.service_share][:loop_sample]
+    _, loop_time = _timed(lambda: [one(*combo) for combo in combos], repeat=1)
+    print(f"  one scenario at a time: {loop_time / len(combos) * count * 1000:.0f}ms for {count:,} (extrapolated)")
+
+
+def bench_month_index(count=50000, queries=200):
+    """Month range and chart queries from the month index vs scanning every record"""
+    import numpy as np
+    from month_index import MonthIndex, parse_month_range
+    from revenue_store import RevenueStore
+
+    rng = random.Random(7)
+    rows = _synthetic_rows(count)
+    rng.shuffle(rows)  # months arrive out of order
+    records = [
+        RevenueData(month=r["month"], revenue=float(r["revenue"]), expenses=float(r["expenses"]),
+                    business_type=BusinessType(r["business_type"]), tax_type=TaxType(r["tax_type"]))
+        for r in rows
+    ]
+    store = RevenueStore()
+    index = MonthIndex()
+    _, elapsed = _timed(lambda: [(store.append(r), index.add(r, i)) for i, r in enumerate(records)], repeat=1)
+    print(f"month_index  {count:,} out-of-order records: {elapsed / count * 1e6:.2f}us per append and index")
+    _, elapsed = _timed(MonthIndex, store)
+    print(f"  rebuild from columns: {elapsed * 1000:.1f}ms")
+
+    ranges = [f"{y}-01..{y}-06" for y in range(2000, 2100)]
+    bounds = [parse_month_range(text) for text in ranges]
+
+    def scan():
+        months = store.month
+        return [np.flatnonzero((months >= start) & (months <= stop)) for start, stop in bounds]
+
+    def indexed():
+        return [index.range(start, stop) for start, stop in bounds]
+
+    expected, scan_time = _timed(scan)
+    got, index_time = _timed(indexed)
+    assert all(sorted(p for _, positions in g for p in positions) == e.tolist() for g, e in zip(got, expected))
+    print(f"  six-month range: scan {scan_time / len(bounds) * 1e6:7.1f}us  index {index_time / len(bounds) * 1e6:7.1f}us")
+
+    _, last_time = _timed(lambda: [index.last(12) for _ in range(queries)])
+    _, slice_time = _timed(lambda: [store[-12:] for _ in range(queries)])
+    print(f"  last 12 months: index {last_time / queries * 1e6:.1f}us"
+          f" (the old insertion-order slice took {slice_time / queries * 1e6:.1f}us and was wrong for out-of-order data)")
+
+
+def bench_analyzers(count=2000, heavy_runs=50):
+    """Per-analyzer latency, and heavy analyzers run concurrently vs one after another"""
+    import os
+    import tempfile
+    import numpy as np
+    from analyzers import AnalysisPipeline, ANALYZERS, DEFAULT_ANALYZERS, WINDOW, register_analyzer, shutdown_pool
+    from financial_agent import LiveFinancialAgent
+
+    os.chdir(tempfile.mkdtemp())
+    agent = LiveFinancialAgent()
+    agent.ingest_batch([
+        RevenueData(month=r["month"], revenue=float(r["revenue"]), expenses=float(r["expenses"]),
+                    business_type=BusinessType(r["business_type"]), tax_type=TaxType(r["tax_type"]))
+        for r in _synthetic_rows(count)
+    ], source_file="bench")
+    records = len(agent.revenue_memory)
+
+    agent.pipeline = AnalysisPipeline(list(DEFAULT_ANALYZERS) + ["revenue_anomaly", "revenue_outlook"])
+    for index in range(records):
+        agent._analyze_record(index)
+    print(f"analyzers  {records:,} records analysed")
+    for name, stats in agent.pipeline.metrics().items():
+        print(f"  {name:22}: avg {stats['avg_ms'] * 1000:7.1f}us  max {stats['max_ms'] * 1000:8.1f}us"
+              f"  {stats['insights']:,} insights")
+
+    # Stand-ins for heavier analyzers: NumPy work that releases the GIL
+    samples = np.random.default_rng(42).random(1_000_000)
+
+    def heavy_analyzer(context):
+        np.sort(samples)
+        return None
+
+    heavy = ["bench_heavy_a", "bench_heavy_b", "bench_heavy_c"]
+    for name in heavy:
+        register_analyzer(name, inputs=(WINDOW,), heavy=True)(heavy_analyzer)
+    for concurrent in (False, True):
+        agent.pipeline = AnalysisPipeline(list(DEFAULT_ANALYZERS) + heavy, concurrent=concurrent)
+        _, elapsed = _timed(lambda: [agent._analyze_record(records - 1) for _ in range(heavy_runs)], repeat=1)
+        label = "concurrent" if concurrent else "sequential"
+        errors = sum(agent.pipeline.metrics()[name]["errors"] for name in heavy)
+        print(f"  3 heavy + defaults, {label:10}: {elapsed / heavy_runs * 1000:7.2f}ms per record ({errors} errors)")
+    for name in heavy:
+        del ANALYZERS[name]
+    shutdown_pool()
+    agent.insight_writer.close()
+    agent.db.close()
+
+
+def bench_lazy_insights(count=5000):
+    """A bulk upload's analysis: every row as it lands vs once, lazily, for the newest row"""
+    import os
+    import tempfile
+    from financial_agent import LiveFinancialAgent
+
+    records = [
+        RevenueData(month=r["month"], revenue=float(r["revenue"]), expenses=float(r["expenses"]),
+                    business_type=BusinessType(r["business_type"]), tax_type=TaxType(r["tax_type"]))
+        for r in _synthetic_rows(count)
+    ]
+    os.chdir(tempfile.mkdtemp())
+    agent = LiveFinancialAgent()
+
+    def eager():
+        # What ingest_batch did before: analyse every inserted row
+        agent.ingest_batch(records, source_file="eager.csv")
+        insights = []
+        for index in range(len(agent.revenue_memory)):
+            insights.extend(agent._analyze_record(index))
+        agent._record_insights(insights)
+        return insights
+
+    def lazy():
+        agent.ingest_batch(records, source_file="lazy.csv")
+        return agent.analyze_pending()
+
+    results = {}
+    for label, load in (("per row", eager), ("lazy", lazy)):
+        agent.clear_all_data()
+        agent.tax_memo.clear()
+        insights, elapsed = _timed(load, repeat=1)
+        results[label] = (elapsed, len(insights))
+    agent.insight_writer.close()
+    agent.db.close()
+
+    print(f"lazy insights  bulk upload of {count:,} rows")
+    for label, (elapsed, generated) in results.items():
+        print(f"  {label:8}: {elapsed:7.3f}s  {generated:,} insights generated")
+
+
+def bench_revenue_posts(count=3000, concurrency=64):
+    """Concurrent single-record submissions: one commit each vs group commit"""
+    import asyncio
+    import os
+    import tempfile
+    from blocking import BlockingExecutor
+    from database import DEFAULT_TENANT
+    from revenue_batcher import RevenueBatcher
+    from tenants import TenantRegistry
+
+    records = [
+        RevenueData(month=r["month"], revenue=float(r["revenue"]), expenses=float(r["expenses"]),
+                    business_type=BusinessType(r["business_type"]), tax_type=TaxType(r["tax_type"]))
+        for r in _synthetic_rows(count)
+    ]
+    os.chdir(tempfile.mkdtemp())
+
+    async def drive(submit):
+        gate = asyncio.Semaphore(concurrency)
+        latencies = []
+
+        async def one(record):
+            async with gate:
+                start = time.perf_counter()
+                await submit(record)
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(r) for r in records))
+        return latencies, time.perf_counter() - start
+
+    results = {}
+    for label in ("commit per request", "group commit"):
+        tenants = TenantRegistry()
+        agent = tenants.get(DEFAULT_TENANT)
+        agent.clear_all_data()
+        blocking = BlockingExecutor()
+        if label == "group commit":
+            batcher = RevenueBatcher(tenants, blocking)
+
+            async def submit(record):
+                return await batcher.submit(record, DEFAULT_TENANT)
+        else:
+            async def submit(record):
+                return await blocking.run(agent.ingest_revenue_data, record)
+        results[label] = asyncio.run(drive(submit))
+        blocking.shutdown()
+
+        # The agent-side cost alone, without the event loop in the way
+        agent.clear_all_data()
+        if label == "group commit":
+            _, agent_time = _timed(lambda: [agent.ingest_revenue_group(records[i:i + 256])
+                                            for i in range(0, count, 256)], repeat=1)
+        else:
+            _, agent_time = _timed(lambda: [agent.ingest_revenue_data(r) for r in records], repeat=1)
+        results[label] += (agent_time,)
+        tenants.close()
+
+    print(f"revenue posts  requests={count:,}, concurrency={concurrency}")
+    for label, (latencies, elapsed, agent_time) in results.items():
+        print(f"  {label:18}: {count / elapsed:8,.0f} req/s  p50 {_percentile(latencies, 0.5) * 1000:6.1f}ms"
+              f"  p99 {_percentile(latencies, 0.99) * 1000:6.1f}ms  (agent alone {count / agent_time:8,.0f} rec/s)")
+
+
+def _legacy_analyses(agent, records):
+    """The list-of-models profit/loss/tax analysis, as the agent computed it before the columnar store"""
+    profits = [(r.revenue - r.expenses) for r in records]
+    profit = {"average_profit": sum(profits) / len(profits), "current_profit": profits[-1]}
+
+    losses = [max(0, r.expenses - r.revenue) for r in records]
+    loss = {"total_losses": sum(losses), "loss_months_count": len([l for l in losses if l > 0]), "biggest_loss": max(losses)}
+
+    tax_data = []
+    for revenue in records:
+        net_income = revenue.revenue - revenue.expenses
+        tax_rule = None
+        for rule in agent.tax_rules:
+            if (rule.business_type == revenue.business_type and
+                    rule.tax_type == revenue.tax_type and
+                    rule.income_bracket_min <= net_income <= rule.income_bracket_max):
+                tax_rule = rule
+                break
+        if tax_rule:
+            if revenue.tax_type == "service_tax":
+                taxable = revenue.service_revenue or revenue.revenue
+            else:
+                taxable = revenue.product_revenue or revenue.revenue
+            tax_data.append({"month": revenue.month, "tax_amount": (taxable - revenue.expenses) * tax_rule.tax_rate,
+                             "tax_rate": tax_rule.tax_rate * 100, "tax_type": revenue.tax_type})
+    tax = {"total_tax_paid": sum(t["tax_amount"] for t in tax_data), "months": len(tax_data)}
+    return profit, loss, tax
+
+
+def bench_columnar(count=1_000_000):
+    """Profit/loss/tax analytics and memory: list of RevenueData vs NumPy columns"""
+    import gc
+    import os
+    import tempfile
+    import tracemalloc
+    import numpy as np
+    from financial_agent import LiveFinancialAgent
+    from revenue_store import RevenueStore
+
+    rng = np.random.default_rng(42)
+    revenue = rng.uniform(10000, 150000, count).round(2)
+    expenses = (revenue * rng.uniform(0.5, 1.1, count)).round(2)
+    business_types = list(BusinessType)
+    business_codes = rng.integers(0, len(business_types), count)
+    service = rng.random(count) < 0.5
+
+    def build_records():
+        return [
+            RevenueData(
+                month=f"{2000 + (i // 12) % 100:04d}-{i % 12 + 1:02d}", revenue=revenue[i], expenses=expenses[i],
+                business_type=business_types[business_codes[i]],
+                tax_type=TaxType.SERVICE_TAX if service[i] else TaxType.PRODUCT_TAX,
+                service_revenue=revenue[i] * 0.3, product_revenue=revenue[i] * 0.7
+            )
+            for i in range(count)
+        ]
+
+    gc.collect()
+    tracemalloc.start()
+    records = build_records()
+    list_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    os.chdir(tempfile.mkdtemp())
+    agent = LiveFinancialAgent()
+    agent.revenue_memory = RevenueStore(records)
+    store_bytes = agent.revenue_memory.nbytes()
+
+    (legacy_profit, legacy_loss, legacy_tax), legacy_time = _timed(_legacy_analyses, agent, records, repeat=1)
+
+    def columnar():
+        return agent.get_profit_analysis(), agent.get_loss_analysis(), agent.get_tax_analysis()
+
+    (profit, loss, tax), columnar_time = _timed(columnar, repeat=1)
+    assert profit["current_profit"] == legacy_profit["current_profit"]
+    assert abs(profit["average_profit"] - legacy_profit["average_profit"]) < 1e-6 * abs(legacy_profit["average_profit"])
+    assert loss["loss_months_count"] == legacy_loss["loss_months_count"]
+    assert loss["biggest_loss"] == legacy_loss["biggest_loss"]
+    assert len(tax["monthly_breakdown"]) == legacy_tax["months"]
+    assert abs(tax["total_tax_paid"] - legacy_tax["total_tax_paid"]) < 1e-6 * abs(legacy_tax["total_tax_paid"])
+    agent.insight_writer.close()
+    agent.db.close()
+
+    print(f"columnar store  rows={count:,}")
+    print(f"  list of models : {list_bytes / 2**20:8.1f} MiB  analyses {legacy_time:7.3f}s")
+    print(f"  numpy columns  : {store_bytes / 2**20:8.1f} MiB  analyses {columnar_time:7.3f}s"
+          f"  ({list_bytes / store_bytes:.0f}x smaller, {legacy_time / columnar_time:.1f}x faster)")
+
+
+def _synthetic_tax_rules(brackets=250, seed=42):
+    """A slab table per (business_type, tax_type), with gaps, overlaps and shuffled priority"""
+    from models import TaxRule
+
+    rng = random.Random(seed)
+    rules = []
+    for business_type in BusinessType:
+        for tax_type in TaxType:
+            low = -50000.0
+            for _ in range(brackets):
+                width = rng.choice([500.0, 1000.0, 2500.0])
+                high = low + width
+                rules.append(TaxRule(business_type=business_type, tax_type=tax_type, income_bracket_min=low,
+                                     income_bracket_max=high + rng.choice([0.0, 0.0, 250.0]),  # some overlap
+                                     tax_rate=rng.uniform(0.05, 0.3), description="slab"))
+                low = high + rng.choice([0.0, 0.0, 100.0])  # some gaps
+    rng.shuffle(rules)
+    return rules
+
+
+def bench_tax_rules(brackets=250, count=200_000, scan_count=2000):
+    """Tax rule lookup: linear scan vs compiled index (bisect per record and vectorised)"""
+    import numpy as np
+    from revenue_store import BUSINESS_TYPE_CODES, TAX_TYPE_CODES
+    from tax_index import TaxRuleIndex
+
+    rules = _synthetic_tax_rules(brackets)
+    picker = random.Random(7)
+    business = [picker.choice(list(BusinessType)) for _ in range(count)]
+    tax = [picker.choice(list(TaxType)) for _ in range(count)]
+    income = np.random.default_rng(7).uniform(-60000, 600000, count).round(0)
+    # Exact bracket boundaries are where an off-by-one would show
+    boundaries = [b for rule in rules[:500] for b in (rule.income_bracket_min, rule.income_bracket_max)]
+    income[:len(boundaries)] = boundaries
+    income_list = income.tolist()
+
+    def linear(n):
+        found = []
+        for bt, tt, net in zip(business[:n], tax[:n], income_list[:n]):
+            match = None
+            for rule in rules:
+                if rule.business_type == bt and rule.tax_type == tt and rule.income_bracket_min <= net <= rule.income_bracket_max:
+                    match = rule
+                    break
+            found.append(match)
+        return found
+
+    index, compile_time = _timed(TaxRuleIndex, rules)
+    scanned, scan_time = _timed(linear, scan_count, repeat=1)
+    found, bisect_time = _timed(lambda: [index.find(bt, tt, net) for bt, tt, net in zip(business, tax, income_list)])
+    business_codes = np.array([BUSINESS_TYPE_CODES[b] for b in business], dtype=np.int8)
+    tax_codes = np.array([TAX_TYPE_CODES[t] for t in tax], dtype=np.int8)
+    positions, vector_time = _timed(index.find_positions, business_codes, tax_codes, income)
+
+    assert found[:scan_count] == scanned
+    assert [index.rules[p] if p >= 0 else None for p in positions.tolist()] == found
+
+    scan_rate = scan_count / scan_time
+    print(f"tax rules  rules={len(rules):,}, lookups={count:,} (index compiled in {compile_time * 1000:.1f}ms)")
+    print(f"  linear scan    : {scan_rate:12,.0f} lookups/s")
+    print(f"  bisect index   : {count / bisect_time:12,.0f} lookups/s  ({count / bisect_time / scan_rate:.0f}x)")
+    print(f"  vectorised     : {count / vector_time:12,.0f} lookups/s  ({count / vector_time / scan_rate:.0f}x)")
+
+
+def bench_rule_swaps(count=100_000):
+    """Changing one tax rule: targeted recomputation vs re-analysing every month"""
+    import os
+    import tempfile
+    import numpy as np
+    from database import DEFAULT_TENANT
+    from tenants import TenantRegistry
+    from models import RuleSet
+    from revenue_store import RevenueStore
+
+    rng = np.random.default_rng(42)
+    revenue = rng.uniform(10000, 150000, count).round(2)
+    expenses = (revenue * rng.uniform(0.5, 1.1, count)).round(2)
+    business_types = list(BusinessType)
+    business_codes = rng.integers(0, len(business_types), count)
+    service = rng.random(count) < 0.5
+
+    os.chdir(tempfile.mkdtemp())
+    tenants = TenantRegistry()
+    agent = tenants.get(DEFAULT_TENANT)
+    agent.revenue_memory = RevenueStore(
+        RevenueData(
+            month=f"{2000 + (i // 12) % 100:04d}-{i % 12 + 1:02d}", revenue=revenue[i], expenses=expenses[i],
+            business_type=business_types[business_codes[i]],
+            tax_type=TaxType.SERVICE_TAX if service[i] else TaxType.PRODUCT_TAX
+        )
+        for i in range(count)
+    )
+
+    def full_recompute():
+        insights = []
+        for record in agent.revenue_memory:
+            insights.append(agent._compute_tax_impact(record))
+            insights.append(agent._compare_with_competitors(record))
+        return [insight for insight in insights if insight]
+
+    full, full_time = _timed(full_recompute, repeat=1)
+
+    # One rate change: the medium service-business bracket
+    rules = [rule.model_copy() for rule in agent.tax_rules]
+    rules[1].tax_rate = 0.30
+    changed, changed_time = _timed(tenants.load_rule_set, RuleSet(tax_rules=rules), "bench", repeat=1)
+    rollback, rollback_time = _timed(tenants.activate_rule_set, 1, repeat=1)
+    # Switching back to the changed version finds its per-month results memoized
+    agent.tax_memo.hits = 0
+    reapplied, reapply_time = _timed(tenants.activate_rule_set, changed["version"], repeat=1)
+    memo = agent.tax_memo.metrics()
+    tenants.close()
+
+    print(f"rule swaps  months={count:,}, one tax rate changed")
+    print(f"  full recompute    : {full_time:8.3f}s  {len(full):,} insights")
+    print(f"  targeted          : {changed_time:8.3f}s  {changed['tax_months_recomputed']:,} months"
+          f"  ({full_time / changed_time:.0f}x)")
+    print(f"  rollback          : {rollback_time:8.3f}s  {rollback['tax_months_recomputed']:,} months")
+    print(f"  re-apply (memo)   : {reapply_time:8.3f}s  {reapplied['tax_months_recomputed']:,} months"
+          f"  ({memo['hits']:,} memo hits)")
+
+
+def bench_trends(count=200_000, months=1200, requests=200):
+    """Rolling-window trends: precomputed windows vs regrouping the history per request"""
+    import numpy as np
+    import pandas as pd
+    from revenue_store import RevenueStore
+    from trends import RollingAnalytics, DEFAULT_TREND_WINDOWS
+
+    rng = np.random.default_rng(42)
+    month_index = np.sort(rng.integers(0, months, count))
+    revenue = rng.uniform(10000, 150000, count).round(2)
+    expenses = (revenue * rng.uniform(0.5, 1.1, count)).round(2)
+    records = [
+        RevenueData(
+            month=f"{1900 + m // 12:04d}-{m % 12 + 1:02d}", revenue=revenue[i], expenses=expenses[i],
+            business_type=BusinessType.RETAIL, tax_type=TaxType.PRODUCT_TAX
+        )
+        for i, m in enumerate(month_index.tolist())
+    ]
+    store = RevenueStore(records)
+
+    trends = RollingAnalytics()
+    start = time.perf_counter()
+    for record in records:
+        trends.add(record)
+    append_time = (time.perf_counter() - start) / count
+    _, rebuild_time = _timed(trends.rebuild, store, repeat=1)
+
+    def rescan():
+        # What a request would cost without precomputed state
+        frame = pd.DataFrame({"month": store.month, "revenue": store.revenue, "expenses": store.expenses})
+        monthly = frame.groupby("month").sum()
+        margin = (monthly.revenue - monthly.expenses) / monthly.revenue
+        return {
+            size: (monthly.revenue.rolling(size, min_periods=1).mean(),
+                   monthly.revenue.rolling(size, min_periods=1).max(),
+                   margin.rolling(size, min_periods=1).std(ddof=0))
+            for size in DEFAULT_TREND_WINDOWS
+        }
+
+    def serve(handler):
+        start = time.perf_counter()
+        for _ in range(requests):
+            handler()
+        return (time.perf_counter() - start) / requests
+
+    trends.summary()
+    precomputed = serve(trends.summary)
+    rescanned = serve(rescan)
+
+    print(f"trends  records={count:,}, months={months:,}, windows={DEFAULT_TREND_WINDOWS}")
+    print(f"  append            : {append_time * 1e6:8.2f}us per record")
+    print(f"  rebuild           : {rebuild_time * 1000:8.2f}ms")
+    print(f"  request (rescan)  : {rescanned * 1000:8.3f}ms")
+    print(f"  request (windows) : {precomputed * 1000:8.3f}ms  ({rescanned / precomputed:.0f}x)")
+
+
+def bench_forecast(tenant_counts=(10, 10_000), months=36, requests=2000):
+    """/api/forecast latency per tenant: incrementally updated models vs refitting per request"""
+    import numpy as np
+    from forecast import RevenueForecaster, DEFAULT_FORECAST_MONTHS
+    from revenue_store import RevenueStore
+    from tax_index import TaxRuleIndex
+
+    tax_index = TaxRuleIndex(_synthetic_tax_rules(brackets=50))
+    business_types = list(BusinessType)
+    rng = np.random.default_rng(42)
+
+    def record(month, business_type):
+        revenue = 50000 + 800 * month + 10000 * np.sin(month * np.pi / 6) + rng.uniform(-2000, 2000)
+        return RevenueData(
+            month=f"{2000 + month // 12:04d}-{month % 12 + 1:02d}", revenue=revenue, expenses=revenue * 0.7,
+            business_type=business_type, tax_type=TaxType.PRODUCT_TAX, product_revenue=revenue
+        )
+
+    # Every tenant starts from the same history (fitted separately) and then diverges
+    history = RevenueStore(record(m, bt) for m in range(months) for bt in business_types[:3])
+    next_month = [record(months, bt) for bt in business_types[:3]]
+
+    print(f"forecast  {months} months x 3 business types per tenant, {DEFAULT_FORECAST_MONTHS} months ahead")
+    for tenants in tenant_counts:
+        start = time.perf_counter()
+        forecasters = [RevenueForecaster(history) for _ in range(tenants)]
+        fit_time = (time.perf_counter() - start) / tenants
+        picks = rng.integers(0, tenants, requests).tolist()
+
+        def after_ingest(refit):
+            # A month arrives for the tenant, then the dashboard asks for its forecast
+            elapsed = 0.0
+            for tenant in picks:
+                forecaster = forecasters[tenant]
+                for row in next_month:
+                    forecaster.add(row)
+                begin = time.perf_counter()
+                if refit:
+                    forecaster.rebuild(history)
+                forecaster.forecast(DEFAULT_FORECAST_MONTHS, tax_index)
+                elapsed += time.perf_counter() - begin
+            return elapsed / requests
+
+        incremental = after_ingest(refit=False)
+        refitted = after_ingest(refit=True)
+        begin = time.perf_counter()
+        for tenant in picks:
+            forecasters[tenant].forecast(DEFAULT_FORECAST_MONTHS, tax_index)
+        cached = (time.perf_counter() - begin) / requests
+        print(f"  tenants={tenants:>6,}  initial fit {fit_time * 1000:6.3f}ms"
+              f"  | forecast after ingest: refit {refitted * 1000:6.3f}ms, incremental {incremental * 1000:6.3f}ms"
+              f"  | unchanged (cached) {cached * 1e6:6.1f}us")
+
+
+def bench_tenants(tenant_counts=(10, 100, 500), months=120):
+    """Per-tenant agents: load latency, request latency and memory as the tenant count grows"""
+    import gc
+    import os
+    import tempfile
+    import tracemalloc
+    from database import FinancialDB
+    from tenants import TenantRegistry
+
+    histories = [
+        [RevenueData(month=r["month"], revenue=float(r["revenue"]), expenses=float(r["expenses"]),
+                     business_type=BusinessType(r["business_type"]), tax_type=TaxType(r["tax_type"]))
+         for r in _synthetic_rows(months, seed=seed)]
+        for seed in range(8)
+    ]
+
+    print(f"tenants  {months} months of history each")
+    for count in tenant_counts:
+        db = FinancialDB(os.path.join(tempfile.mkdtemp(), "tenants.db"))
+        for tenant_id in range(1, count + 1):
+            db.for_tenant(tenant_id).save_revenue_batch(histories[tenant_id % len(histories)], "history")
+
+        gc.collect()
+        tracemalloc.start()
+        tenants = TenantRegistry(db)
+        loads = []
+        for tenant_id in range(1, count + 1):
+            start = time.perf_counter()
+            tenants.get(tenant_id)
+            loads.append(time.perf_counter() - start)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        estimated = tenants.metrics()["memory_bytes"]
+
+        picker = random.Random(count)
+        requests = [picker.randint(1, count) for _ in range(5000)]
+
+        def serve(tenant_id):
+            start = time.perf_counter()
+            tenants.get(tenant_id).get_financial_summary()
+            return time.perf_counter() - start
+
+        warm = [serve(tenant_id) for tenant_id in requests]
+        # A budget of a quarter of the tenants: most requests miss and reload from the database
+        tenants.memory_budget = estimated // 4
+        tenants.trim()
+        churn = [serve(tenant_id) for tenant_id in requests]
+        metrics = tenants.metrics()
+        tenants.close()
+
+        print(f"  {count:4} tenants: {memory / 2**20:7.1f} MiB ({memory / count / 1024:5.1f} KiB/tenant, "
+              f"estimate {estimated / count / 1024:5.1f})  cold load p50 {_percentile(loads, 0.5) * 1000:5.2f}ms")
+        print(f"               all loaded: request p50 {_percentile(warm, 0.5) * 1e6:6.1f}us"
+              f"  p99 {_percentile(warm, 0.99) * 1e6:7.1f}us")
+        print(f"               budget 1/4: request p50 {_percentile(churn, 0.5) * 1e6:6.1f}us"
+              f"  p99 {_percentile(churn, 0.99) * 1e6:7.1f}us  ({metrics['evictions']:,} evictions)")
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def bench_concurrency(history=20_000, upload_rows=100_000):
+    """/api/summary latency and event-loop lag, idle vs during a large upload"""
+    import asyncio
+    import os
+    import tempfile
+    import httpx
+    from database import DEFAULT_TENANT
+
+    # main opens financial_data.db in the working directory on import
+    os.chdir(tempfile.mkdtemp())
+    import main
+
+    # Requests without a session are served by the default tenant
+    agent = main.tenants.get(DEFAULT_TENANT)
+    agent.ingest_batch([
+        RevenueData(month=r["month"], revenue=float(r["revenue"]), expenses=float(r["expenses"]),
+                    business_type=BusinessType(r["business_type"]), tax_type=TaxType(r["tax_type"]))
+        for r in _synthetic_rows(history, seed=7)
+    ], source_file="history")
+    payload = _synthetic_csv(upload_rows)
+
+    async def summary_latencies(client, until):
+        latencies = []
+        while not until():
+            start = time.perf_counter()
+            response = await client.get("/api/summary")
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    async def loop_lag(until, interval=0.005):
+        worst = 0.0
+        while not until():
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            worst = max(worst, time.perf_counter() - start - interval)
+        return worst
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            deadline = time.perf_counter() + 2
+            idle, idle_lag = await asyncio.gather(
+                summary_latencies(client, lambda: time.perf_counter() > deadline),
+                loop_lag(lambda: time.perf_counter() > deadline)
+            )
+
+            response = await client.post("/api/upload-dataset", files={"file": ("bench.csv", payload, "text/csv")})
+            job_id = response.json()["job_id"]
+            done = False
+
+            async def poll():
+                nonlocal done
+                while not done:
+                    done = (await client.get(f"/api/jobs/{job_id}")).json()["status"] in ("completed", "failed")
+                    await asyncio.sleep(0.05)
+
+            start = time.perf_counter()
+            busy, busy_lag, _ = await asyncio.gather(
+                summary_latencies(client, lambda: done), loop_lag(lambda: done), poll()
+            )
+            return idle, idle_lag, busy, busy_lag, time.perf_counter() - start
+
+    idle, idle_lag, busy, busy_lag, upload_time = asyncio.run(run())
+    # The summary scans the whole history, so part of any slowdown is just more data
+    _, summary_after = _timed(agent.get_financial_summary)
+    main.ingest_jobs.shutdown()
+    main.blocking.shutdown()
+    main.tenants.close()
+    print(f"concurrency  history={history:,} rows, upload={upload_rows:,} rows ({upload_time:.1f}s)")
+    for label, latencies, lag in (("idle", idle, idle_lag), ("during upload", busy, busy_lag)):
+        print(f"  {label:14}: /api/summary p50 {_percentile(latencies, 0.5) * 1000:7.1f}ms"
+              f"  p95 {_percentile(latencies, 0.95) * 1000:7.1f}ms  ({len(latencies)} requests)"
+              f"  max loop lag {lag * 1000:6.1f}ms")
+    print(f"  summary computed alone after the upload: {summary_after * 1000:.1f}ms")
+
+
+def bench_portfolio(businesses=200, months=360):
+    """Portfolio totals from the rollup table vs grouping the raw revenue rows on every request"""
+    import os
+    import tempfile
+    import pandas as pd
+    from database import FinancialDB
+    from financial_agent import LiveFinancialAgent
+
+    db = FinancialDB(os.path.join(tempfile.mkdtemp(), "portfolio.db"))
+    tenant = db.for_tenant(1)
+    history = [
+        RevenueData(month=r["month"], revenue=float(r["revenue"]), expenses=float(r["expenses"]),
+                    business_type=BusinessType(r["business_type"]), tax_type=TaxType(r["tax_type"]))
+        for r in _synthetic_rows(months)
+    ]
+    start = time.perf_counter()
+    for business in range(businesses):
+        tenant.save_revenue_batch(history, f"business-{business}.csv")
+    rows = businesses * months
+    print(f"portfolio  {businesses} businesses, {rows:,} revenue rows "
+          f"(stored with rollups in {time.perf_counter() - start:.2f}s)")
+    agent = LiveFinancialAgent(1, db)
+
+    def from_raw(group_by):
+        frame = pd.DataFrame([r.model_dump() for r in db.for_tenant(1).get_all_revenue_data()])
+        return frame.groupby(group_by)[["revenue", "expenses"]].sum()
+
+    for group_by in (["business"], ["business_type", "month"]):
+        result, rollup_time = _timed(agent.get_portfolio, group_by)
+        raw_by = ["business_type"] if group_by == ["business"] else group_by  # raw rows don't carry the source
+        _, raw_time = _timed(from_raw, raw_by, repeat=1)
+        print(f"  group by {'+'.join(group_by):20} {len(result['groups']):5} groups: rollups {rollup_time * 1000:7.1f}ms"
+              f"  raw rows + pandas {raw_time * 1000:8.1f}ms")
+    agent.insight_writer.close()
+    db.close()
+
+
+BENCHMARKS = {
+    "validation": bench_validation,
+    "documents": bench_documents,
+    "database": bench_database,
+    "concurrency": bench_concurrency,
+    "insight_writes": bench_insight_writes,
+    "lazy_insights": bench_lazy_insights,
+    "insight_store": bench_insight_store,
+    "analyzers": bench_analyzers,
+    "month_index": bench_month_index,
+    "scenarios": bench_scenarios,
+    "portfolio": bench_portfolio,
+    "revenue_posts": bench_revenue_posts,
+    "columnar": bench_columnar,
+    "tax_rules": bench_tax_rules,
+    "rule_swaps": bench_rule_swaps,
+    "tenants": bench_tenants,
+    "trends": bench_trends,
+    "forecast": bench_forecast,
+}
+
+
+if __name__ == "__main__":
+    selected = sys.argv[1:] or list(BENCHMARKS)
+    for name in selected:
+        BENCHMARKS[name]()
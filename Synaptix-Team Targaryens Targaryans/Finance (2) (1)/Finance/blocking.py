@@ -0,0 +1,22 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+# Threads for SQLite and analysis calls made on behalf of requests; more
+# requests than this queue up instead of piling threads onto the GIL
+BLOCKING_WORKERS = 4
+
+
+class BlockingExecutor:
+    """Runs synchronous agent and database calls off the event loop"""
+
+    def __init__(self, max_workers=BLOCKING_WORKERS):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="blocking")
+
+    async def run(self, func, *args, **kwargs):
+        """Await func(*args, **kwargs) executed on the bounded pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
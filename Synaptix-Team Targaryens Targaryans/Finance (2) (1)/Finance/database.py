@@ -1,100 +1,261 @@
+import copy
 import sqlite3
 import json
+import hashlib
+import threading
+from contextlib import contextmanager
 from datetime import datetime
-from models import RevenueData, FinancialInsight, BusinessType, TaxType
+from models import RevenueData, FinancialInsight, BusinessType, TaxType, TaxRule, CompetitorBenchmark
+from migrations import current_version, pending_migrations, record_migration
+from pagination import clamp_limit, decode_cursor, page
+
+# Applied to every connection: WAL lets readers run alongside the single writer,
+# and NORMAL sync only fsyncs at checkpoints, which is safe in WAL mode
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-16000",  # ~16 MB page cache per connection
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+
+# Tenant of rows stored before tenants existed, and of requests without a session
+DEFAULT_TENANT = 0
+
+# Batches up to this many rows look up their row keys one by one rather than
+# reading every key of the source, e.g. a few manual entries
+KEY_LOOKUP_LIMIT = 256
+
+class _ConnectionPool:
+    """One long-lived connection per thread, shared by every tenant view of a database"""
+    
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+    
+    def connection(self):
+        """Long-lived connection owned by the calling thread"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False)
+            for pragma in CONNECTION_PRAGMAS:
+                conn.execute(pragma)
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+    
+    def close(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.ProgrammingError:
+                pass
+        self._local = threading.local()
+
 
 class FinancialDB:
-    def __init__(self, db_path="financial_data.db"):
+    """Revenue data, insights and uploads of one tenant; rule sets are shared by all tenants"""
+    
+    def __init__(self, db_path="financial_data.db", tenant_id=DEFAULT_TENANT):
         self.db_path = db_path
+        self.tenant_id = tenant_id
+        self._pool = _ConnectionPool(db_path)
         self.init_db()
     
-    def init_db(self):
-        """Initialize database tables"""
-        conn = sqlite3.connect(self.db_path)
+    def for_tenant(self, tenant_id):
+        """The same database scoped to another tenant, sharing this one's connections"""
+        view = copy.copy(self)
+        view.tenant_id = tenant_id
+        return view
+    
+    @contextmanager
+    def _transaction(self):
+        """Cursor on this thread's connection, committed on success"""
+        conn = self._pool.connection()
         cursor = conn.cursor()
-        
-        # Revenue data table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS revenue_data (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                month TEXT NOT NULL,
-                revenue REAL NOT NULL,
-                expenses REAL NOT NULL,
-                business_type TEXT NOT NULL,
-                tax_type TEXT NOT NULL,
-                service_revenue REAL DEFAULT 0,
-                product_revenue REAL DEFAULT 0,
-                source_file TEXT DEFAULT 'manual',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Add source_file column if it doesn't exist (for existing databases)
         try:
-            cursor.execute('ALTER TABLE revenue_data ADD COLUMN source_file TEXT DEFAULT "manual"')
-        except sqlite3.OperationalError:
-            pass  # Column already exists
-        
-        # Insights table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS insights (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                insight_type TEXT NOT NULL,
-                title TEXT NOT NULL,
-                description TEXT NOT NULL,
-                impact TEXT NOT NULL,
-                recommendation TEXT NOT NULL,
-                confidence REAL NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # File uploads table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS file_uploads (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                filename TEXT NOT NULL,
-                file_type TEXT NOT NULL,
-                records_count INTEGER NOT NULL,
-                insights_generated INTEGER NOT NULL,
-                upload_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
+            yield cursor
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+    
+    def close(self):
+        """Close every pooled connection, for all tenant views (on application shutdown)"""
+        self._pool.close()
+    
+    def init_db(self):
+        """Bring the schema up to date by applying pending migrations in order"""
+        with self._transaction() as cursor:
+            version = current_version(cursor)
+        for number, description, step in pending_migrations(version):
+            with self._transaction() as cursor:
+                step(cursor)
+                record_migration(cursor, number, description)
+    
+    def schema_version(self):
+        """Latest applied migration"""
+        with self._transaction() as cursor:
+            return current_version(cursor)
+    
+    def explain(self, query, params=()):
+        """SQLite query plan details for `query`"""
+        with self._transaction() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {query}', params)
+            return [row[3] for row in cursor.fetchall()]
     
     def save_revenue_data(self, revenue_data: RevenueData, source_file="manual"):
         """Save revenue data to database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self._transaction() as cursor:
+            cursor.execute('''
+                INSERT INTO revenue_data 
+                (tenant_id, month, revenue, expenses, business_type, tax_type, service_revenue, product_revenue, source_file)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                self.tenant_id,
+                revenue_data.month,
+                revenue_data.revenue,
+                revenue_data.expenses,
+                revenue_data.business_type.value,
+                revenue_data.tax_type.value,
+                revenue_data.service_revenue,
+                revenue_data.product_revenue,
+                source_file
+            ))
+            self._add_to_rollups(cursor, [self._rollup_row(revenue_data, source_file)])
+    
+    @staticmethod
+    def _rollup_row(r: RevenueData, source_file, sign=1):
+        """Contribution of one record to its revenue_rollups row; sign=-1 takes it out again"""
+        return (source_file, r.business_type.value, r.tax_type.value, r.month, sign,
+                sign * r.revenue, sign * r.expenses, sign * r.service_revenue, sign * r.product_revenue)
+    
+    def _add_to_rollups(self, cursor, rows):
+        """Fold deltas (see _rollup_row) into revenue_rollups, in the caller's transaction"""
+        cursor.executemany('''
+            INSERT INTO revenue_rollups
+            (tenant_id, source_file, business_type, tax_type, month, records, revenue, expenses, service_revenue,
+             product_revenue)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (tenant_id, source_file, business_type, tax_type, month) DO UPDATE SET
+                records = records + excluded.records,
+                revenue = revenue + excluded.revenue,
+                expenses = expenses + excluded.expenses,
+                service_revenue = service_revenue + excluded.service_revenue,
+                product_revenue = product_revenue + excluded.product_revenue
+        ''', [(self.tenant_id, *row) for row in rows])
+    
+    @staticmethod
+    def _row_hash(r: RevenueData):
+        values = f"{r.revenue!r}|{r.expenses!r}|{r.tax_type.value}|{r.service_revenue!r}|{r.product_revenue!r}"
+        return hashlib.sha1(values.encode()).hexdigest()
+    
+    def save_revenue_batch(self, records, source_file="manual"):
+        """Save a batch of revenue records in a single transaction.
+        
+        Rows are keyed by (month, business_type, source_file) within the tenant: a key seen before
+        with identical values is skipped and one with different values updates
+        the stored row. Returns (inserted, updated) lists of records.
+        """
+        with self._transaction() as cursor:
+            # Last occurrence wins if a batch repeats a key
+            incoming = {}
+            for r in records:
+                incoming[(r.month, r.business_type.value)] = (r, self._row_hash(r))
         
-        cursor.execute('''
-            INSERT INTO revenue_data 
-            (month, revenue, expenses, business_type, tax_type, service_revenue, product_revenue, source_file)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            revenue_data.month,
-            revenue_data.revenue,
-            revenue_data.expenses,
-            revenue_data.business_type.value,
-            revenue_data.tax_type.value,
-            revenue_data.service_revenue,
-            revenue_data.product_revenue,
-            source_file
-        ))
-        
-        conn.commit()
-        conn.close()
+            if len(incoming) <= KEY_LOOKUP_LIMIT:
+                existing = {}
+                for month, business_type in incoming:
+                    cursor.execute('''
+                        SELECT row_hash FROM revenue_row_keys
+                        WHERE tenant_id = ? AND source_file = ? AND month = ? AND business_type = ?
+                    ''', (self.tenant_id, source_file, month, business_type))
+                    row = cursor.fetchone()
+                    if row:
+                        existing[(month, business_type)] = row[0]
+            else:
+                cursor.execute(
+                    'SELECT month, business_type, row_hash FROM revenue_row_keys WHERE tenant_id = ? AND source_file = ?',
+                    (self.tenant_id, source_file)
+                )
+                existing = {(row[0], row[1]): row[2] for row in cursor.fetchall()}
+        
+            inserted = []
+            updated = []
+            for key, (r, row_hash) in incoming.items():
+                if key not in existing:
+                    inserted.append((r, row_hash))
+                elif existing[key] != row_hash:
+                    updated.append((r, row_hash))
+        
+            cursor.executemany('''
+                INSERT INTO revenue_data 
+                (tenant_id, month, revenue, expenses, business_type, tax_type, service_revenue, product_revenue, source_file)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [
+                (
+                    self.tenant_id,
+                    r.month,
+                    r.revenue,
+                    r.expenses,
+                    r.business_type.value,
+                    r.tax_type.value,
+                    r.service_revenue,
+                    r.product_revenue,
+                    source_file
+                )
+                for r, _ in inserted
+            ])
+            rollups = [self._rollup_row(r, source_file) for r, _ in inserted]
+            # Updated rows leave their old rollups and join their new ones
+            for r, _ in updated:
+                cursor.execute('''
+                    SELECT business_type, tax_type, month, revenue, expenses, service_revenue, product_revenue
+                    FROM revenue_data WHERE tenant_id = ? AND source_file = ? AND month = ? AND business_type = ?
+                ''', (self.tenant_id, source_file, r.month, r.business_type.value))
+                for old in cursor.fetchall():
+                    rollups.append((source_file, old[0], old[1], old[2], -1, -old[3], -old[4], -old[5], -old[6]))
+                    rollups.append(self._rollup_row(r, source_file))
+            cursor.executemany('''
+                UPDATE revenue_data 
+                SET revenue = ?, expenses = ?, tax_type = ?, service_revenue = ?, product_revenue = ?
+                WHERE tenant_id = ? AND source_file = ? AND month = ? AND business_type = ?
+            ''', [
+                (r.revenue, r.expenses, r.tax_type.value, r.service_revenue, r.product_revenue,
+                 self.tenant_id, source_file, r.month, r.business_type.value)
+                for r, _ in updated
+            ])
+            cursor.executemany('''
+                INSERT OR REPLACE INTO revenue_row_keys (tenant_id, month, business_type, source_file, row_hash)
+                VALUES (?, ?, ?, ?, ?)
+            ''', [
+                (self.tenant_id, r.month, r.business_type.value, source_file, row_hash)
+                for r, row_hash in inserted + updated
+            ])
+            self._add_to_rollups(cursor, rollups)
+            if updated:
+                cursor.execute('DELETE FROM revenue_rollups WHERE tenant_id = ? AND records = 0', (self.tenant_id,))
+        return [r for r, _ in inserted], [r for r, _ in updated]
     
     def get_all_revenue_data(self):
         """Get all revenue data from database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT * FROM revenue_data ORDER BY month')
-        rows = cursor.fetchall()
-        conn.close()
+        return [revenue_data for revenue_data, _ in self.get_revenue_with_sources()]
+    
+    def get_revenue_with_sources(self):
+        """All revenue data as (RevenueData, source_file) pairs, ordered by month"""
+        with self._transaction() as cursor:
+            cursor.execute('''
+                SELECT id, month, revenue, expenses, business_type, tax_type, service_revenue, product_revenue, source_file
+                FROM revenue_data WHERE tenant_id = ? ORDER BY month
+            ''', (self.tenant_id,))
+            rows = cursor.fetchall()
         
         revenue_list = []
         for row in rows:
@@ -107,39 +268,61 @@ class FinancialDB:
                 service_revenue=row[6],
                 product_revenue=row[7]
             )
-            revenue_list.append(revenue_data)
+            revenue_list.append((revenue_data, row[8]))
         
         return revenue_list
     
-    def save_insight(self, insight: FinancialInsight):
-        """Save insight to database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO insights 
-            (insight_type, title, description, impact, recommendation, confidence)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (
-            insight.insight_type,
-            insight.title,
-            insight.description,
-            insight.impact,
-            insight.recommendation,
-            insight.confidence
-        ))
-        
-        conn.commit()
-        conn.close()
-    
-    def get_recent_insights(self, limit=10):
-        """Get recent insights from database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT * FROM insights ORDER BY created_at DESC LIMIT ?', (limit,))
-        rows = cursor.fetchall()
-        conn.close()
+    def get_revenue_rollups(self, start_month=None, end_month=None):
+        """Rows of revenue_rollups for this tenant, optionally for months in [start_month, end_month] (YYYY-MM)"""
+        query = '''
+            SELECT source_file, business_type, tax_type, month, records, revenue, expenses, service_revenue,
+                   product_revenue
+            FROM revenue_rollups WHERE tenant_id = ?
+        '''
+        params = [self.tenant_id]
+        if start_month is not None:
+            query += ' AND month >= ?'
+            params.append(start_month)
+        if end_month is not None:
+            query += ' AND month <= ?'
+            params.append(end_month)
+        with self._transaction() as cursor:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+    
+    def save_tenant_insights(self, tenant_insights):
+        """Save (tenant_id, insight) pairs of any tenants in a single transaction"""
+        with self._transaction() as cursor:
+            cursor.executemany('''
+                INSERT INTO insights 
+                (tenant_id, insight_type, title, description, impact, recommendation, confidence)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', [
+                (
+                    tenant_id,
+                    i.insight_type,
+                    i.title,
+                    i.description,
+                    i.impact,
+                    i.recommendation,
+                    i.confidence
+                )
+                for tenant_id, i in tenant_insights
+            ])
+    
+    def get_recent_insights(self, limit=10, insight_type=None):
+        """Get recent insights from database, newest first, optionally of one type"""
+        where = 'tenant_id = ?'
+        params = [self.tenant_id]
+        if insight_type is not None:
+            where += ' AND insight_type = ?'
+            params.append(insight_type)
+        with self._transaction() as cursor:
+            cursor.execute(f'''
+                SELECT id, insight_type, title, description, impact, recommendation, confidence
+                FROM insights WHERE {where} ORDER BY created_at DESC, id DESC LIMIT ?
+            ''', (*params, limit))
+            rows = cursor.fetchall()
         
         insights = []
         for row in rows:
@@ -156,74 +339,256 @@ class FinancialDB:
         return insights
     
     def clear_all_data(self):
-        """Clear all data from database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        """Clear all of this tenant's data from database"""
+        with self._transaction() as cursor:
+            cursor.execute('DELETE FROM revenue_data WHERE tenant_id = ?', (self.tenant_id,))
+            cursor.execute('DELETE FROM insights WHERE tenant_id = ?', (self.tenant_id,))
+            cursor.execute('DELETE FROM revenue_row_keys WHERE tenant_id = ?', (self.tenant_id,))
+            cursor.execute('DELETE FROM revenue_rollups WHERE tenant_id = ?', (self.tenant_id,))
+            # Fingerprints no longer describe stored data, so the same files may be imported again
+            cursor.execute('UPDATE file_uploads SET content_hash = NULL WHERE tenant_id = ?', (self.tenant_id,))
+    
+    def delete_insights(self, insight_types):
+        """Delete this tenant's insights of the given types"""
+        insight_types = list(insight_types)
+        if not insight_types:
+            return
+        placeholders = ', '.join('?' * len(insight_types))
+        with self._transaction() as cursor:
+            cursor.execute(f'DELETE FROM insights WHERE tenant_id = ? AND insight_type IN ({placeholders})',
+                           (self.tenant_id, *insight_types))
+    
+    def clear_all_tenants(self):
+        """Clear every tenant's data from database"""
+        with self._transaction() as cursor:
+            cursor.execute('DELETE FROM revenue_data')
+            cursor.execute('DELETE FROM insights')
+            cursor.execute('DELETE FROM revenue_row_keys')
+            cursor.execute('DELETE FROM revenue_rollups')
+            cursor.execute('UPDATE file_uploads SET content_hash = NULL')
+    
+    def save_file_upload(self, filename, file_type, records_count, insights_generated,
+                         job_id=None, status="completed", rows_rejected=0, error=None, content_hash=None):
+        """Save file upload record"""
+        with self._transaction() as cursor:
+            cursor.execute('''
+                INSERT INTO file_uploads 
+                (tenant_id, filename, file_type, records_count, insights_generated, job_id, status, rows_rejected, error,
+                 content_hash)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (self.tenant_id, filename, file_type, records_count, insights_generated, job_id, status, rows_rejected,
+                  error, content_hash))
         
-        cursor.execute('DELETE FROM revenue_data')
-        cursor.execute('DELETE FROM insights')
+            file_id = cursor.lastrowid
+        return file_id
+    
+    def update_file_upload(self, file_id, status, records_count, insights_generated, rows_rejected=0, error=None):
+        """Update the status and counts of an upload record"""
+        with self._transaction() as cursor:
+            cursor.execute('''
+                UPDATE file_uploads 
+                SET status = ?, records_count = ?, insights_generated = ?, rows_rejected = ?, error = ?
+                WHERE id = ? AND tenant_id = ?
+            ''', (status, records_count, insights_generated, rows_rejected, error, file_id, self.tenant_id))
+    
+    def _file_upload_from_row(self, row):
+        return {
+            'id': row[0],
+            'filename': row[1],
+            'file_type': row[2],
+            'records_count': row[3],
+            'insights_generated': row[4],
+            'upload_date': row[5],
+            'job_id': row[6],
+            'status': row[7] or 'completed',
+            'rows_rejected': row[8] or 0,
+            'error': row[9]
+        }
+    
+    def claim_upload(self, filename, file_type, job_id, content_hash):
+        """Record a queued upload unless the latest import of `filename` has the same content.
+
+        A failed latest import never matches, since it may have stored part of
+        its rows. Returns (upload id, None), or (None, that import) for a
+        duplicate. The check and the insert are one statement, so concurrent
+        uploads of the same file can't both pass the check.
+        """
+        with self._transaction() as cursor:
+            cursor.execute('''
+                INSERT INTO file_uploads
+                (tenant_id, filename, file_type, records_count, insights_generated, job_id, status, content_hash)
+                SELECT ?, ?, ?, 0, 0, ?, 'queued', ?
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM (
+                        SELECT content_hash, status FROM file_uploads
+                        WHERE tenant_id = ? AND filename = ?
+                        ORDER BY id DESC LIMIT 1
+                    ) WHERE content_hash = ? AND status != 'failed'
+                )
+            ''', (self.tenant_id, filename, file_type, job_id, content_hash,
+                  self.tenant_id, filename, content_hash))
+            if cursor.rowcount:
+                return cursor.lastrowid, None
+            cursor.execute('''
+                SELECT id, filename, file_type, records_count, insights_generated, upload_date,
+                       job_id, status, rows_rejected, error
+                FROM file_uploads WHERE tenant_id = ? AND filename = ?
+                ORDER BY id DESC LIMIT 1
+            ''', (self.tenant_id, filename))
+            return None, self._file_upload_from_row(cursor.fetchone())
+    
+    def get_file_upload_by_job(self, job_id):
+        """Get the upload record created for a background ingest job"""
+        with self._transaction() as cursor:
+            cursor.execute('''
+                SELECT id, filename, file_type, records_count, insights_generated, upload_date,
+                       job_id, status, rows_rejected, error
+                FROM file_uploads WHERE tenant_id = ? AND job_id = ?
+            ''', (self.tenant_id, job_id))
+            row = cursor.fetchone()
         
-        conn.commit()
-        conn.close()
+        return self._file_upload_from_row(row) if row else None
     
-    def save_file_upload(self, filename, file_type, records_count, insights_generated):
-        """Save file upload record"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    @staticmethod
+    def _revenue_record_from_row(row):
+        return {
+            'id': row[0],
+            'month': row[1],
+            'revenue': row[2],
+            'expenses': row[3],
+            'business_type': row[4],
+            'tax_type': row[5],
+            'service_revenue': row[6],
+            'product_revenue': row[7],
+            'source_file': row[8],
+            'created_at': row[9]
+        }
+    
+    def get_revenue_page(self, cursor=None, limit=None, source_file=None):
+        """One page of revenue records ordered by (month, id), optionally for one file.
         
-        cursor.execute('''
-            INSERT INTO file_uploads 
-            (filename, file_type, records_count, insights_generated)
-            VALUES (?, ?, ?, ?)
-        ''', (filename, file_type, records_count, insights_generated))
+        Keyset pagination: the cursor holds the last (month, id) seen, so every
+        page is an index range scan no matter how deep it is.
+        """
+        limit = clamp_limit(limit)
+        after = decode_cursor(cursor, 2)
+        conditions = ['tenant_id = ?']
+        params = [self.tenant_id]
+        if source_file is not None:
+            conditions.append('source_file = ?')
+            params.append(source_file)
+        if after:
+            conditions.append('(month, id) > (?, ?)')
+            params.extend(after)
+        where = ' AND '.join(conditions)
         
-        file_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        return file_id
+        with self._transaction() as db_cursor:
+            db_cursor.execute(f'''
+                SELECT id, month, revenue, expenses, business_type, tax_type, service_revenue, product_revenue,
+                       source_file, created_at
+                FROM revenue_data WHERE {where} ORDER BY month, id LIMIT ?
+            ''', (*params, limit + 1))
+            rows = db_cursor.fetchall()
+        
+        records = [self._revenue_record_from_row(row) for row in rows]
+        return page(records, limit, lambda r: (r['month'], r['id']))
     
-    def get_all_file_uploads(self):
-        """Get all uploaded files"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def get_file_uploads_page(self, cursor=None, limit=None):
+        """One page of uploads, newest first, continuing after the cursor's id"""
+        limit = clamp_limit(limit)
+        before = decode_cursor(cursor, 1)
+        where = 'AND id < ?' if before else ''
         
-        cursor.execute('SELECT * FROM file_uploads ORDER BY upload_date DESC')
-        rows = cursor.fetchall()
-        conn.close()
+        with self._transaction() as db_cursor:
+            db_cursor.execute(f'''
+                SELECT id, filename, file_type, records_count, insights_generated, upload_date,
+                       job_id, status, rows_rejected, error
+                FROM file_uploads WHERE tenant_id = ? {where} ORDER BY id DESC LIMIT ?
+            ''', (self.tenant_id, *(before or ()), limit + 1))
+            rows = db_cursor.fetchall()
         
-        files = []
-        for row in rows:
-            files.append({
-                'id': row[0],
-                'filename': row[1],
-                'file_type': row[2],
-                'records_count': row[3],
-                'insights_generated': row[4],
-                'upload_date': row[5]
-            })
-        return files
-    
-    def get_records_by_file(self, filename):
-        """Get all revenue records from a specific file"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        uploads = [self._file_upload_from_row(row) for row in rows]
+        return page(uploads, limit, lambda u: (u['id'],))
+    
+    def get_file_summary(self, filename):
+        """Record count and totals for one uploaded file"""
+        with self._transaction() as cursor:
+            cursor.execute('''
+                SELECT COUNT(*), COALESCE(SUM(revenue), 0), COALESCE(SUM(expenses), 0)
+                FROM revenue_data WHERE tenant_id = ? AND source_file = ?
+            ''', (self.tenant_id, filename))
+            count, revenue, expenses = cursor.fetchone()
+        
+        return {
+            'records_count': count,
+            'total_revenue': revenue,
+            'total_expenses': expenses,
+            'net_profit': revenue - expenses
+        }
+    
+    def save_rule_set(self, tax_rules, competitor_benchmarks, source=None):
+        """Store a new rule set version (not yet active) and return its version number"""
+        with self._transaction() as cursor:
+            cursor.execute('''
+                INSERT INTO rule_sets (tax_rules, competitor_benchmarks, source)
+                VALUES (?, ?, ?)
+            ''', (
+                json.dumps([rule.model_dump(mode="json") for rule in tax_rules]),
+                json.dumps([benchmark.model_dump(mode="json") for benchmark in competitor_benchmarks]),
+                source
+            ))
+            version = cursor.lastrowid
+        return version
+    
+    def activate_rule_set(self, version):
+        """Make `version` the only active rule set"""
+        with self._transaction() as cursor:
+            cursor.execute('UPDATE rule_sets SET active = (version = ?)', (version,))
+    
+    def get_rule_set(self, version=None):
+        """A stored rule set with its rules parsed, the active one by default; None if missing"""
+        with self._transaction() as cursor:
+            if version is None:
+                cursor.execute('''
+                    SELECT version, tax_rules, competitor_benchmarks, source, active, created_at
+                    FROM rule_sets WHERE active = 1
+                ''')
+            else:
+                cursor.execute('''
+                    SELECT version, tax_rules, competitor_benchmarks, source, active, created_at
+                    FROM rule_sets WHERE version = ?
+                ''', (version,))
+            row = cursor.fetchone()
         
-        cursor.execute('SELECT * FROM revenue_data WHERE source_file = ? ORDER BY month', (filename,))
-        rows = cursor.fetchall()
-        conn.close()
+        if not row:
+            return None
+        return {
+            'version': row[0],
+            'tax_rules': [TaxRule(**rule) for rule in json.loads(row[1])],
+            'competitor_benchmarks': [CompetitorBenchmark(**b) for b in json.loads(row[2])],
+            'source': row[3],
+            'active': bool(row[4]),
+            'created_at': row[5]
+        }
+    
+    def get_rule_set_versions(self):
+        """Every stored rule set, newest first, without the rules themselves"""
+        with self._transaction() as cursor:
+            cursor.execute('''
+                SELECT version, source, active, created_at,
+                       json_array_length(tax_rules), json_array_length(competitor_benchmarks)
+                FROM rule_sets ORDER BY version DESC
+            ''')
+            rows = cursor.fetchall()
         
-        records = []
-        for row in rows:
-            records.append({
-                'id': row[0],
-                'month': row[1],
-                'revenue': row[2],
-                'expenses': row[3],
-                'business_type': row[4],
-                'tax_type': row[5],
-                'service_revenue': row[6],
-                'product_revenue': row[7],
-                'source_file': row[8],
-                'created_at': row[9]
-            })
-        return records
\ No newline at end of file
+        return [
+            {
+                'version': row[0],
+                'source': row[1],
+                'active': bool(row[2]),
+                'created_at': row[3],
+                'tax_rules_count': row[4],
+                'benchmarks_count': row[5]
+            }
+            for row in rows
+        ]
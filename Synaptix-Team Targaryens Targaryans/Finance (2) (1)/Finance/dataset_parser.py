@@ -0,0 +1,152 @@
+import codecs
+import json
+import pandas as pd
+from typing import Dict, Iterable, Iterator, List, Tuple
+from validation import validate_frame, validate_records, records_from_frame
+
+# Bytes read from a JSON upload per step and rows handed to validation per batch
+CHUNK_SIZE = 64 * 1024
+BATCH_SIZE = 5000
+
+# A single JSON array element larger than this is treated as malformed input
+MAX_JSON_ELEMENT_SIZE = 1024 * 1024
+
+# Only the first few rejected rows are reported back, the rest are just counted
+MAX_REPORTED_ERRORS = 20
+
+
+def _iter_text_chunks(stream, chunk_size=CHUNK_SIZE) -> Iterator[str]:
+    """Read a binary stream in fixed-size chunks and decode it incrementally"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def iter_csv_frames(stream, batch_size=BATCH_SIZE) -> Iterator[pd.DataFrame]:
+    """Stream a CSV upload as DataFrames of at most `batch_size` rows"""
+    yield from pd.read_csv(
+        stream,
+        chunksize=batch_size,
+        encoding="utf-8-sig",
+        # Low-cardinality text columns are read as categories so validation
+        # only has to look at each distinct value once
+        dtype={"month": "category", "business_type": "category", "tax_type": "category"},
+        skipinitialspace=True
+    )
+
+
+def iter_json_records(stream, chunk_size=CHUNK_SIZE) -> Iterator[Dict]:
+    """Stream the elements of a top-level JSON array one at a time"""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    started = False
+    finished = False
+    chunks = _iter_text_chunks(stream, chunk_size)
+    exhausted = False
+
+    while not finished:
+        # Skip whitespace and separators between elements
+        while position < len(buffer) and buffer[position] in " \t\r\n,":
+            position += 1
+
+        if position < len(buffer):
+            if not started:
+                if buffer[position] != "[":
+                    raise ValueError("JSON dataset must be an array of records")
+                started = True
+                position += 1
+                continue
+            if buffer[position] == "]":
+                finished = True
+                break
+            try:
+                element, position = decoder.raw_decode(buffer, position)
+                yield element
+                continue
+            except json.JSONDecodeError:
+                if exhausted:
+                    raise ValueError("Malformed JSON dataset")
+                if len(buffer) - position > MAX_JSON_ELEMENT_SIZE:
+                    raise ValueError("JSON record exceeds maximum size")
+        elif exhausted:
+            break
+
+        # Need more input: drop consumed text and read the next chunk
+        buffer = buffer[position:]
+        position = 0
+        try:
+            buffer += next(chunks)
+        except StopIteration:
+            exhausted = True
+
+    if not finished:
+        raise ValueError("Malformed JSON dataset: unterminated array")
+
+
+def iter_batches(items: Iterable, size=BATCH_SIZE) -> Iterator[List]:
+    """Group an iterable into lists of at most `size` items"""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_validated_batches(stream, filename: str, batch_size=BATCH_SIZE) -> Iterator[Tuple[pd.DataFrame, List[Dict]]]:
+    """Yield (valid rows, row errors) for each fixed-size batch of an upload"""
+    row_number = 0
+    if filename.endswith('.csv'):
+        for frame in iter_csv_frames(stream, batch_size):
+            yield validate_frame(frame, first_row=row_number + 1)
+            row_number += len(frame)
+    elif filename.endswith('.json'):
+        for raw_batch in iter_batches(iter_json_records(stream), batch_size):
+            yield validate_records(raw_batch, first_row=row_number + 1)
+            row_number += len(raw_batch)
+    else:
+        raise ValueError("Only JSON and CSV files supported")
+
+
+def ingest_stream(agent, stream, filename: str, batch_size=BATCH_SIZE, on_progress=None) -> Dict:
+    """Parse, validate and ingest a dataset stream in fixed-size batches.
+
+    `on_progress(accepted, rejected, insights)` is called after every batch.
+    """
+    accepted = 0
+    rejected = 0
+    total_insights = 0
+    errors = []
+
+    for valid, batch_errors in iter_validated_batches(stream, filename, batch_size):
+        rejected += len(batch_errors)
+        errors.extend(batch_errors[:MAX_REPORTED_ERRORS - len(errors)])
+        if len(valid):
+            records = records_from_frame(valid)
+            agent.ingest_batch(records, source_file=filename)
+            accepted += len(records)
+        if on_progress:
+            on_progress(accepted, rejected, total_insights)
+
+    # One analysis for the whole import, of its newest record
+    total_insights = len(agent.analyze_pending())
+    if on_progress:
+        on_progress(accepted, rejected, total_insights)
+
+    return {
+        "rows_accepted": accepted,
+        "rows_rejected": rejected,
+        "total_insights": total_insights,
+        "errors": errors
+    }
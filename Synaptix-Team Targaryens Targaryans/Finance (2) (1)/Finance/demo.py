@@ -41,7 +41,8 @@ def demo_live_analysis():
         print(f"Revenue: ${scenario['data'].revenue:,.2f} | Expenses: ${scenario['data'].expenses:,.2f}")
         
         # Ingest data and trigger live analysis
-        insights = agent.ingest_revenue_data(scenario['data'])
+        agent.ingest_revenue_data(scenario['data'])
+        insights = agent.analyze_pending()
         
         if insights:
             print(f"\n🔍 Generated {len(insights)} new insights:")
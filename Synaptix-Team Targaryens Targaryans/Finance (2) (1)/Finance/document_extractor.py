@@ -0,0 +1,214 @@
+import multiprocessing
+import os
+import re
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+import PyPDF2
+
+# Pages handed to a worker per task; large enough to amortise opening the PDF
+PAGES_PER_TASK = 16
+# Paragraphs grouped into one "page" for DOCX files, which have no pages
+PARAGRAPHS_PER_BLOCK = 50
+
+MONTH_NAMES = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12
+}
+
+# One alternation so a page is scanned in a single pass, in reading order
+FIGURE_PATTERN = re.compile(
+    r'\b(?P<iso_year>\d{4})-(?P<iso_month>0[1-9]|1[0-2])\b'
+    r'|\b(?P<month_name>jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?'
+    r'|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\.?\s+(?P<name_year>\d{4})\b'
+    r'|\brevenue[:\s]*[$₹]?\s*(?P<revenue>[0-9][0-9,]*(?:\.[0-9]+)?)'
+    r'|\bexpenses?[:\s]*[$₹]?\s*(?P<expenses>[0-9][0-9,]*(?:\.[0-9]+)?)',
+    re.IGNORECASE
+)
+
+REQUIRED_FIELDS = ("revenue", "expenses")
+
+# Workers are started from a forkserver (or spawned), never forked from the app:
+# the pool is first used on a job thread, and forking a threaded process can
+# copy locks other threads held at that moment into the worker
+POOL_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 2,
+                                        mp_context=multiprocessing.get_context(POOL_START_METHOD))
+        return _pool
+
+
+def shutdown_pool():
+    """Stop the extraction worker processes"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _extract_pdf_pages(path: str, start: int, end: int) -> List[str]:
+    """Worker: extract the text of pages [start, end) of a PDF"""
+    reader = PyPDF2.PdfReader(path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+
+def pdf_page_count(path: str) -> int:
+    return len(PyPDF2.PdfReader(path).pages)
+
+
+def iter_pdf_pages(path: str, pages_per_task=PAGES_PER_TASK) -> Iterator[str]:
+    """Yield page texts in order while the following pages are extracted in parallel.
+
+    Only a bounded window of page ranges is in flight at a time, and closing
+    the generator early cancels whatever has not started yet.
+    """
+    workers = os.cpu_count() or 1
+    if workers == 1:
+        # Nothing to overlap with; avoid re-opening the PDF in a worker
+        reader = PyPDF2.PdfReader(path)
+        for page in reader.pages:
+            yield page.extract_text() or ""
+        return
+
+    total = pdf_page_count(path)
+    # Each task re-opens the PDF, so keep tasks big enough to amortise that
+    pages_per_task = max(pages_per_task, total // (workers * 4))
+    pool = _get_pool()
+    starts = iter(range(0, total, pages_per_task))
+    in_flight = deque()
+
+    def submit_next():
+        start = next(starts, None)
+        if start is not None:
+            in_flight.append(pool.submit(_extract_pdf_pages, path, start, min(start + pages_per_task, total)))
+
+    for _ in range(2 * workers):
+        submit_next()
+    try:
+        while in_flight:
+            texts = in_flight.popleft().result()
+            submit_next()
+            yield from texts
+    finally:
+        for future in in_flight:
+            future.cancel()
+
+
+def iter_docx_pages(path: str, paragraphs_per_block=PARAGRAPHS_PER_BLOCK) -> Iterator[str]:
+    """Yield DOCX text in blocks of paragraphs, followed by table rows"""
+    import docx
+    document = docx.Document(path)
+    block = []
+    for paragraph in document.paragraphs:
+        block.append(paragraph.text)
+        if len(block) >= paragraphs_per_block:
+            yield "\n".join(block)
+            block = []
+    if block:
+        yield "\n".join(block)
+    for table in document.tables:
+        yield "\n".join(" ".join(cell.text for cell in row.cells) for row in table.rows)
+
+
+def document_page_count(path: str, filename: str) -> Optional[int]:
+    """Number of pages to scan, when it is cheap to know up front"""
+    if filename.lower().endswith('.pdf'):
+        return pdf_page_count(path)
+    return None
+
+
+def iter_document_pages(path: str, filename: str) -> Iterator[str]:
+    name = filename.lower()
+    if name.endswith('.pdf'):
+        return iter_pdf_pages(path)
+    if name.endswith('.docx'):
+        return iter_docx_pages(path)
+    raise ValueError("Only PDF and DOCX documents supported")
+
+
+def _amount(text: str) -> float:
+    return float(text.replace(',', ''))
+
+
+class FigureScanner:
+    """Collects revenue/expense figures per month from pages as they arrive.
+
+    Figures are attached to the most recent month mentioned before them, or
+    to `default_month` until the document names one. Scanning is complete once
+    every month in `required_months` has all REQUIRED_FIELDS.
+    """
+
+    def __init__(self, required_months: Optional[List[str]] = None, default_month: Optional[str] = None):
+        self.required_months = list(required_months or [])
+        self.current_month = default_month
+        self.figures: Dict[Optional[str], Dict[str, float]] = {}
+        self.pages_scanned = 0
+
+    def scan(self, text: str):
+        for match in FIGURE_PATTERN.finditer(text):
+            if match.group('iso_year'):
+                self.current_month = f"{match.group('iso_year')}-{match.group('iso_month')}"
+            elif match.group('month_name'):
+                number = MONTH_NAMES[match.group('month_name')[:3].lower()]
+                self.current_month = f"{match.group('name_year')}-{number:02d}"
+            else:
+                field = 'revenue' if match.group('revenue') else 'expenses'
+                # The first figure seen for a month wins, as in a summary-first statement
+                self.figures.setdefault(self.current_month, {}).setdefault(field, _amount(match.group(field)))
+        self.pages_scanned += 1
+
+    def is_complete(self) -> bool:
+        if not self.required_months:
+            return False
+        return all(
+            all(f in self.figures.get(month, {}) for f in REQUIRED_FIELDS)
+            for month in self.required_months
+        )
+
+    def months(self) -> Dict[str, Dict[str, float]]:
+        """Months (in calendar order) that have every required field"""
+        return {
+            month: values
+            for month, values in sorted(self.figures.items(), key=lambda item: item[0] or "")
+            if month and all(f in values for f in REQUIRED_FIELDS)
+        }
+
+
+def extract_document(path: str, filename: str, required_months=None, default_month=None, on_page=None) -> Tuple[Dict, int]:
+    """Scan a PDF/DOCX for monthly figures, stopping once the required months are found.
+
+    Returns ({month: {"revenue": ..., "expenses": ...}}, pages scanned).
+    """
+    scanner = FigureScanner(required_months, default_month)
+    pages = iter_document_pages(path, filename)
+    try:
+        for text in pages:
+            scanner.scan(text)
+            if on_page:
+                on_page(scanner.pages_scanned)
+            if scanner.is_complete():
+                break
+    finally:
+        pages.close()
+    return scanner.months(), scanner.pages_scanned
+
+
+def extract_figures(text: str) -> Dict:
+    """Revenue/expenses found first in a block of text"""
+    scanner = FigureScanner(default_month="")
+    scanner.scan(text)
+    found = {}
+    for values in scanner.figures.values():
+        for field, value in values.items():
+            found.setdefault(field, value)
+    return found
@@ -1,21 +1,159 @@
 # import pathway as pw  # Not needed for this implementation
+import numpy as np
 import pandas as pd
-from typing import Dict, List
-from datetime import datetime, timedelta
-from models import RevenueData, TaxRule, CompetitorBenchmark, FinancialInsight, BusinessType, TaxType
-from database import FinancialDB
-import PyPDF2
-import io
+from typing import Dict, List, Optional
+from models import RevenueData, TaxRule, CompetitorBenchmark, FinancialInsight, BusinessType, TaxType, ScenarioGrid
+from database import FinancialDB, DEFAULT_TENANT
+from insight_writer import InsightWriter
+from insight_store import InsightStore, INSIGHT_RETENTION
+from aggregates import RevenueAggregates, InsightCounter
+from revenue_store import RevenueStore, BUSINESS_TYPE_CODES, TAX_TYPE_CODES, TAX_TYPES, UNKNOWN_MONTH, month_ordinal
+from month_index import MonthIndex, parse_month_range, FIRST_MONTH, LAST_MONTH
+from tax_index import TaxRuleIndex, TaxResultMemo, taxable_base
+from trends import RollingAnalytics, DEFAULT_TREND_WINDOWS, month_label
+from forecast import RevenueForecaster, DEFAULT_FORECAST_MONTHS
+from scenarios import evaluate_scenarios
+from portfolio import portfolio_rollup, DEFAULT_PORTFOLIO_GROUPS
+from analyzers import AnalysisPipeline
+from document_extractor import extract_document, extract_figures
+import os
+import tempfile
+import threading
+
+# Rough in-memory sizes, for memory_bytes()
+AGENT_OVERHEAD_BYTES = 32 * 1024  # compiled tax rules, benchmarks, counters and locks
+INSIGHT_BYTES = 1500  # FinancialInsight with its strings
+ROW_INDEX_ENTRY_BYTES = 250  # (month, business_type, source_file) key and position
+MONTH_INDEX_ENTRY_BYTES = 40  # position in the month index
+CHART_MONTHS = 12  # months shown by default in the revenue chart
+TAX_MEMO_ENTRY_BYTES = 600  # key tuple and the memoized insight
+FORECAST_MODEL_BYTES = 1500  # fitted state of one forecast series
+INITIAL_INSIGHTS = 50  # loaded from the database with the agent
 
 class LiveFinancialAgent:
-    def __init__(self):
-        self.db = FinancialDB()
-        self.revenue_memory = self.db.get_all_revenue_data()  # Load from DB
-        self.tax_rules = self._load_default_tax_rules()
-        self.competitor_benchmarks = self._load_default_benchmarks()
-        self.insights_history = self.db.get_recent_insights(50)  # Load from DB
+    def __init__(self, tenant_id=DEFAULT_TENANT, db: FinancialDB = None, insight_writer: InsightWriter = None,
+                 insight_retention=INSIGHT_RETENTION, pipeline: AnalysisPipeline = None):
+        """Agent for one tenant; several agents can share a database, an insight writer and an analysis pipeline"""
+        self.tenant_id = tenant_id
+        self.db = (db or FinancialDB()).for_tenant(tenant_id)
+        stored = self.db.get_revenue_with_sources()  # Load from DB, kept as columns
+        self.revenue_memory = RevenueStore([record for record, _ in stored])
+        self.tax_memo = TaxResultMemo()  # Per-month tax results, keyed by tax_rules_version
+        self._activate_stored_rule_set()
+        recent = self.db.get_recent_insights(min(INITIAL_INSIGHTS, insight_retention))  # Load from DB, newest first
+        self.insights_history = InsightStore(
+            reversed(recent), retention=insight_retention, complete=len(recent) < min(INITIAL_INSIGHTS, insight_retention)
+        )
+        self.insight_writer = insight_writer or InsightWriter(self.db)  # Insights are persisted write-behind
+        self.pipeline = pipeline or AnalysisPipeline()  # Analyzers run for each analysed record
+        # Kept up to date on every change so the summary never rescans history
+        self.aggregates = RevenueAggregates(self.revenue_memory)
+        self.months = MonthIndex(self.revenue_memory)  # Record positions in month order, per business type
+        self.insight_counts = InsightCounter(self.insights_history)
+        self.trends = RollingAnalytics(self.revenue_memory)  # Monthly totals and rolling windows
+        self.forecasts = RevenueForecaster(self.revenue_memory)  # Fitted per business type and tax type
         self.documents = []
+        self._lock = threading.RLock()  # Uploads are ingested from worker threads
+        # Serialises writers, so each publishes to memory what its own database write did;
+        # taken before _lock, which only guards memory and is never held across a commit
+        self._write_lock = threading.Lock()
+        # Insights are generated lazily: a change bumps data_version, and the
+        # newest changed record is analysed once the insights are next needed
+        self.data_version = 0
+        self.insights_version = 0
+        self._changed_position = None
+        # (month, business_type, source_file) -> position in revenue_memory
+        self._row_index = {
+            (record.month, record.business_type, source_file): position
+            for position, (record, source_file) in enumerate(stored)
+        }
+        
+    @property
+    def tax_rules(self):
+        """Active tax rules, in priority order (the first matching rule applies)"""
+        return self._tax_index.rules
+    
+    @tax_rules.setter
+    def tax_rules(self, rules: List[TaxRule]):
+        # Assigning a new rule list recompiles the lookup index
+        self._tax_index = TaxRuleIndex(rules)
+    
+    def _activate_stored_rule_set(self):
+        """Use the active stored rule set, storing the defaults as the first version on a fresh database"""
+        stored = self.db.get_rule_set()
+        if stored is None:
+            version = self.db.save_rule_set(self._load_default_tax_rules(), self._load_default_benchmarks(), source="defaults")
+            self.db.activate_rule_set(version)
+            stored = self.db.get_rule_set(version)
+        self.tax_rules = stored['tax_rules']
+        self.competitor_benchmarks = stored['competitor_benchmarks']
+        self.rule_version = stored['version']
+        # Version that introduced the active tax rules; unchanged when only benchmarks change
+        self.tax_rules_version = stored['version']
+    
+    def get_rule_sets(self) -> Dict:
+        """Active tax rules and benchmarks, with every stored version"""
+        return {
+            "active_version": self.rule_version,
+            "tax_rules": [rule.model_dump(mode="json") for rule in self.tax_rules],
+            "competitor_benchmarks": [b.model_dump(mode="json") for b in self.competitor_benchmarks],
+            "versions": self.db.get_rule_set_versions()
+        }
+    
+    def apply_rule_set(self, version: int, tax_rules: List[TaxRule], benchmarks: List[CompetitorBenchmark]) -> Dict:
+        """Switch to a rule set already active in the database, regenerating insights only for the months it changes"""
+        with self._lock:
+            return self._apply_rule_set(version, tax_rules, benchmarks)
+    
+    def _apply_rule_set(self, version: int, tax_rules: List[TaxRule], benchmarks: List[CompetitorBenchmark]) -> Dict:
+        previous_index = self._tax_index
+        previous_benchmarks = self._benchmark_revenue_by_type(self.competitor_benchmarks)
+        self.tax_rules = tax_rules
+        self.competitor_benchmarks = list(benchmarks)
+        self.rule_version = version
+        if self._tax_index.changed_groups(previous_index):
+            self.tax_rules_version = version
         
+        memory = self.revenue_memory
+        count = len(memory)
+        business_type = memory.business_type[:count]
+        
+        # Months whose applicable tax rate moved, and months of business types whose benchmark moved
+        tax_changed = self._tax_index.changed_rows(
+            previous_index, business_type, memory.tax_type[:count], memory.revenue[:count] - memory.expenses[:count]
+        )
+        current_benchmarks = self._benchmark_revenue_by_type(self.competitor_benchmarks)
+        moved_types = [
+            BUSINESS_TYPE_CODES[bt] for bt in BusinessType if previous_benchmarks.get(bt) != current_benchmarks.get(bt)
+        ]
+        benchmark_changed = np.isin(business_type, moved_types)
+        
+        insights = []
+        for index in np.flatnonzero(tax_changed | benchmark_changed).tolist():
+            record = memory[index]
+            if tax_changed[index]:
+                insights.append(self._analyze_tax_impact(record))
+            if benchmark_changed[index]:
+                insights.append(self._compare_with_competitors(record))
+        insights = [insight for insight in insights if insight]
+        self._record_insights(insights)
+        
+        return {
+            "version": version,
+            "tax_rules_version": self.tax_rules_version,
+            "tax_months_recomputed": int(np.count_nonzero(tax_changed)),
+            "benchmark_months_recomputed": int(np.count_nonzero(benchmark_changed)),
+            "insights_generated": len(insights)
+        }
+    
+    @staticmethod
+    def _benchmark_revenue_by_type(benchmarks: List[CompetitorBenchmark]) -> Dict[BusinessType, float]:
+        """Average monthly revenue of the benchmark each business type is compared with (the first listed)"""
+        revenue = {}
+        for b in benchmarks:
+            revenue.setdefault(b.business_type, b.avg_monthly_revenue)
+        return revenue
+    
     def _load_default_tax_rules(self) -> List[TaxRule]:
         return [
             # Service Tax Rules
@@ -38,91 +176,217 @@ class LiveFinancialAgent:
         ]
     
     def process_document(self, file_content: bytes, filename: str) -> Dict:
-        """Extract financial data from PDF documents"""
+        """Extract financial data from PDF/DOCX documents"""
         try:
-            if filename.lower().endswith('.pdf'):
-                pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_content))
-                text = ""
-                for page in pdf_reader.pages:
-                    text += page.extract_text()
-                
-                # Simple extraction logic - can be enhanced with ML
-                extracted_data = self._extract_financial_data(text)
-                return {"status": "success", "extracted_data": extracted_data, "text": text[:500]}
-            else:
-                return {"status": "error", "message": "Only PDF files supported"}
+            suffix = os.path.splitext(filename)[1]
+            with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as spooled:
+                spooled.write(file_content)
+            try:
+                months, pages = extract_document(spooled.name, filename)
+            finally:
+                os.remove(spooled.name)
+            return {"status": "success", "extracted_data": months, "pages_scanned": pages}
         except Exception as e:
             return {"status": "error", "message": str(e)}
     
     def _extract_financial_data(self, text: str) -> Dict:
         """Basic financial data extraction from text"""
-        import re
-        
-        # Simple regex patterns for common financial terms
-        revenue_pattern = r'revenue[:\s]*\$?([0-9,]+(?:\.[0-9]{2})?)'
-        expense_pattern = r'expense[s]?[:\s]*\$?([0-9,]+(?:\.[0-9]{2})?)'
-        
-        revenue_match = re.search(revenue_pattern, text.lower())
-        expense_match = re.search(expense_pattern, text.lower())
+        return extract_figures(text)
+    
+    def ingest_document(self, path: str, filename: str, business_type: BusinessType, tax_type: TaxType,
+                        months: List[str] = None, default_month: str = None, on_page=None) -> Dict:
+        """Extract monthly figures from a statement and ingest them as revenue data"""
+        extracted, pages = extract_document(path, filename, months, default_month, on_page)
+        records = [
+            RevenueData(
+                month=month,
+                revenue=values['revenue'],
+                expenses=values['expenses'],
+                business_type=business_type,
+                tax_type=tax_type,
+                service_revenue=values['revenue'] if tax_type == TaxType.SERVICE_TAX else 0,
+                product_revenue=values['revenue'] if tax_type == TaxType.PRODUCT_TAX else 0
+            )
+            for month, values in extracted.items()
+        ]
+        self.ingest_batch(records, source_file=filename)
+        insights = self.analyze_pending()
+        return {
+            "months": list(extracted),
+            "rows_accepted": len(records),
+            "pages_scanned": pages,
+            "total_insights": len(insights)
+        }
+    
+    def ingest_revenue_data(self, revenue_data: RevenueData, source_file="manual") -> int:
+        """Live ingestion of revenue data with database persistence; returns the data version.
         
-        extracted = {}
-        if revenue_match:
-            extracted['revenue'] = float(revenue_match.group(1).replace(',', ''))
-        if expense_match:
-            extracted['expenses'] = float(expense_match.group(1).replace(',', ''))
-            
-        return extracted
+        A month already entered for the same business type and source is
+        corrected in place rather than counted twice.
+        """
+        return self.ingest_batch([revenue_data], source_file)
     
-    def ingest_revenue_data(self, revenue_data: RevenueData, source_file="manual"):
-        """Live ingestion of new revenue data with database persistence"""
-        self.revenue_memory.append(revenue_data)
-        self.db.save_revenue_data(revenue_data, source_file)  # Save to database with source
-        return self._trigger_analysis()
+    def ingest_revenue_group(self, records: List[RevenueData], source_file="manual") -> int:
+        """Live ingestion of several independent submissions with a single commit.
+        
+        Equivalent to calling ingest_revenue_data for each record in order;
+        returns the data version.
+        """
+        return self.ingest_batch(records, source_file)
     
-    def _trigger_analysis(self):
-        """Triggered whenever new data arrives"""
-        if not self.revenue_memory:
-            return
-            
-        latest_data = self.revenue_memory[-1]
-        insights = []
+    def ingest_batch(self, records: List[RevenueData], source_file="manual") -> int:
+        """Bulk ingestion: one transaction for all rows; returns the new data version.
         
-        # Calculate tax impact
-        tax_insight = self._analyze_tax_impact(latest_data)
-        if tax_insight:
-            insights.append(tax_insight)
+        `records` may also be validation.RevenueRow tuples, as uploads are.
+        Rows already stored for this source with the same values are skipped;
+        changed months replace the stored record. Insights are not generated
+        here (see analyze_pending). The database write happens before memory
+        is locked, so readers keep seeing the previous state until it commits.
+        """
+        if not records:
+            return self.data_version
         
-        # Analyze trends if we have historical data
-        if len(self.revenue_memory) > 1:
-            trend_insight = self._analyze_trends()
-            if trend_insight:
-                insights.append(trend_insight)
+        with self._write_lock:
+            inserted, updated = self.db.save_revenue_batch(records, source_file)
+            with self._lock:
+                return self._publish_batch(inserted, updated, source_file)
+    
+    def _publish_batch(self, inserted: List[RevenueData], updated: List[RevenueData], source_file: str) -> int:
+        """Apply rows just written to the database to memory and the running aggregates"""
+        # Swap corrected months in place so memory doesn't keep both versions
+        positions = []
+        for record in updated:
+            position = self._row_index.get((record.month, record.business_type, source_file))
+            if position is not None:
+                previous = self.revenue_memory[position]
+                self.aggregates.replace(previous, record)
+                self.trends.replace(previous, record)
+                self.forecasts.replace(previous, record)
+                self.revenue_memory[position] = record
+                positions.append(position)
+        positions.sort()
         
-        # Compare with competitors
-        competitor_insight = self._compare_with_competitors(latest_data)
-        if competitor_insight:
-            insights.append(competitor_insight)
+        start = len(self.revenue_memory)
+        self.revenue_memory.extend(inserted)
+        for position, record in enumerate(inserted, start):
+            self._row_index[(record.month, record.business_type, source_file)] = position
+            self.months.add(record, position)
+            self.aggregates.add(record)
+            self.trends.add(record)
+            self.forecasts.add(record)
+        positions.extend(range(start, len(self.revenue_memory)))
+        if not positions:
+            return self.data_version  # nothing new or changed
+        return self._mark_changed(positions[-1])
+    
+    def clear_all_data(self):
+        """Drop all stored and in-memory revenue data and insights"""
+        with self._write_lock, self._lock, self.insight_writer.paused(discard=True, tenant_id=self.tenant_id):
+            self.db.clear_all_data()
+            self.revenue_memory = RevenueStore()
+            self.insights_history.clear()
+            self._row_index = {}
+            self._changed_position = None
+            self.insights_version = self.data_version
+            self.aggregates.reset()
+            self.months.rebuild(self.revenue_memory)
+            self.trends.rebuild(self.revenue_memory)
+            self.forecasts.rebuild(self.revenue_memory)
+            self.insight_counts.rebuild([])
+    
+    def clear_loss_data(self):
+        """Drop loss-making months from memory"""
+        with self._lock:
+            memory = self.revenue_memory
+            kept = memory.revenue >= memory.expenses
+            self.revenue_memory = memory.filter(kept)
+            # Positions shift down by the number of removed rows before them
+            new_positions = np.cumsum(kept) - 1
+            self._row_index = {
+                key: int(new_positions[position]) for key, position in self._row_index.items() if kept[position]
+            }
+            if self._changed_position is not None:
+                if kept[self._changed_position]:
+                    self._changed_position = int(new_positions[self._changed_position])
+                else:
+                    # The record awaiting analysis was dropped
+                    self._changed_position = None
+                    self.insights_version = self.data_version
+            self.aggregates.rebuild(self.revenue_memory)
+            self.months.rebuild(self.revenue_memory)
+            self.trends.rebuild(self.revenue_memory)
+            self.forecasts.rebuild(self.revenue_memory)
+    
+    def clear_insights(self, insight_types):
+        """Drop insights of the given types, in memory, queued and stored"""
+        with self._lock, self.insight_writer.paused(discard=True, tenant_id=self.tenant_id, insight_types=insight_types):
+            self.insights_history.remove_types(insight_types)
+            self.insight_counts.remove_types(insight_types)
+            self.db.delete_insights(insight_types)
+    
+    def memory_bytes(self) -> int:
+        """Estimated size of the in-memory state"""
+        return (
+            AGENT_OVERHEAD_BYTES
+            + self.revenue_memory.nbytes()
+            + len(self.insights_history) * INSIGHT_BYTES
+            + len(self._row_index) * ROW_INDEX_ENTRY_BYTES
+            + len(self.months) * MONTH_INDEX_ENTRY_BYTES
+            + len(self.tax_memo) * TAX_MEMO_ENTRY_BYTES
+            + len(self.forecasts) * FORECAST_MODEL_BYTES
+        )
+    
+    def _mark_changed(self, position: int) -> int:
+        """Record that the data changed up to `position`; its analysis waits until insights are needed"""
+        self.data_version += 1
+        if self._changed_position is None or position > self._changed_position:
+            self._changed_position = position
+        return self.data_version
+    
+    @property
+    def insights_stale(self) -> bool:
+        return self.insights_version != self.data_version
+    
+    def analyze_pending(self) -> List[FinancialInsight]:
+        """Generate insights for the data as it is now, if they are stale; returns the new insights.
         
+        Only the newest changed record is analysed: in a bulk load, the
+        insights of every earlier record would be superseded straight away.
+        """
+        with self._lock:
+            if not self.insights_stale:
+                return []
+            version = self.data_version
+            insights = self._analyze_record(self._changed_position) if self._changed_position is not None else []
+            self._record_insights(insights)
+            self._changed_position = None
+            self.insights_version = version
+            return insights
+    
+    def _record_insights(self, insights: List[FinancialInsight]):
+        """Keep new insights in memory and counters; the database write happens in the background"""
         self.insights_history.extend(insights)
-        
-        # Save insights to database
-        for insight in insights:
-            self.db.save_insight(insight)
-            
-        return insights
+        self.insight_counts.add_all(insights)
+        self.insight_writer.submit(insights, self.tenant_id)
+    
+    def _analyze_record(self, index: int) -> List[FinancialInsight]:
+        """Run the analysis for the record at `index` as if it had just arrived"""
+        return self.pipeline.run(self, index)
     
     def _analyze_tax_impact(self, revenue_data: RevenueData) -> FinancialInsight:
         """Calculate monthly tax burden with separate service/product tax"""
+        # The result depends only on the month's figures and the tax rules in force
+        key = (
+            self.tax_rules_version, revenue_data.business_type, revenue_data.tax_type, revenue_data.revenue,
+            revenue_data.expenses, revenue_data.service_revenue, revenue_data.product_revenue
+        )
+        return self.tax_memo.get_or_compute(key, lambda: self._compute_tax_impact(revenue_data))
+    
+    def _compute_tax_impact(self, revenue_data: RevenueData) -> FinancialInsight:
         net_income = revenue_data.revenue - revenue_data.expenses
         
         # Find applicable tax rule
-        applicable_tax_rule = None
-        for rule in self.tax_rules:
-            if (rule.business_type == revenue_data.business_type and 
-                rule.tax_type == revenue_data.tax_type and
-                rule.income_bracket_min <= net_income <= rule.income_bracket_max):
-                applicable_tax_rule = rule
-                break
+        applicable_tax_rule = self._tax_index.find(revenue_data.business_type, revenue_data.tax_type, net_income)
         
         if not applicable_tax_rule:
             return None
@@ -147,12 +411,33 @@ class LiveFinancialAgent:
             confidence=0.9
         )
     
-    def _analyze_trends(self) -> FinancialInsight:
-        """Analyze revenue trends over time"""
-        if len(self.revenue_memory) < 2:
+    def _monthly_revenue(self, end: int, count: int) -> List[float]:
+        """Revenue of the latest `count` months of the business type of record `end - 1`, up to its month.
+        
+        Only records before position `end` count, as if that record had just
+        arrived. Months come from the month index, so records that arrived
+        out of order or were corrected are still compared in calendar order.
+        """
+        record = self.revenue_memory[end - 1]
+        ordinal = month_ordinal(record.month)
+        if ordinal == UNKNOWN_MONTH:
+            return self.revenue_memory.revenue[max(0, end - count):end].tolist()  # no calendar order to follow
+        revenue = self.revenue_memory.revenue
+        totals = []
+        for _, rows in self.months.last(count, record.business_type, upto=ordinal):
+            rows = [position for position in rows if position < end]
+            if rows:
+                totals.append(float(revenue[rows].sum()))
+        return totals
+    
+    def _analyze_trends(self, end: int = None) -> FinancialInsight:
+        """Analyze revenue trends over time (up to position `end` in memory)"""
+        if end is None:
+            end = len(self.revenue_memory)
+        if end < 2:
             return None
             
-        recent_revenues = [r.revenue for r in self.revenue_memory[-3:]]
+        recent_revenues = self._monthly_revenue(end, 3)
         if len(recent_revenues) >= 2:
             growth_rate = ((recent_revenues[-1] - recent_revenues[0]) / recent_revenues[0]) * 100
             
@@ -210,106 +495,199 @@ class LiveFinancialAgent:
             confidence=0.75
         )
     
-    def get_latest_insights(self, limit: int = 5) -> List[FinancialInsight]:
-        """Get most recent insights"""
-        return sorted(self.insights_history, key=lambda x: x.timestamp, reverse=True)[:limit]
+    def get_latest_insights(self, limit: int = 5, insight_type: str = None) -> List[FinancialInsight]:
+        """Get most recent insights, newest first, generating them first if the data changed"""
+        with self._lock:
+            self.analyze_pending()
+            history = self.insights_history
+            if history.complete or history.count(insight_type) >= limit:
+                return history.latest(limit, insight_type)
+            # Older than memory keeps: everything is in the database once the queue is written
+            self.insight_writer.flush()
+            return self.db.get_recent_insights(limit, insight_type)
+    
+    def get_insights(self, limit: int = 10, insight_type: str = None) -> Dict:
+        """Most recent insights, and whether they were regenerated for this call ("fresh") or already current ("cached")"""
+        with self._lock:
+            fresh = self.insights_stale
+            insights = self.get_latest_insights(limit, insight_type)
+            return {
+                "insights": insights,
+                "status": "fresh" if fresh else "cached",
+                "data_version": self.insights_version
+            }
+    
+    def get_trends(self, windows: List[int] = DEFAULT_TREND_WINDOWS) -> Dict:
+        """Moving averages, extremes and margin volatility over month windows, with MoM and YoY growth"""
+        return self.trends.summary(windows)
+    
+    def get_forecast(self, months: int = DEFAULT_FORECAST_MONTHS) -> Dict:
+        """Projected revenue, expenses and tax liability for the coming months, per business type and in total"""
+        with self._lock:
+            return self.forecasts.forecast(months, self._tax_index)
+    
+    def get_chart_data(self, months: int = CHART_MONTHS, month_range: str = None) -> Dict:
+        """Revenue and expenses per month, for the latest `months` or an inclusive "YYYY-MM..YYYY-MM" range"""
+        if month_range is not None:
+            start, stop = parse_month_range(month_range)
+        with self._lock:
+            rows = self.months.range(start, stop) if month_range is not None else self.months.last(months)
+            revenue = self.revenue_memory.revenue
+            expenses = self.revenue_memory.expenses
+            return {
+                "months": [month_label(ordinal) for ordinal, _ in rows],
+                "revenue": [float(revenue[positions].sum()) for _, positions in rows],
+                "expenses": [float(expenses[positions].sum()) for _, positions in rows]
+            }
+    
+    def latest_record(self) -> Optional[RevenueData]:
+        """The newest record of the latest month, or of arrival order if no month is YYYY-MM"""
+        with self._lock:
+            if not self.revenue_memory:
+                return None
+            position = self.months.latest_position()
+            return self.revenue_memory[position if position is not None else -1]
+    
+    def run_scenarios(self, grid: ScenarioGrid) -> Dict:
+        """What tax and net income over the history would have been under each change in `grid`, best first"""
+        with self._lock:
+            if not self.revenue_memory:
+                return {"status": "No data"}
+            # Evaluated on a snapshot so ingestion isn't held up meanwhile
+            history = self.revenue_memory.copy()
+            rule_sets = [("active", self._tax_index)]
+            benchmarks = list(self.competitor_benchmarks)
+        for version in grid.tax_rule_versions:
+            stored = self.db.get_rule_set(version)
+            if stored is None:
+                raise KeyError(f"Rule set version {version} not found")
+            rule_sets.append((f"version {version}", TaxRuleIndex(stored['tax_rules'])))
+        for number, rules in enumerate(grid.tax_rules, 1):
+            rule_sets.append((f"custom {number}", TaxRuleIndex(rules)))
+        return evaluate_scenarios(history, grid, rule_sets, benchmarks)
+    
+    def get_portfolio(self, group_by: List[str] = DEFAULT_PORTFOLIO_GROUPS, month_range: str = None) -> Dict:
+        """Totals per business, business type, tax type and/or month, from the stored rollups"""
+        start = stop = None
+        if month_range is not None:
+            first, last = parse_month_range(month_range)
+            start = month_label(first) if first != FIRST_MONTH else None
+            stop = month_label(last) if last != LAST_MONTH else None
+        rows = self.db.get_revenue_rollups(start, stop)
+        return portfolio_rollup(rows, group_by, self._tax_index, self.competitor_benchmarks)
     
     def get_profit_analysis(self) -> Dict:
-        """Dedicated profit analysis"""
-        if not self.revenue_memory:
-            return {"status": "No data"}
+        """Dedicated profit analysis, from the earliest to the latest month"""
+        with self._lock:
+            memory = self.revenue_memory
+            count = len(memory)
+            if not count:
+                return {"status": "No data"}
             
-        profits = [(r.revenue - r.expenses) for r in self.revenue_memory]
-        avg_profit = sum(profits) / len(profits)
-        profit_trend = ((profits[-1] - profits[0]) / profits[0] * 100) if len(profits) > 1 else 0
-        
-        # Compare with competitors
-        latest = self.revenue_memory[-1]
-        benchmark = next((b for b in self.competitor_benchmarks if b.business_type == latest.business_type), None)
+            # Month order, or arrival order if no month is YYYY-MM
+            first, last = self.months.first_position(), self.months.latest_position()
+            if last is None:
+                first, last = 0, count - 1
+            profits = memory.revenue[:count] - memory.expenses[:count]
+            first_profit, last_profit = float(profits[first]), float(profits[last])
+            avg_profit = float(profits.mean())
+            profit_trend = ((last_profit - first_profit) / first_profit * 100) if count > 1 else 0
+            
+            # Compare with competitors
+            latest = memory[last]
+            benchmark = next((b for b in self.competitor_benchmarks if b.business_type == latest.business_type), None)
         
         competitive_position = "Unknown"
         if benchmark:
             expected_profit = benchmark.avg_monthly_revenue * benchmark.avg_profit_margin
-            vs_competitors = ((profits[-1] - expected_profit) / expected_profit * 100)
+            vs_competitors = ((last_profit - expected_profit) / expected_profit * 100)
             competitive_position = f"{vs_competitors:+.1f}% vs industry average"
         
         return {
-            "current_profit": profits[-1],
+            "current_profit": last_profit,
             "average_profit": avg_profit,
             "profit_trend": profit_trend,
             "competitive_position": competitive_position,
-            "months_data": len(profits),
-            "profit_margin": (profits[-1] / latest.revenue * 100) if latest.revenue > 0 else 0
+            "months_data": count,
+            "profit_margin": (last_profit / latest.revenue * 100) if latest.revenue > 0 else 0
         }
     
     def get_loss_analysis(self) -> Dict:
         """Dedicated loss analysis"""
-        if not self.revenue_memory:
+        memory = self.revenue_memory
+        count = len(memory)
+        if not count:
             return {"status": "No data"}
             
-        losses = [max(0, r.expenses - r.revenue) for r in self.revenue_memory]
-        loss_months = [i for i, loss in enumerate(losses) if loss > 0]
+        losses = np.maximum(0.0, memory.expenses[:count] - memory.revenue[:count])
+        loss_months = int(np.count_nonzero(losses > 0))
         
         return {
-            "total_losses": sum(losses),
-            "loss_months_count": len(loss_months),
-            "biggest_loss": max(losses) if losses else 0,
-            "loss_trend": "Improving" if len(losses) > 1 and losses[-1] < losses[0] else "Stable",
-            "risk_level": "High" if len(loss_months) > len(self.revenue_memory) * 0.3 else "Low"
+            "total_losses": float(losses.sum()),
+            "loss_months_count": loss_months,
+            "biggest_loss": float(losses.max()),
+            "loss_trend": "Improving" if count > 1 and losses[-1] < losses[0] else "Stable",
+            "risk_level": "High" if loss_months > count * 0.3 else "Low"
         }
     
     def get_tax_analysis(self) -> Dict:
         """Dedicated tax analysis with service/product breakdown"""
-        if not self.revenue_memory:
+        with self._lock:
+            memory = self.revenue_memory
+            count = len(memory)
+            # Latest month, or the last record to arrive if no month is YYYY-MM
+            latest_position = self.months.latest_position()
+        if not count:
             return {"status": "No data"}
-            
-        tax_data = []
-        for revenue in self.revenue_memory:
-            net_income = revenue.revenue - revenue.expenses
-            
-            # Find applicable tax rule
-            tax_rule = None
-            for rule in self.tax_rules:
-                if (rule.business_type == revenue.business_type and 
-                    rule.tax_type == revenue.tax_type and
-                    rule.income_bracket_min <= net_income <= rule.income_bracket_max):
-                    tax_rule = rule
-                    break
-            
-            if tax_rule:
-                if revenue.tax_type == "service_tax":
-                    taxable = revenue.service_revenue or revenue.revenue
-                else:
-                    taxable = revenue.product_revenue or revenue.revenue
-                    
-                tax_amount = (taxable - revenue.expenses) * tax_rule.tax_rate
-                tax_data.append({
-                    "month": revenue.month,
-                    "tax_amount": tax_amount,
-                    "tax_rate": tax_rule.tax_rate * 100,
-                    "tax_type": revenue.tax_type
-                })
+        if latest_position is None:
+            latest_position = count - 1
+        
+        revenue = memory.revenue[:count]
+        expenses = memory.expenses[:count]
+        business_type = memory.business_type[:count]
+        tax_type = memory.tax_type[:count]
+        net_income = revenue - expenses
+        
+        # First matching rule per month; months without one are left out
+        rule_positions = self._tax_index.find_positions(business_type, tax_type, net_income)
+        matched = rule_positions >= 0
+        rates = np.where(matched, self._tax_index.rates_at(rule_positions), 0.0)
         
-        total_tax = sum(t["tax_amount"] for t in tax_data)
-        avg_tax_rate = sum(t["tax_rate"] for t in tax_data) / len(tax_data) if tax_data else 0
+        is_service = tax_type == TAX_TYPE_CODES[TaxType.SERVICE_TAX]
+        taxable = taxable_base(tax_type, revenue, memory.service_revenue[:count], memory.product_revenue[:count])
+        tax_amounts = (taxable - expenses) * rates
         
-        # Compare with competitors
-        latest = self.revenue_memory[-1]
+        rows = np.flatnonzero(matched)
+        tax_rates = rates[rows] * 100
+        months = memory.month_labels()
+        monthly_breakdown = [
+            {"month": months[row], "tax_amount": amount, "tax_rate": rate, "tax_type": TAX_TYPES[code]}
+            for row, amount, rate, code in zip(
+                rows.tolist(), tax_amounts[rows].tolist(), tax_rates.tolist(), tax_type[rows].tolist()
+            )
+        ]
+        
+        total_tax = float(tax_amounts[rows].sum())
+        avg_tax_rate = float(tax_rates.mean()) if len(rows) else 0
+        
+        # Compare the latest month with competitors
+        latest = memory[latest_position]
         benchmark = next((b for b in self.competitor_benchmarks if b.business_type == latest.business_type), None)
         tax_efficiency = "Unknown"
-        if benchmark and tax_data:
+        if benchmark and matched[latest_position]:
             competitor_tax_rate = benchmark.avg_tax_rate * 100
-            current_rate = tax_data[-1]["tax_rate"]
+            current_rate = float(rates[latest_position] * 100)
             tax_efficiency = "Better" if current_rate < competitor_tax_rate else "Needs Improvement"
         
+        service_months = int(np.count_nonzero(is_service[rows]))
         return {
             "total_tax_paid": total_tax,
             "average_tax_rate": avg_tax_rate,
             "tax_efficiency": tax_efficiency,
-            "monthly_breakdown": tax_data,
+            "monthly_breakdown": monthly_breakdown,
             "service_vs_product": {
-                "service_months": len([t for t in tax_data if t["tax_type"] == "service_tax"]),
-                "product_months": len([t for t in tax_data if t["tax_type"] == "product_tax"])
+                "service_months": service_months,
+                "product_months": len(rows) - service_months
             }
         }
     def get_financial_summary(self) -> Dict:
@@ -317,9 +695,9 @@ class LiveFinancialAgent:
         if not self.revenue_memory:
             return {"status": "No data available"}
         
-        latest = self.revenue_memory[-1]
-        total_revenue = sum(r.revenue for r in self.revenue_memory)
-        total_expenses = sum(r.expenses for r in self.revenue_memory)
+        latest = self.latest_record()
+        total_revenue = self.aggregates.total_revenue
+        total_expenses = self.aggregates.total_expenses
         
         return {
             "latest_month": latest.month,
@@ -328,6 +706,9 @@ class LiveFinancialAgent:
             "total_revenue": total_revenue,
             "total_expenses": total_expenses,
             "net_profit": total_revenue - total_expenses,
-            "months_tracked": len(self.revenue_memory),
-            "recent_insights": len([i for i in self.insights_history if i.timestamp > datetime.now() - timedelta(days=30)])
+            "months_tracked": self.aggregates.count,
+            "recent_insights": self.insight_counts.recent(),
+            "by_business_type": {
+                business_type: dict(group) for business_type, group in self.aggregates.by_business_type.items()
+            }
         }
\ No newline at end of file
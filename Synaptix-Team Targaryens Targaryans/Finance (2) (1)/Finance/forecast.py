@@ -0,0 +1,226 @@
+from typing import Dict, Optional, Tuple
+import numpy as np
+from models import RevenueData
+from revenue_store import RevenueStore, BUSINESS_TYPES, BUSINESS_TYPE_CODES, TAX_TYPE_CODES, UNKNOWN_MONTH, month_ordinal
+from tax_index import TaxRuleIndex, taxable_base
+from trends import month_label
+
+DEFAULT_FORECAST_MONTHS = 6
+MAX_FORECAST_MONTHS = 36
+SEASON_LENGTH = 12
+SEASONAL_SMOOTHING = 0.3  # weight of the newest residual in a calendar month's seasonal offset
+
+# Channels of every series: revenue, expenses, and the amount tax is charged on
+REVENUE, EXPENSES, TAXABLE = range(3)
+CHANNELS = 3
+
+
+def _fit(n, sx, sxx, sy, sxy):
+    """Least-squares intercept and slope from running sums; works on one step or arrays of steps"""
+    n = np.asarray(n, dtype=np.float64)
+    den = n * sxx - sx * sx
+    safe = np.where(den > 0, den, 1.0)
+    slope = np.where(np.expand_dims(den > 0, -1), (np.expand_dims(n, -1) * sxy - np.expand_dims(sx, -1) * sy)
+                     / np.expand_dims(safe, -1), 0.0)
+    intercept = (sy - slope * np.expand_dims(sx, -1)) / np.expand_dims(np.maximum(n, 1.0), -1)
+    return intercept, slope
+
+
+class SeriesModel:
+    """Trend and seasonality of one monthly series (a business type and tax type of one tenant).
+
+    The trend is a least-squares line kept as running sums, so adding to any
+    month updates it exactly. Seasonal offsets are exponentially smoothed
+    residuals from that line, one per calendar month, updated as each month
+    closes (a later month arrives). The latest month is still open.
+    """
+
+    __slots__ = ("origin", "latest", "current", "n", "sx", "sxx", "sy", "sxy", "season", "seen")
+
+    def __init__(self, origin: int):
+        self.origin = origin  # x = ordinal - origin keeps the sums small
+        self.latest = None
+        self.current = np.zeros(CHANNELS)  # totals of the open month
+        self.n = 0
+        self.sx = 0.0
+        self.sxx = 0.0
+        self.sy = np.zeros(CHANNELS)
+        self.sxy = np.zeros(CHANNELS)
+        self.season = np.zeros((SEASON_LENGTH, CHANNELS))
+        self.seen = np.zeros(SEASON_LENGTH, dtype=bool)
+
+    def add(self, ordinal: int, values: np.ndarray) -> bool:
+        """Add to a month's totals; False if that month already closed (the model needs a refit)"""
+        if self.latest is not None and ordinal < self.latest:
+            return False
+        x = ordinal - self.origin
+        if self.latest is None or ordinal > self.latest:
+            if self.latest is not None:
+                self._close()
+            self.latest = ordinal
+            self.current = np.zeros(CHANNELS)
+            self.n += 1
+            self.sx += x
+            self.sxx += x * x
+        self.current += values
+        self.sy += values
+        self.sxy += x * values
+        return True
+
+    def _close(self):
+        intercept, slope = _fit(self.n, self.sx, self.sxx, self.sy, self.sxy)
+        residual = self.current - (intercept + slope * (self.latest - self.origin))
+        month = self.latest % SEASON_LENGTH
+        if self.seen[month]:
+            self.season[month] += SEASONAL_SMOOTHING * (residual - self.season[month])
+        else:
+            self.season[month] = residual
+            self.seen[month] = True
+
+    @classmethod
+    def fit(cls, ordinals: np.ndarray, totals: np.ndarray) -> "SeriesModel":
+        """The state add() reaches after being given these monthly totals in order (ordinals ascending)"""
+        model = cls(int(ordinals[0]))
+        x = (ordinals - model.origin).astype(np.float64)
+        # Trend as it stood when each month closed
+        n = np.arange(1, len(x) + 1, dtype=np.float64)
+        sx, sxx = np.cumsum(x), np.cumsum(x * x)
+        sy, sxy = np.cumsum(totals, axis=0), np.cumsum(x[:, None] * totals, axis=0)
+        intercept, slope = _fit(n, sx, sxx, sy, sxy)
+        residuals = (totals - (intercept + slope * x[:, None]))[:-1]  # the last month is open
+        calendar = ordinals[:-1] % SEASON_LENGTH
+        for month in np.unique(calendar).tolist():
+            r = residuals[calendar == month]
+            # Exponential smoothing seeded with the first residual, as closed form weights
+            weights = SEASONAL_SMOOTHING * (1 - SEASONAL_SMOOTHING) ** np.arange(len(r) - 1, -1, -1)
+            weights[0] = (1 - SEASONAL_SMOOTHING) ** (len(r) - 1)
+            model.season[month] = weights @ r
+            model.seen[month] = True
+        model.latest = int(ordinals[-1])
+        model.current = totals[-1].copy()
+        model.n = len(x)
+        model.sx, model.sxx = float(sx[-1]), float(sxx[-1])
+        model.sy, model.sxy = sy[-1].copy(), sxy[-1].copy()
+        return model
+
+    def project(self, ordinals: np.ndarray) -> np.ndarray:
+        """(months, channels) projection for future month ordinals"""
+        intercept, slope = _fit(self.n, self.sx, self.sxx, self.sy, self.sxy)
+        projected = intercept + slope * (ordinals - self.origin)[:, None]
+        calendar = ordinals % SEASON_LENGTH
+        projected += np.where(self.seen[calendar][:, None], self.season[calendar], 0.0)
+        return np.maximum(projected, 0.0)
+
+
+class RevenueForecaster:
+    """Forecast models of one tenant, one per (business_type, tax_type) series.
+
+    Records for the latest month of their series (or a later one) update the
+    fitted state in O(1); one for an earlier month marks the forecaster
+    stale, and every series is refitted from the revenue columns on the next
+    forecast. Callers hold the agent lock.
+    """
+
+    def __init__(self, store: RevenueStore = None):
+        self.rebuild(store if store is not None else RevenueStore())
+
+    def rebuild(self, store: RevenueStore):
+        """Refit every series from the stored columns"""
+        self._store = store
+        self._models: Dict[Tuple[int, int], SeriesModel] = {}
+        self._stale = False
+        self._cache = {}
+        count = len(store)
+        months = store.month[:count]
+        known = months != UNKNOWN_MONTH
+        if not known.any():
+            return
+        business, tax, months = store.business_type[:count][known], store.tax_type[:count][known], months[known]
+        values = np.empty((len(months), CHANNELS))
+        values[:, REVENUE] = store.revenue[:count][known]
+        values[:, EXPENSES] = store.expenses[:count][known]
+        values[:, TAXABLE] = taxable_base(tax, values[:, REVENUE], store.service_revenue[:count][known],
+                                      store.product_revenue[:count][known])
+        # Monthly totals per series, series by series in month order
+        series_keys = business.astype(np.int64) * len(TAX_TYPE_CODES) + tax
+        groups, inverse = np.unique(np.stack([series_keys, months]), axis=1, return_inverse=True)
+        inverse = inverse.ravel()
+        totals = np.zeros((groups.shape[1], CHANNELS))
+        np.add.at(totals, inverse, values)
+        starts = np.flatnonzero(np.r_[True, groups[0, 1:] != groups[0, :-1]])
+        for start, stop in zip(starts.tolist(), np.r_[starts[1:], groups.shape[1]].tolist()):
+            key = divmod(int(groups[0, start]), len(TAX_TYPE_CODES))
+            self._models[key] = SeriesModel.fit(groups[1, start:stop], totals[start:stop])
+
+    def add(self, record: RevenueData, sign=1):
+        ordinal = month_ordinal(record.month)
+        if ordinal == UNKNOWN_MONTH:
+            return
+        self._cache.clear()
+        if self._stale:
+            return
+        key = (BUSINESS_TYPE_CODES[record.business_type], TAX_TYPE_CODES[record.tax_type])
+        tax_code = np.int8(key[1])
+        values = sign * np.array([
+            record.revenue, record.expenses,
+            float(taxable_base(tax_code, record.revenue, record.service_revenue, record.product_revenue))
+        ])
+        model = self._models.get(key)
+        if model is None:
+            model = self._models[key] = SeriesModel(ordinal)
+        if not model.add(ordinal, values):
+            self._stale = True  # a closed month changed
+
+    def replace(self, old: RevenueData, new: RevenueData):
+        """A stored month was corrected"""
+        self.add(old, sign=-1)
+        self.add(new)
+
+    def __len__(self):
+        return len(self._models)
+
+    def forecast(self, months: int, tax_index: TaxRuleIndex) -> Dict:
+        """Revenue, expenses and tax liability for the `months` after the latest month with data"""
+        if not 1 <= months <= MAX_FORECAST_MONTHS:
+            raise ValueError(f"Forecast horizon must be between 1 and {MAX_FORECAST_MONTHS} months")
+        cached: Optional[Tuple[TaxRuleIndex, Dict]] = self._cache.get(months)
+        if cached is not None and cached[0] is tax_index:
+            return cached[1]
+        if self._stale:
+            self.rebuild(self._store)
+        if not self._models:
+            return {"last_actual_month": None, "months": [], "revenue": [], "expenses": [], "net_income": [], "tax_liability": [],
+                    "by_business_type": {}}
+
+        keys = list(self._models)
+        latest = max(model.latest for model in self._models.values())
+        ordinals = np.arange(latest + 1, latest + 1 + months)
+        projected = np.stack([self._models[key].project(ordinals) for key in keys])  # (series, months, channels)
+        revenue, expenses, taxable = projected[..., REVENUE], projected[..., EXPENSES], projected[..., TAXABLE]
+
+        # Tax under the rules in force, looked up for every series and month at once
+        business_codes = np.repeat(np.array([key[0] for key in keys], dtype=np.int8), months)
+        tax_codes = np.repeat(np.array([key[1] for key in keys], dtype=np.int8), months)
+        positions = tax_index.find_positions(business_codes, tax_codes, (revenue - expenses).ravel())
+        rates = np.nan_to_num(tax_index.rates_at(positions)).reshape(revenue.shape)
+        tax = (taxable - expenses) * rates
+
+        by_business_type = {}
+        for code in sorted({key[0] for key in keys}):
+            rows = [i for i, key in enumerate(keys) if key[0] == code]
+            by_business_type[BUSINESS_TYPES[code].value] = {
+                "revenue": revenue[rows].sum(axis=0).tolist(),
+                "expenses": expenses[rows].sum(axis=0).tolist(),
+                "tax_liability": tax[rows].sum(axis=0).tolist()
+            }
+        result = {
+            "last_actual_month": month_label(latest),
+            "months": [month_label(ordinal) for ordinal in ordinals.tolist()],
+            "revenue": revenue.sum(axis=0).tolist(),
+            "expenses": expenses.sum(axis=0).tolist(),
+            "net_income": (revenue - expenses).sum(axis=0).tolist(),
+            "tax_liability": tax.sum(axis=0).tolist(),
+            "by_business_type": by_business_type
+        }
+        self._cache[months] = (tax_index, result)
+        return result
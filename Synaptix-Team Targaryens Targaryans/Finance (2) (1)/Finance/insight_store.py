@@ -0,0 +1,85 @@
+import heapq
+from collections import deque
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional
+from models import FinancialInsight
+
+# Insights kept in memory per tenant; older ones are read back from SQLite
+INSIGHT_RETENTION = 500
+
+
+class InsightStore:
+    """Recent insights of one tenant in arrival order, indexed by insight_type.
+
+    Each type has its own deque, so the latest N of a type is a walk back
+    from its tail and the latest N overall is a merge of those tails; no
+    query sorts. Past `retention` entries the oldest are dropped from memory.
+    Every insight is already persisted by the InsightWriter, so `complete`
+    tells callers whether older ones must be read from the database.
+    """
+
+    def __init__(self, insights: Iterable[FinancialInsight] = (), retention=INSIGHT_RETENTION, complete=True):
+        self.retention = retention
+        self.complete = complete  # False once anything older than memory exists only in the database
+        self._by_type: Dict[str, deque] = {}  # insight_type -> deque of (sequence, insight), oldest first
+        self._sequence = 0
+        self._size = 0
+        self.extend(insights)
+
+    def extend(self, insights: Iterable[FinancialInsight]):
+        for insight in insights:
+            self._sequence += 1
+            self._by_type.setdefault(insight.insight_type, deque()).append((self._sequence, insight))
+            self._size += 1
+        if self._size > self.retention:
+            self._evict()
+
+    def _evict(self):
+        while self._size > self.retention:
+            # The oldest entry is at the head of one of the (few) type deques
+            oldest_type = min(self._by_type, key=lambda t: self._by_type[t][0][0])
+            entries = self._by_type[oldest_type]
+            entries.popleft()
+            if not entries:
+                del self._by_type[oldest_type]
+            self._size -= 1
+            self.complete = False
+
+    def latest(self, limit: int, insight_type: Optional[str] = None) -> List[FinancialInsight]:
+        """Up to `limit` newest insights, newest first, optionally of one type"""
+        if limit <= 0:
+            return []
+        if insight_type is not None:
+            tails = [reversed(self._by_type.get(insight_type, ()))]
+        else:
+            tails = [reversed(entries) for entries in self._by_type.values()]
+        newest_first = heapq.merge(*tails, key=lambda entry: entry[0], reverse=True)
+        return [insight for _, insight in islice(newest_first, limit)]
+
+    def count(self, insight_type: Optional[str] = None) -> int:
+        if insight_type is None:
+            return self._size
+        return len(self._by_type.get(insight_type, ()))
+
+    def remove_types(self, insight_types: Iterable[str]) -> int:
+        """Drop every insight of the given types; returns how many were dropped"""
+        removed = 0
+        for insight_type in insight_types:
+            entries = self._by_type.pop(insight_type, None)
+            if entries:
+                removed += len(entries)
+        self._size -= removed
+        return removed
+
+    def clear(self):
+        self._by_type.clear()
+        self._size = 0
+        self.complete = True
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self) -> Iterator[FinancialInsight]:
+        """Oldest first"""
+        merged = heapq.merge(*self._by_type.values(), key=lambda entry: entry[0])
+        return (insight for _, insight in merged)
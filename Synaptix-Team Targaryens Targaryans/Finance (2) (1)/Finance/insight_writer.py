@@ -0,0 +1,147 @@
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterable
+from models import FinancialInsight
+
+# A flush is triggered by whichever comes first
+FLUSH_BATCH_SIZE = 500
+FLUSH_INTERVAL = 0.5  # seconds
+# Consecutive failed flushes after which the queued insights are dropped
+MAX_FLUSH_ATTEMPTS = 5
+
+logger = logging.getLogger(__name__)
+
+
+class InsightWriter:
+    """Write-behind persistence for derived insights.
+
+    Insights are queued in memory and written by a background thread in one
+    transaction per flush, so callers never wait on a commit. They can be
+    regenerated from revenue data, which makes losing the last unflushed
+    batch on a crash acceptable; a clean shutdown flushes everything. For the
+    same reason, a queue that still can't be written after `max_attempts`
+    flushes is logged and dropped rather than retried forever. One writer can serve every tenant: a flush commits all of them together.
+    """
+
+    def __init__(self, db, batch_size=FLUSH_BATCH_SIZE, interval=FLUSH_INTERVAL, max_attempts=MAX_FLUSH_ATTEMPTS):
+        self.db = db
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_attempts = max_attempts
+        self._attempts = 0  # consecutive failed flushes
+        self._pending = deque()
+        self._wakeup = threading.Condition()
+        self._write_lock = threading.Lock()  # held while a batch is being written
+        self._closed = False
+        self.flushes = 0
+        self.written = 0
+        self.failures = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self.last_flush_size = 0
+        self.last_flush_ms = 0.0
+        self._thread = threading.Thread(target=self._run, name="insight-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, insights: Iterable[FinancialInsight], tenant_id=None):
+        """Queue insights for the next flush, for `tenant_id` (the database's own tenant by default)"""
+        if tenant_id is None:
+            tenant_id = self.db.tenant_id
+        with self._wakeup:
+            if self._closed:
+                raise RuntimeError("Insight writer is closed")
+            self._pending.extend((tenant_id, insight) for insight in insights)
+            depth = len(self._pending)
+            self.max_depth = max(self.max_depth, depth)
+            if depth >= self.batch_size:
+                self._wakeup.notify()
+
+    def _take(self):
+        with self._wakeup:
+            batch = list(self._pending)
+            self._pending.clear()
+            return batch
+
+    def flush(self):
+        """Write everything queued so far, on the calling thread"""
+        with self._write_lock:
+            batch = self._take()
+            if not batch:
+                return
+            start = time.perf_counter()
+            try:
+                self.db.save_tenant_insights(batch)
+            except Exception as e:
+                self.failures += 1
+                self._attempts += 1
+                if self._attempts >= self.max_attempts:
+                    self._attempts = 0
+                    self.dropped += len(batch)
+                    logger.error("Dropping %d insights after %d failed flushes: %s", len(batch), self.max_attempts, e)
+                else:
+                    # Put the batch back so the next flush retries it
+                    with self._wakeup:
+                        self._pending.extendleft(reversed(batch))
+                raise
+            self._attempts = 0
+            self.flushes += 1
+            self.written += len(batch)
+            self.last_flush_size = len(batch)
+            self.last_flush_ms = round((time.perf_counter() - start) * 1000, 3)
+
+    def _run(self):
+        while True:
+            with self._wakeup:
+                if not self._closed and len(self._pending) < self.batch_size:
+                    self._wakeup.wait(self.interval)
+                closed = self._closed
+            try:
+                self.flush()
+            except Exception:
+                pass  # counted in failures; retried on the next tick
+            if closed:
+                return
+
+    @contextmanager
+    def paused(self, discard=False, tenant_id=None, insight_types=None):
+        """Hold off flushes, e.g. while clearing the table.
+        
+        With `discard`, what is queued is dropped: only `tenant_id`'s insights
+        if one is given, and of those only `insight_types` if given, otherwise everything.
+        """
+        with self._write_lock:
+            if discard:
+                batch = self._take()
+                if tenant_id is not None:
+                    kept = [
+                        item for item in batch
+                        if item[0] != tenant_id or (insight_types is not None and item[1].insight_type not in insight_types)
+                    ]
+                    with self._wakeup:
+                        self._pending.extendleft(reversed(kept))
+            yield
+
+    def close(self):
+        """Flush what is queued and stop the background thread"""
+        with self._wakeup:
+            self._closed = True
+            self._wakeup.notify()
+        self._thread.join()
+        self.flush()
+
+    def metrics(self) -> Dict:
+        return {
+            "queue_depth": len(self._pending),
+            "max_queue_depth": self.max_depth,
+            "flushes": self.flushes,
+            "insights_written": self.written,
+            "failed_flushes": self.failures,
+            "insights_dropped": self.dropped,
+            "last_flush_size": self.last_flush_size,
+            "last_flush_ms": self.last_flush_ms,
+            "batch_size": self.batch_size,
+            "flush_interval_seconds": self.interval
+        }
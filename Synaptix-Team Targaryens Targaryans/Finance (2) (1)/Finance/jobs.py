@@ -0,0 +1,229 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+from dataset_parser import CHUNK_SIZE, ingest_stream
+from document_extractor import document_page_count
+
+DOCUMENT_TYPES = ("pdf", "docx")
+
+# Finished jobs kept in memory for progress polling; older ones are served from file_uploads
+MAX_TRACKED_JOBS = 100
+
+
+class _CountingReader:
+    """Binary stream wrapper that reports how many bytes have been read"""
+
+    def __init__(self, stream, on_read):
+        self.stream = stream
+        self.on_read = on_read
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        self.on_read(len(data))
+        return data
+
+
+class IngestJob:
+    """Progress of one background dataset or document import"""
+
+    def __init__(self, tenant_id: int, filename: str, path: str, size: int, options: Dict = None):
+        self.id = uuid.uuid4().hex
+        self.tenant_id = tenant_id
+        self.filename = filename
+        self.file_type = filename.split('.')[-1].lower()
+        self.kind = "document" if self.file_type in DOCUMENT_TYPES else "dataset"
+        self.options = options or {}
+        self.path = path
+        # Datasets report progress in bytes read, documents in pages scanned
+        self.progress_unit = "pages" if self.kind == "document" else "bytes"
+        self.progress_total = None if self.kind == "document" else size
+        self.progress_done = 0
+        self.status = "queued"
+        self.rows_accepted = 0
+        self.rows_rejected = 0
+        self.insights_generated = 0
+        self.errors = []
+        self.error = None
+        self.result = {}
+        self.upload_id = None
+        self.after = None  # earlier import of the same file, which must finish first
+        self.done = threading.Event()
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def to_dict(self) -> Dict:
+        end = self.finished_at or time.time()
+        elapsed = end - self.started_at if self.started_at else 0.0
+        rows = self.rows_accepted + self.rows_rejected
+        if self.finished_at:
+            progress = 1.0
+        elif self.progress_total:
+            progress = round(min(self.progress_done / self.progress_total, 1.0), 4)
+        else:
+            progress = 0.0
+        return {
+            "job_id": self.id,
+            "filename": self.filename,
+            "status": self.status,
+            "progress": progress,
+            "progress_unit": self.progress_unit,
+            "progress_done": self.progress_done,
+            "progress_total": self.progress_total,
+            "rows_accepted": self.rows_accepted,
+            "rows_rejected": self.rows_rejected,
+            "insights_generated": self.insights_generated,
+            "rows_per_second": round(rows / elapsed, 1) if elapsed > 0 else 0.0,
+            "elapsed_seconds": round(elapsed, 3),
+            "errors": self.errors,
+            "error": self.error,
+            **self.result
+        }
+
+
+class IngestJobQueue:
+    """Runs dataset imports on a worker pool and tracks their progress, for every tenant"""
+
+    def __init__(self, tenants, blocking, max_workers=2):
+        self.tenants = tenants
+        self.blocking = blocking
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest")
+        self.jobs: Dict[str, IngestJob] = {}
+        self._latest: Dict[tuple, IngestJob] = {}  # (tenant, filename) -> its newest unfinished import
+        self._lock = threading.Lock()
+
+    async def submit_upload(self, upload, tenant_id: int, options: Dict = None) -> Dict:
+        """Spool an UploadFile to disk in chunks and queue it for ingestion into the tenant's data.
+        
+        Returns the job's progress, or the tenant's earlier import when the
+        latest import of this file had identical content. Imports of the same
+        file run in the order they were submitted.
+        """
+        fd, path = tempfile.mkstemp(suffix=f".{upload.filename.split('.')[-1]}")
+        size = 0
+        digest = hashlib.sha256()
+        try:
+            with os.fdopen(fd, "wb") as spooled:
+                while True:
+                    chunk = await upload.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    spooled.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+        except Exception:
+            os.remove(path)
+            raise
+        
+        content_hash = digest.hexdigest()
+        job, previous = await self.blocking.run(self.submit, tenant_id, path, upload.filename, size, content_hash, options)
+        if previous:
+            os.remove(path)
+            job = await self.blocking.run(self.get, previous['job_id'], tenant_id)
+            return {"duplicate": True, **(job or {"filename": previous['filename']})}
+        return {"duplicate": False, **job.to_dict()}
+
+    def _db(self, tenant_id: int):
+        return self.tenants.db.for_tenant(tenant_id)
+
+    def submit(self, tenant_id: int, path: str, filename: str, size: int, content_hash=None,
+               options: Dict = None):
+        """Queue an already spooled file; the job owns (and removes) `path`.
+
+        Returns (job, None), or (None, the latest import of this file) if it
+        had the same content; `path` is then left to the caller.
+        """
+        job = IngestJob(tenant_id, filename, path, size, options)
+        with self._lock:
+            # Claimed under the lock so jobs of one file queue up in the order they were recorded
+            job.upload_id, previous = self._db(tenant_id).claim_upload(filename, job.file_type, job.id, content_hash)
+            if previous:
+                return None, previous
+            job.after = self._latest.get((tenant_id, filename))
+            self._latest[(tenant_id, filename)] = job
+            self.jobs[job.id] = job
+            finished = [j for j in self.jobs.values() if j.finished_at]
+            for old in sorted(finished, key=lambda j: j.finished_at)[:max(0, len(self.jobs) - MAX_TRACKED_JOBS)]:
+                del self.jobs[old.id]
+        self.executor.submit(self._run, job)
+        return job, None
+
+    def get(self, job_id: str, tenant_id: int) -> Optional[Dict]:
+        """Live progress for one of the tenant's jobs, or its stored record once it is forgotten"""
+        job = self.jobs.get(job_id)
+        if job and job.tenant_id == tenant_id:
+            return job.to_dict()
+        upload = self._db(tenant_id).get_file_upload_by_job(job_id)
+        if upload:
+            return {
+                "job_id": job_id,
+                "filename": upload['filename'],
+                "status": upload['status'],
+                "rows_accepted": upload['records_count'],
+                "rows_rejected": upload['rows_rejected'],
+                "insights_generated": upload['insights_generated'],
+                "error": upload['error']
+            }
+        return None
+
+    def _run(self, job: IngestJob):
+        if job.after is not None:
+            # Queued on the pool before this one, so it is already running or done
+            job.after.done.wait()
+            job.after = None
+        job.status = "running"
+        job.started_at = time.time()
+        db = self._db(job.tenant_id)
+        db.update_file_upload(job.upload_id, "running", 0, 0)
+
+        def on_read(count):
+            job.progress_done += count
+
+        def on_page(pages):
+            job.progress_done = pages
+
+        def on_progress(accepted, rejected, insights):
+            job.rows_accepted = accepted
+            job.rows_rejected = rejected
+            job.insights_generated = insights
+
+        try:
+            agent = self.tenants.get(job.tenant_id)
+            if job.kind == "document":
+                job.progress_total = document_page_count(job.path, job.filename)
+                result = agent.ingest_document(job.path, job.filename, on_page=on_page, **job.options)
+                on_progress(result['rows_accepted'], 0, result['total_insights'])
+                job.result = {"months": result['months'], "pages_scanned": result['pages_scanned']}
+            else:
+                with open(job.path, "rb") as stream:
+                    result = ingest_stream(agent, _CountingReader(stream, on_read), job.filename, on_progress=on_progress)
+                job.errors = result['errors']
+            job.status = "completed"
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+            try:
+                os.remove(job.path)
+            except OSError:
+                pass
+            db.update_file_upload(
+                job.upload_id, job.status, job.rows_accepted, job.insights_generated,
+                rows_rejected=job.rows_rejected, error=job.error
+            )
+            with self._lock:
+                if self._latest.get((job.tenant_id, job.filename)) is job:
+                    del self._latest[(job.tenant_id, job.filename)]
+            job.done.set()
+            # The import may have pushed loaded tenants over the memory budget
+            self.tenants.trim()
+
+    def shutdown(self, wait=True):
+        """Stop accepting work and let running imports finish"""
+        self.executor.shutdown(wait=wait)
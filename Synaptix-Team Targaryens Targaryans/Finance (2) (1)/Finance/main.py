@@ -1,21 +1,38 @@
-from fastapi import FastAPI, HTTPException, Request, UploadFile, File, Form, Cookie
+from fastapi import FastAPI, HTTPException, Request, UploadFile, File, Form, Cookie, Depends, Query
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 import uvicorn
-from financial_agent import LiveFinancialAgent
-from models import RevenueData, BusinessType, TaxType
+from financial_agent import LiveFinancialAgent, CHART_MONTHS
+from database import DEFAULT_TENANT
+from tenants import TenantRegistry
+from models import RevenueData, BusinessType, TaxType, RuleSet, ScenarioGrid
 from sample_datasets import load_sample_dataset
+from jobs import IngestJobQueue
+from blocking import BlockingExecutor
+from revenue_batcher import RevenueBatcher
+from document_extractor import shutdown_pool as shutdown_document_pool
+from analyzers import AnalysisPipeline, configured_analyzers, shutdown_pool as shutdown_analysis_pool
+from pagination import DEFAULT_PAGE_SIZE
+from trends import DEFAULT_TREND_WINDOWS
+from forecast import DEFAULT_FORECAST_MONTHS
+from portfolio import DEFAULT_PORTFOLIO_GROUPS
 from auth import UserAuth, UserRegistration, UserLogin
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 app = FastAPI(title="Live Financial Memory Agent", version="1.0.0")
 templates = Jinja2Templates(directory="templates")
 
 # Global instances
-agent = LiveFinancialAgent()
+# Analyzers this deployment runs, from FINANCE_ANALYZERS (e.g. add "revenue_anomaly,revenue_outlook")
+analysis = AnalysisPipeline(configured_analyzers())
+tenants = TenantRegistry(pipeline=analysis)  # One agent per user, loaded on first request
 auth = UserAuth()
+# SQLite commits and history-wide analyses run here, never on the event loop
+blocking = BlockingExecutor()
+ingest_jobs = IngestJobQueue(tenants, blocking)
+revenue_batcher = RevenueBatcher(tenants, blocking)
 
 def get_current_user(session_token: Optional[str] = Cookie(None)):
     """Get current user from session"""
@@ -23,6 +40,24 @@ def get_current_user(session_token: Optional[str] = Cookie(None)):
         return None
     return auth.get_user_by_session(session_token)
 
+def current_tenant(session_token: Optional[str] = Cookie(None)) -> int:
+    """The logged-in user's tenant; requests without a session share the default tenant"""
+    user = get_current_user(session_token)
+    return user.id if user else DEFAULT_TENANT
+
+def require_admin(session_token: Optional[str] = Cookie(None)):
+    """The logged-in user, if allowed to change what every tenant shares (such as tax rules)"""
+    user = get_current_user(session_token)
+    if not user:
+        raise HTTPException(status_code=401, detail="Login required")
+    if not auth.is_admin(user):
+        raise HTTPException(status_code=403, detail="Only administrators can change tax rules")
+    return user
+
+async def tenant_agent(tenant_id: int = Depends(current_tenant)) -> LiveFinancialAgent:
+    """The calling tenant's agent, loaded from the database on first use"""
+    return tenants.loaded(tenant_id) or await blocking.run(tenants.get, tenant_id)
+
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request, session_token: Optional[str] = Cookie(None)):
     """Home page - login or dashboard"""
@@ -57,14 +92,14 @@ async def login_user(login_data: UserLogin):
     return result
 
 @app.get("/dashboard", response_class=HTMLResponse)
-async def dashboard(request: Request, session_token: Optional[str] = Cookie(None)):
+async def dashboard(request: Request, session_token: Optional[str] = Cookie(None), agent: LiveFinancialAgent = Depends(tenant_agent)):
     """Main dashboard - requires authentication"""
     user = get_current_user(session_token)
     if not user:
         return RedirectResponse(url="/")
     
-    summary = agent.get_financial_summary()
-    insights = agent.get_latest_insights()
+    summary = await blocking.run(agent.get_financial_summary)
+    insights = await blocking.run(agent.get_latest_insights)
     return templates.TemplateResponse("dashboard.html", {
         "request": request,
         "user": user,
@@ -73,16 +108,14 @@ async def dashboard(request: Request, session_token: Optional[str] = Cookie(None
     })
 
 @app.get("/user-dashboard", response_class=HTMLResponse)
-async def user_dashboard(request: Request, session_token: Optional[str] = Cookie(None)):
+async def user_dashboard(request: Request, session_token: Optional[str] = Cookie(None), agent: LiveFinancialAgent = Depends(tenant_agent)):
     """User's last data dashboard"""
     user = get_current_user(session_token)
     if not user:
         return RedirectResponse(url="/")
     
     # Get user's latest data
-    latest_data = None
-    if agent.revenue_memory:
-        latest_data = agent.revenue_memory[-1]
+    latest_data = await blocking.run(agent.latest_record)
     
     return templates.TemplateResponse("user_dashboard.html", {
         "request": request,
@@ -99,12 +132,13 @@ async def revenue_page(request: Request, session_token: Optional[str] = Cookie(N
     return templates.TemplateResponse("revenue.html", {"request": request, "user": user})
 
 @app.get("/tax-rules", response_class=HTMLResponse)
-async def tax_rules_page(request: Request, session_token: Optional[str] = Cookie(None)):
+async def tax_rules_page(request: Request, session_token: Optional[str] = Cookie(None), agent: LiveFinancialAgent = Depends(tenant_agent)):
     """Tax rules page"""
     user = get_current_user(session_token)
     if not user:
         return RedirectResponse(url="/")
-    return templates.TemplateResponse("tax_rules.html", {"request": request, "user": user})
+    rules = await blocking.run(agent.get_rule_sets)
+    return templates.TemplateResponse("tax_rules.html", {"request": request, "user": user, "rules": rules})
 
 @app.get("/competitors", response_class=HTMLResponse)
 async def competitors_page(request: Request, session_token: Optional[str] = Cookie(None)):
@@ -115,137 +149,265 @@ async def competitors_page(request: Request, session_token: Optional[str] = Cook
     return templates.TemplateResponse("competitors.html", {"request": request, "user": user})
 
 @app.get("/profit-analysis", response_class=HTMLResponse)
-async def profit_analysis(request: Request):
+async def profit_analysis(request: Request, agent: LiveFinancialAgent = Depends(tenant_agent)):
     """Dedicated profit analysis page"""
-    analysis = agent.get_profit_analysis()
+    analysis = await blocking.run(agent.get_profit_analysis)
     return templates.TemplateResponse("profit_analysis.html", {
         "request": request,
         "analysis": analysis
     })
 
 @app.get("/tax-analysis", response_class=HTMLResponse)
-async def tax_analysis(request: Request):
+async def tax_analysis(request: Request, agent: LiveFinancialAgent = Depends(tenant_agent)):
     """Dedicated tax analysis page"""
-    analysis = agent.get_tax_analysis()
+    analysis = await blocking.run(agent.get_tax_analysis)
     return templates.TemplateResponse("tax_analysis.html", {
         "request": request,
         "analysis": analysis
     })
 
 @app.get("/loss-analysis", response_class=HTMLResponse)
-async def loss_analysis(request: Request):
+async def loss_analysis(request: Request, agent: LiveFinancialAgent = Depends(tenant_agent)):
     """Dedicated loss analysis page"""
-    analysis = agent.get_loss_analysis()
+    analysis = await blocking.run(agent.get_loss_analysis)
     return templates.TemplateResponse("loss_analysis.html", {
         "request": request,
         "analysis": analysis
     })
 
 @app.get("/data-history", response_class=HTMLResponse)
-async def data_history(request: Request):
-    """Data history page showing all uploaded files"""
-    files = agent.db.get_all_file_uploads()
+async def data_history(request: Request, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE,
+                       agent: LiveFinancialAgent = Depends(tenant_agent)):
+    """Data history page showing uploaded files, newest first, one page at a time"""
+    try:
+        files = await blocking.run(agent.db.get_file_uploads_page, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return templates.TemplateResponse("data_history.html", {
         "request": request,
-        "files": files
+        "files": files['items'],
+        "next_cursor": files['next_cursor'],
+        "is_first_page": not cursor
     })
 
 @app.get("/file-details/{filename}", response_class=HTMLResponse)
-async def file_details(request: Request, filename: str):
-    """Show details of a specific uploaded file"""
-    records = agent.db.get_records_by_file(filename)
+async def file_details(request: Request, filename: str, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE,
+                       agent: LiveFinancialAgent = Depends(tenant_agent)):
+    """Show details of a specific uploaded file, one page of records at a time"""
+    try:
+        records = await blocking.run(agent.db.get_revenue_page, cursor, limit, source_file=filename)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return templates.TemplateResponse("file_details.html", {
         "request": request,
         "filename": filename,
-        "records": records
+        "records": records['items'],
+        "summary": await blocking.run(agent.db.get_file_summary, filename),
+        "next_cursor": records['next_cursor'],
+        "is_first_page": not cursor
     })
 
-@app.post("/api/upload-dataset")
-async def upload_dataset(file: UploadFile = File(...)):
-    """Upload and process dataset files (JSON/CSV)"""
+@app.get("/api/revenue-records")
+async def get_revenue_records(cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE,
+                              agent: LiveFinancialAgent = Depends(tenant_agent)):
+    """Stored revenue records ordered by month; pass next_cursor back to get the next page"""
     try:
-        content = await file.read()
-        
-        if file.filename.endswith('.json'):
-            import json
-            data = json.loads(content.decode('utf-8'))
-        elif file.filename.endswith('.csv'):
-            import csv
-            import io
-            csv_data = csv.DictReader(io.StringIO(content.decode('utf-8')))
-            data = list(csv_data)
-        else:
-            raise HTTPException(status_code=400, detail="Only JSON and CSV files supported")
-        
-        # Process each record
-        total_insights = 0
-        for record in data:
-            revenue_data = RevenueData(
-                month=record['month'],
-                revenue=float(record['revenue']),
-                expenses=float(record['expenses']),
-                business_type=BusinessType(record['business_type']),
-                tax_type=TaxType(record['tax_type']),
-                service_revenue=float(record.get('service_revenue', 0)),
-                product_revenue=float(record.get('product_revenue', 0))
-            )
-            insights = agent.ingest_revenue_data(revenue_data, source_file=file.filename)
-            total_insights += len(insights) if insights else 0
-        
-        # Save file upload record
-        agent.db.save_file_upload(file.filename, file.filename.split('.')[-1], len(data), total_insights)
-        
+        return await blocking.run(agent.db.get_revenue_page, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/file-uploads")
+async def get_file_uploads(cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE,
+                           agent: LiveFinancialAgent = Depends(tenant_agent)):
+    """Upload history, newest first; pass next_cursor back to get the next page"""
+    try:
+        return await blocking.run(agent.db.get_file_uploads_page, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/file-details/{filename}")
+async def get_file_details(filename: str, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE,
+                           agent: LiveFinancialAgent = Depends(tenant_agent)):
+    """Totals and one page of the records imported from a file"""
+    try:
+        records = await blocking.run(agent.db.get_revenue_page, cursor, limit, source_file=filename)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    summary = await blocking.run(agent.db.get_file_summary, filename)
+    return {"filename": filename, "summary": summary, **records}
+
+def job_response(job, message):
+    """Response for a queued import, or for a file that was already imported"""
+    status_url = f"/api/jobs/{job['job_id']}" if job.get('job_id') else None
+    if job['duplicate']:
         return {
-            "status": "success",
-            "message": f"Loaded {len(data)} records from {file.filename}",
-            "total_insights_generated": total_insights
+            "status": "duplicate",
+            "message": f"Identical content to already imported {job['filename']}",
+            "job_id": job.get('job_id'),
+            "status_url": status_url
         }
+    return {
+        "status": "accepted",
+        "message": message,
+        "job_id": job['job_id'],
+        "status_url": status_url
+    }
+
+@app.post("/api/upload-dataset", status_code=202)
+async def upload_dataset(file: UploadFile = File(...), tenant_id: int = Depends(current_tenant)):
+    """Accept a dataset file (JSON/CSV) and import it in the background"""
+    if not (file.filename.endswith('.json') or file.filename.endswith('.csv')):
+        raise HTTPException(status_code=400, detail="Only JSON and CSV files supported")
+    
+    try:
+        job = await ingest_jobs.submit_upload(file, tenant_id)
+        return job_response(job, f"Importing {file.filename}")
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@app.post("/api/upload-document", status_code=202)
+async def upload_document(
+    file: UploadFile = File(...),
+    business_type: BusinessType = Form(...),
+    tax_type: TaxType = Form(...),
+    months: Optional[str] = Form(None),
+    default_month: Optional[str] = Form(None),
+    tenant_id: int = Depends(current_tenant)
+):
+    """Accept a PDF/DOCX statement and extract its monthly figures in the background.
+    
+    `months` (comma separated YYYY-MM) lets extraction stop as soon as those
+    months are found; `default_month` applies to figures before any month heading.
+    """
+    if not file.filename.lower().endswith(('.pdf', '.docx')):
+        raise HTTPException(status_code=400, detail="Only PDF and DOCX documents supported")
+    
+    try:
+        options = {
+            "business_type": business_type,
+            "tax_type": tax_type,
+            "months": [m.strip() for m in months.split(',') if m.strip()] if months else None,
+            "default_month": default_month
+        }
+        job = await ingest_jobs.submit_upload(file, tenant_id, options)
+        return job_response(job, f"Extracting {file.filename}")
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str, tenant_id: int = Depends(current_tenant)):
+    """Progress, throughput and final counts of one of the tenant's background imports"""
+    job = await blocking.run(ingest_jobs.get, job_id, tenant_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
 @app.post("/api/revenue")
-async def add_revenue_data(revenue_data: RevenueData):
-    """Add new revenue data and trigger live analysis"""
+async def add_revenue_data(revenue_data: RevenueData, tenant_id: int = Depends(current_tenant)):
+    """Add new revenue data (committed together with concurrent submissions); insights follow once submissions pause"""
     try:
-        insights = agent.ingest_revenue_data(revenue_data)
+        version = await revenue_batcher.submit(revenue_data, tenant_id)
         return {
             "status": "success",
             "message": f"Revenue data for {revenue_data.month} processed",
-            "new_insights": len(insights) if insights else 0,
-            "insights": insights
+            "data_version": version,
+            "insights_pending": True
         }
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@app.get("/api/chart-data")
-async def get_chart_data():
-    """Get chart data for revenue trends"""
-    revenue_data = agent.revenue_memory
-    if not revenue_data:
-        return {"months": [], "revenue": [], "expenses": []}
+@app.get("/api/rules")
+async def get_rules(agent: LiveFinancialAgent = Depends(tenant_agent)):
+    """Active tax rules and benchmarks, and every stored rule set version"""
+    return await blocking.run(agent.get_rule_sets)
+
+@app.post("/api/rules", dependencies=[Depends(require_admin)])
+async def load_rules(rule_set: RuleSet):
+    """Store a new rule set version and apply it to every tenant, recomputing only the affected months"""
+    return await blocking.run(tenants.load_rule_set, rule_set, "api")
+
+@app.post("/api/rules/upload", dependencies=[Depends(require_admin)])
+async def upload_rules(file: UploadFile = File(...)):
+    """Load a rule set from a JSON file"""
+    if not file.filename.endswith('.json'):
+        raise HTTPException(status_code=400, detail="Only JSON rule sets supported")
     
-    months = [data.month for data in revenue_data[-12:]]  # Last 12 months
-    revenue = [data.revenue for data in revenue_data[-12:]]
-    expenses = [data.expenses for data in revenue_data[-12:]]
-    
-    return {"months": months, "revenue": revenue, "expenses": expenses}
+    try:
+        rule_set = RuleSet.model_validate_json(await file.read())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await blocking.run(tenants.load_rule_set, rule_set, file.filename)
+
+@app.post("/api/rules/{version}/activate", dependencies=[Depends(require_admin)])
+async def activate_rules(version: int):
+    """Switch to a stored rule set version, e.g. to roll back"""
+    try:
+        return await blocking.run(tenants.activate_rule_set, version)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Rule set version not found")
+
+@app.get("/api/chart-data")
+async def get_chart_data(month_range: Optional[str] = Query(None, alias="range"),
+                         agent: LiveFinancialAgent = Depends(tenant_agent)):
+    """Get chart data for revenue trends: monthly totals for the last 12 months, or ?range=2024-01..2024-06"""
+    try:
+        return await blocking.run(agent.get_chart_data, CHART_MONTHS, month_range)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/trends")
+async def get_trends(window: List[int] = Query(list(DEFAULT_TREND_WINDOWS)),
+                     agent: LiveFinancialAgent = Depends(tenant_agent)):
+    """Rolling month-window analytics; repeat `window` for several sizes, e.g. ?window=3&window=12"""
+    try:
+        return await blocking.run(agent.get_trends, window)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/forecast")
+async def get_forecast(months: int = DEFAULT_FORECAST_MONTHS, agent: LiveFinancialAgent = Depends(tenant_agent)):
+    """Revenue, expenses and tax liability projected `months` ahead"""
+    try:
+        return await blocking.run(agent.get_forecast, months)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/api/scenarios")
+async def run_scenarios(grid: ScenarioGrid, agent: LiveFinancialAgent = Depends(tenant_agent)):
+    """Evaluate every combination of revenue growth, expense change, service share and tax rules over the history, ranked"""
+    try:
+        return await blocking.run(agent.run_scenarios, grid)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Rule set version not found")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/portfolio")
+async def get_portfolio(group_by: List[str] = Query(list(DEFAULT_PORTFOLIO_GROUPS)),
+                        month_range: Optional[str] = Query(None, alias="range"),
+                        agent: LiveFinancialAgent = Depends(tenant_agent)):
+    """Revenue, expenses, profit, margin and tax per group; repeat `group_by` (business, business_type, tax_type, month)"""
+    try:
+        return await blocking.run(agent.get_portfolio, group_by, month_range)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/api/insights")
-async def get_insights(limit: int = 10):
-    """Get latest financial insights"""
-    insights = agent.get_latest_insights(limit)
-    return {"insights": insights}
+async def get_insights(limit: int = 10, insight_type: Optional[str] = None,
+                       agent: LiveFinancialAgent = Depends(tenant_agent)):
+    """Get latest financial insights, with whether they were regenerated for this request (fresh) or already current (cached)"""
+    return await blocking.run(agent.get_insights, limit, insight_type)
 
 @app.get("/api/summary")
-async def get_summary():
+async def get_summary(agent: LiveFinancialAgent = Depends(tenant_agent)):
     """Get financial summary"""
-    return agent.get_financial_summary()
+    return await blocking.run(agent.get_financial_summary)
 
 @app.post("/api/load-dataset/{dataset_type}")
-async def load_dataset(dataset_type: str):
+async def load_dataset(dataset_type: str, agent: LiveFinancialAgent = Depends(tenant_agent)):
     """Load different types of sample datasets"""
     try:
-        result = load_sample_dataset(agent, dataset_type)
+        result = await blocking.run(load_sample_dataset, agent, dataset_type)
         return {
             "status": "success",
             "message": f"Loaded {result['loaded_months']} months of {result['dataset_type']} data",
@@ -255,7 +417,7 @@ async def load_dataset(dataset_type: str):
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/api/demo-data")
-async def load_demo_data():
+async def load_demo_data(agent: LiveFinancialAgent = Depends(tenant_agent)):
     """Load sample data for demonstration"""
     demo_data = [
         RevenueData(month="2024-01", revenue=42000, expenses=28000, business_type=BusinessType.RETAIL, tax_type=TaxType.PRODUCT_TAX, product_revenue=42000),
@@ -264,10 +426,9 @@ async def load_demo_data():
         RevenueData(month="2024-04", revenue=52000, expenses=31000, business_type=BusinessType.SERVICES, tax_type=TaxType.SERVICE_TAX, service_revenue=52000),
     ]
     
-    total_insights = 0
-    for data in demo_data:
-        insights = agent.ingest_revenue_data(data)
-        total_insights += len(insights) if insights else 0
+    await blocking.run(agent.ingest_batch, demo_data, source_file="demo")
+    insights = await blocking.run(agent.analyze_pending)
+    total_insights = len(insights)
     
     return {
         "status": "success",
@@ -276,7 +437,7 @@ async def load_demo_data():
     }
 
 @app.get("/api/database-info")
-async def get_database_info():
+async def get_database_info(agent: LiveFinancialAgent = Depends(tenant_agent)):
     """Get database information and record counts"""
     try:
         import os
@@ -299,51 +460,68 @@ async def get_database_info():
     except Exception as e:
         return {"error": str(e)}
 
+@app.get("/api/metrics")
+async def get_metrics(agent: LiveFinancialAgent = Depends(tenant_agent)):
+    """Background write queue depth, flush, group-commit, tenant cache, tax memo and per-analyzer statistics"""
+    return {
+        "insight_writer": tenants.insight_writer.metrics(),
+        "revenue_batcher": revenue_batcher.metrics(),
+        "tenants": tenants.metrics(),
+        "tax_memo": agent.tax_memo.metrics(),
+        "analyzers": analysis.metrics()
+    }
+
 @app.post("/api/clear-loss-data")
-async def clear_loss_data():
+async def clear_loss_data(agent: LiveFinancialAgent = Depends(tenant_agent)):
     """Clear only loss-related data"""
     try:
         # Keep only profitable months in revenue memory
-        agent.revenue_memory = [r for r in agent.revenue_memory if r.revenue >= r.expenses]
+        await blocking.run(agent.clear_loss_data)
         return {"status": "success", "message": "Loss data cleared"}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/api/clear-profit-data")
-async def clear_profit_data():
+async def clear_profit_data(agent: LiveFinancialAgent = Depends(tenant_agent)):
     """Clear only profit-related data"""
     try:
         # Clear only insights related to profit/competitive analysis
-        agent.insights_history = [i for i in agent.insights_history if i.insight_type not in ['competitive_analysis', 'trend_analysis']]
+        await blocking.run(agent.clear_insights, ['competitive_analysis', 'trend_analysis'])
         return {"status": "success", "message": "Profit data cleared"}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/api/clear-tax-data")
-async def clear_tax_data():
+async def clear_tax_data(agent: LiveFinancialAgent = Depends(tenant_agent)):
     """Clear only tax-related data"""
     try:
         # Clear only insights related to tax
-        agent.insights_history = [i for i in agent.insights_history if i.insight_type != 'tax_analysis']
+        await blocking.run(agent.clear_insights, ['tax_analysis'])
         return {"status": "success", "message": "Tax data cleared"}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/api/clear-data")
-async def clear_data():
-    """Clear all data from database"""
+async def clear_data(agent: LiveFinancialAgent = Depends(tenant_agent)):
+    """Clear all of the tenant's data from database"""
     try:
-        agent.db.clear_all_data()
-        agent.revenue_memory = []
-        agent.insights_history = []
+        await blocking.run(agent.clear_all_data)
         return {"status": "success", "message": "All data cleared"}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@app.on_event("shutdown")
+def shutdown():
+    """Let in-flight imports finish, flush queued insights, then release workers and DB connections"""
+    ingest_jobs.shutdown()
+    revenue_batcher.flush_analyses()
+    blocking.shutdown()
+    shutdown_document_pool()
+    shutdown_analysis_pool()
+    tenants.close()
+
 # Clear all existing data on startup
-agent.db.clear_all_data()
-agent.revenue_memory = []
-agent.insights_history = []
+tenants.clear_all()
 
 if __name__ == "__main__":
     uvicorn.run(app, host="127.0.0.1", port=8000)
\ No newline at end of file
@@ -0,0 +1,208 @@
+"""
+Versioned schema migrations for FinancialDB.
+
+Each migration runs once, in order, inside its own transaction, and is
+recorded in the schema_version table. Add new steps to the end of
+MIGRATIONS; never edit a step that has shipped.
+"""
+
+
+def _columns(cursor, table):
+    cursor.execute(f'PRAGMA table_info({table})')
+    return {row[1] for row in cursor.fetchall()}
+
+
+def _add_column(cursor, table, name, definition):
+    """ALTER TABLE ... ADD COLUMN, for databases created before the column existed"""
+    if name not in _columns(cursor, table):
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN {name} {definition}')
+
+
+def _initial_schema(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS revenue_data (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            month TEXT NOT NULL,
+            revenue REAL NOT NULL,
+            expenses REAL NOT NULL,
+            business_type TEXT NOT NULL,
+            tax_type TEXT NOT NULL,
+            service_revenue REAL DEFAULT 0,
+            product_revenue REAL DEFAULT 0,
+            source_file TEXT DEFAULT 'manual',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS insights (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            insight_type TEXT NOT NULL,
+            title TEXT NOT NULL,
+            description TEXT NOT NULL,
+            impact TEXT NOT NULL,
+            recommendation TEXT NOT NULL,
+            confidence REAL NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS file_uploads (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            filename TEXT NOT NULL,
+            file_type TEXT NOT NULL,
+            records_count INTEGER NOT NULL,
+            insights_generated INTEGER NOT NULL,
+            upload_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+def _revenue_source_file(cursor):
+    # Databases created before uploads were tracked lack this column
+    _add_column(cursor, 'revenue_data', 'source_file', "TEXT DEFAULT 'manual'")
+
+
+def _upload_jobs_and_dedup(cursor):
+    _add_column(cursor, 'file_uploads', 'job_id', 'TEXT')
+    _add_column(cursor, 'file_uploads', 'status', "TEXT DEFAULT 'completed'")
+    _add_column(cursor, 'file_uploads', 'rows_rejected', 'INTEGER DEFAULT 0')
+    _add_column(cursor, 'file_uploads', 'error', 'TEXT')
+    _add_column(cursor, 'file_uploads', 'content_hash', 'TEXT')
+    # Per-row keys of file-sourced revenue data, used to skip re-uploaded rows
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS revenue_row_keys (
+            month TEXT NOT NULL,
+            business_type TEXT NOT NULL,
+            source_file TEXT NOT NULL,
+            row_hash TEXT NOT NULL,
+            PRIMARY KEY (source_file, month, business_type)
+        )
+    ''')
+
+
+def _hot_query_indexes(cursor):
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_revenue_month ON revenue_data (month)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_revenue_source_month ON revenue_data (source_file, month)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_insights_created ON insights (created_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_insights_type ON insights (insight_type)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_uploads_job ON file_uploads (job_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_uploads_hash ON file_uploads (content_hash)')
+
+
+def _rule_sets(cursor):
+    # Versioned tax rule and benchmark sets; the active one is flagged
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS rule_sets (
+            version INTEGER PRIMARY KEY AUTOINCREMENT,
+            tax_rules TEXT NOT NULL,
+            competitor_benchmarks TEXT NOT NULL,
+            source TEXT,
+            active INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+def _tenant_partitioning(cursor):
+    # Rows stored before tenants existed belong to the default tenant (0)
+    for table in ('revenue_data', 'insights', 'file_uploads'):
+        _add_column(cursor, table, 'tenant_id', 'INTEGER NOT NULL DEFAULT 0')
+    # Row keys are unique per tenant; SQLite can't change a primary key in place
+    cursor.execute('ALTER TABLE revenue_row_keys RENAME TO revenue_row_keys_untenanted')
+    cursor.execute('''
+        CREATE TABLE revenue_row_keys (
+            tenant_id INTEGER NOT NULL DEFAULT 0,
+            month TEXT NOT NULL,
+            business_type TEXT NOT NULL,
+            source_file TEXT NOT NULL,
+            row_hash TEXT NOT NULL,
+            PRIMARY KEY (tenant_id, source_file, month, business_type)
+        )
+    ''')
+    cursor.execute('''
+        INSERT INTO revenue_row_keys (month, business_type, source_file, row_hash)
+        SELECT month, business_type, source_file, row_hash FROM revenue_row_keys_untenanted
+    ''')
+    cursor.execute('DROP TABLE revenue_row_keys_untenanted')
+    # Every hot query is now scoped to one tenant, so its index leads with tenant_id
+    for index in ('idx_revenue_month', 'idx_revenue_source_month', 'idx_insights_created', 'idx_uploads_hash'):
+        cursor.execute(f'DROP INDEX IF EXISTS {index}')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_revenue_tenant_month ON revenue_data (tenant_id, month)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_revenue_tenant_source_month ON revenue_data (tenant_id, source_file, month)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_insights_tenant_created ON insights (tenant_id, created_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_uploads_tenant ON file_uploads (tenant_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_uploads_tenant_hash ON file_uploads (tenant_id, content_hash)')
+
+
+def _insight_type_index(cursor):
+    # Per-type insight reads and clears are scoped to one tenant and newest first
+    cursor.execute('DROP INDEX IF EXISTS idx_insights_type')
+    cursor.execute(
+        'CREATE INDEX IF NOT EXISTS idx_insights_tenant_type_created ON insights (tenant_id, insight_type, created_at)'
+    )
+
+
+def _revenue_rollups(cursor):
+    # Revenue totals per business (source), business type, tax type and month, kept up to date on every write
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS revenue_rollups (
+            tenant_id INTEGER NOT NULL,
+            source_file TEXT NOT NULL,
+            business_type TEXT NOT NULL,
+            tax_type TEXT NOT NULL,
+            month TEXT NOT NULL,
+            records INTEGER NOT NULL,
+            revenue REAL NOT NULL,
+            expenses REAL NOT NULL,
+            service_revenue REAL NOT NULL,
+            product_revenue REAL NOT NULL,
+            PRIMARY KEY (tenant_id, source_file, business_type, tax_type, month)
+        )
+    ''')
+    cursor.execute('''
+        INSERT INTO revenue_rollups
+        SELECT tenant_id, COALESCE(source_file, 'manual'), business_type, tax_type, month, COUNT(*),
+               SUM(revenue), SUM(expenses), SUM(COALESCE(service_revenue, 0)), SUM(COALESCE(product_revenue, 0))
+        FROM revenue_data
+        GROUP BY tenant_id, COALESCE(source_file, 'manual'), business_type, tax_type, month
+    ''')
+
+
+def _upload_filename_index(cursor):
+    # Re-uploads are compared with the latest import of the same file, not looked up by content hash
+    cursor.execute('DROP INDEX IF EXISTS idx_uploads_tenant_hash')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_uploads_tenant_filename ON file_uploads (tenant_id, filename)')
+
+
+# (version, description, step)
+MIGRATIONS = [
+    (1, "initial schema", _initial_schema),
+    (2, "revenue_data.source_file", _revenue_source_file),
+    (3, "upload job status and content-hash dedup", _upload_jobs_and_dedup),
+    (4, "indexes for hot queries", _hot_query_indexes),
+    (5, "versioned rule sets", _rule_sets),
+    (6, "tenant partitioning", _tenant_partitioning),
+    (7, "per-tenant insight type index", _insight_type_index),
+    (8, "revenue rollups", _revenue_rollups),
+    (9, "upload dedup by latest import of a file", _upload_filename_index),
+]
+
+
+def current_version(cursor) -> int:
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('SELECT MAX(version) FROM schema_version')
+    return cursor.fetchone()[0] or 0
+
+
+def pending_migrations(version: int):
+    return [m for m in MIGRATIONS if m[0] > version]
+
+
+def record_migration(cursor, version: int, description: str):
+    cursor.execute('INSERT INTO schema_version (version, description) VALUES (?, ?)', (version, description))
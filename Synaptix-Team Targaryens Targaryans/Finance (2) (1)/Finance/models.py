@@ -39,6 +39,23 @@ class CompetitorBenchmark(BaseModel):
     market_segment: str
     data_source: str
 
+class RuleSet(BaseModel):
+    # A part left out keeps the currently active one
+    tax_rules: Optional[List[TaxRule]] = None
+    competitor_benchmarks: Optional[List[CompetitorBenchmark]] = None
+
+class ScenarioGrid(BaseModel):
+    # Every combination of the listed values is one scenario; changes are fractions, e.g. -0.1 for a 10% cut
+    revenue_growth: List[float] = [0.0]
+    expense_change: List[float] = [0.0]
+    # Share of revenue earned from services; None keeps each month's recorded split
+    service_share: List[Optional[float]] = [None]
+    # Tax rules tried besides the active ones: stored rule set versions, and rule lists given inline
+    tax_rule_versions: List[int] = []
+    tax_rules: List[List[TaxRule]] = []
+    rank_by: str = "net_income"
+    top: int = 10
+
 class FinancialInsight(BaseModel):
     insight_type: str
     title: str
@@ -0,0 +1,131 @@
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from models import RevenueData, BusinessType
+from revenue_store import RevenueStore, BUSINESS_TYPE_CODES, MONTH_PATTERN, UNKNOWN_MONTH, month_ordinal
+
+# Bounds of a month range left open at either end
+FIRST_MONTH = 0
+LAST_MONTH = int(np.iinfo(np.int32).max)
+
+# A month and the positions in revenue_memory of its records, oldest first
+MonthRows = Tuple[int, List[int]]
+
+
+def parse_month_range(text: str) -> Tuple[int, int]:
+    """Month ordinals of an inclusive "YYYY-MM..YYYY-MM" range; either end may be left open"""
+    start, separator, stop = text.partition("..")
+    if not separator:
+        start = stop = text
+    bounds = []
+    for label, default in ((start.strip(), FIRST_MONTH), (stop.strip(), LAST_MONTH)):
+        if not label:
+            bounds.append(default)
+        elif MONTH_PATTERN.match(label) and 1 <= int(label[5:]) <= 12:
+            bounds.append(month_ordinal(label))
+        else:
+            raise ValueError(f"Month range must look like 2024-01..2024-06, got {text!r}")
+    if bounds[0] > bounds[1]:
+        raise ValueError(f"Month range starts after it ends: {text!r}")
+    return bounds[0], bounds[1]
+
+
+class MonthIndex:
+    """Positions of revenue records ordered by month, per business type.
+
+    Each business type keeps its months as a sorted list with the record
+    positions of each month alongside, so finding a month is a bisect
+    (O(log n)) and a range of k months is a slice. Records arrive in any
+    order: an earlier month is inserted in place, and another record for a
+    month already indexed joins that month. Records whose month is not
+    YYYY-MM are not indexed.
+    """
+
+    def __init__(self, store: RevenueStore = None):
+        self.rebuild(store if store is not None else RevenueStore())
+
+    def rebuild(self, store: RevenueStore):
+        """Index every stored record, e.g. after records were removed"""
+        count = len(store)
+        months = store.month[:count]
+        codes = store.business_type[:count]
+        self._months: Dict[int, List[int]] = {}  # business type code -> month ordinals, ascending
+        self._rows: Dict[int, List[List[int]]] = {}  # business type code -> positions of each of those months
+        known = np.flatnonzero(months != UNKNOWN_MONTH)
+        order = known[np.lexsort((known, months[known], codes[known]))]  # by business type, month, position
+        business_starts = np.flatnonzero(np.r_[True, np.diff(codes[order]) != 0]) if len(order) else []
+        for rows in np.split(order, business_starts[1:]):
+            if not len(rows):
+                continue
+            ordinals, starts = np.unique(months[rows], return_index=True)
+            code = int(codes[rows[0]])
+            self._months[code] = ordinals.tolist()
+            self._rows[code] = [chunk.tolist() for chunk in np.split(rows, starts[1:])]
+        self._size = len(order)
+
+    def add(self, record: RevenueData, position: int):
+        """Index the record stored at `position`"""
+        ordinal = month_ordinal(record.month)
+        if ordinal == UNKNOWN_MONTH:
+            return
+        code = BUSINESS_TYPE_CODES[record.business_type]
+        months = self._months.setdefault(code, [])
+        rows = self._rows.setdefault(code, [])
+        i = bisect_left(months, ordinal)
+        if i < len(months) and months[i] == ordinal:
+            rows[i].append(position)
+        else:
+            months.insert(i, ordinal)
+            rows.insert(i, [position])
+        self._size += 1
+
+    def __len__(self):
+        """Records indexed"""
+        return self._size
+
+    def _codes(self, business_type: Optional[BusinessType]) -> List[int]:
+        if business_type is None:
+            return list(self._months)
+        code = BUSINESS_TYPE_CODES[business_type]
+        return [code] if code in self._months else []
+
+    @staticmethod
+    def _combine(per_business: List[Iterator[MonthRows]]) -> List[MonthRows]:
+        """Months of several business types in calendar order, with a month's positions combined"""
+        combined: Dict[int, List[int]] = {}
+        for entries in per_business:
+            for ordinal, rows in entries:
+                other = combined.get(ordinal)
+                combined[ordinal] = rows if other is None else sorted(other + rows)
+        return [(ordinal, list(combined[ordinal])) for ordinal in sorted(combined)]
+
+    def range(self, start: int, stop: int, business_type: BusinessType = None) -> List[MonthRows]:
+        """Months from `start` to `stop` inclusive (ordinals), oldest first"""
+        per_business = []
+        for code in self._codes(business_type):
+            months = self._months[code]
+            i, j = bisect_left(months, start), bisect_right(months, stop)
+            per_business.append(zip(months[i:j], self._rows[code][i:j]))
+        return self._combine(per_business)
+
+    def last(self, count: int, business_type: BusinessType = None, upto: int = None) -> List[MonthRows]:
+        """The latest `count` months (up to and including `upto` if given), oldest first"""
+        if count <= 0:
+            return []
+        per_business = []
+        for code in self._codes(business_type):
+            months = self._months[code]
+            end = len(months) if upto is None else bisect_right(months, upto)
+            begin = max(0, end - count)
+            per_business.append(zip(months[begin:end], self._rows[code][begin:end]))
+        return self._combine(per_business)[-count:]
+
+    def latest_position(self) -> Optional[int]:
+        """Position of the newest record of the latest month, or None if nothing is indexed"""
+        latest = self.last(1)
+        return latest[0][1][-1] if latest else None
+
+    def first_position(self) -> Optional[int]:
+        """Position of the oldest record of the earliest month, or None if nothing is indexed"""
+        firsts = [(months[0], self._rows[code][0][0]) for code, months in self._months.items() if months]
+        return min(firsts)[1] if firsts else None
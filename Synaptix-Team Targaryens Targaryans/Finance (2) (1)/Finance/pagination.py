@@ -0,0 +1,47 @@
+import base64
+import json
+from typing import Optional
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def clamp_limit(limit: Optional[int]) -> int:
+    """Page size within [1, MAX_PAGE_SIZE]"""
+    if not limit:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(int(limit), MAX_PAGE_SIZE))
+
+
+def encode_cursor(*values) -> str:
+    """Opaque token for the sort key of the last row on a page"""
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: Optional[str], size: int) -> Optional[list]:
+    """Sort key from a cursor token; raises ValueError on a malformed token"""
+    if not token:
+        return None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def page(items, limit, key) -> dict:
+    """Build a page from up to `limit + 1` fetched rows.
+
+    The extra row only signals that another page exists; `key(item)` gives
+    the sort key the next page continues after.
+    """
+    has_more = len(items) > limit
+    items = items[:limit]
+    return {
+        "items": items,
+        "next_cursor": encode_cursor(*key(items[-1])) if has_more else None,
+        "limit": limit
+    }
@@ -0,0 +1,98 @@
+from typing import Dict, List, Sequence
+import numpy as np
+from models import BusinessType, TaxType, CompetitorBenchmark
+from revenue_store import BUSINESS_TYPE_CODES, TAX_TYPE_CODES
+from tax_index import TaxRuleIndex, taxable_base
+
+# What rollups can be grouped by; a business is the source its records came from (an upload, or "manual")
+PORTFOLIO_DIMENSIONS = ("business", "business_type", "tax_type", "month")
+DEFAULT_PORTFOLIO_GROUPS = ("business",)
+
+# Summed per group; profit, margin and net income are derived from them
+_MEASURES = ("records", "revenue", "expenses", "tax")
+
+
+def _codes(labels: Sequence[str], enum, codes: Dict) -> np.ndarray:
+    """Category codes for stored enum values, converting each distinct value once"""
+    distinct, inverse = np.unique(np.asarray(labels), return_inverse=True)
+    return np.array([codes[enum(label)] for label in distinct.tolist()], dtype=np.int8)[inverse.ravel()]
+
+
+def _figures(sums: Dict[str, float]) -> Dict:
+    profit = sums["revenue"] - sums["expenses"]
+    return {
+        "records": int(sums["records"]),
+        "revenue": sums["revenue"],
+        "expenses": sums["expenses"],
+        "profit": profit,
+        "margin": profit * 100 / sums["revenue"] if sums["revenue"] else 0.0,
+        "tax": sums["tax"],
+        "net_income": profit - sums["tax"]
+    }
+
+
+def portfolio_rollup(rows: List[tuple], group_by: Sequence[str], tax_index: TaxRuleIndex,
+                     benchmarks: List[CompetitorBenchmark]) -> Dict:
+    """Revenue, expense, profit, margin and tax totals per group of `group_by` dimensions.
+
+    `rows` come from FinancialDB.get_revenue_rollups: one per business,
+    business type, tax type and month. Each row's tax is its month's tax
+    under `tax_index`, as in get_tax_analysis. Grouping is vectorised: each
+    dimension's values become integer codes, combined into one key per row,
+    and every measure is summed with a single bincount.
+    """
+    group_by = list(dict.fromkeys(group_by))
+    unknown = [dimension for dimension in group_by if dimension not in PORTFOLIO_DIMENSIONS]
+    if unknown:
+        raise ValueError(f"Cannot group by {', '.join(unknown)}; choose from {', '.join(PORTFOLIO_DIMENSIONS)}")
+    if not rows:
+        return {"group_by": group_by, "groups": [], "totals": _figures(dict.fromkeys(_MEASURES, 0.0))}
+
+    source, business_type, tax_type, month, records, revenue, expenses, service_revenue, product_revenue = zip(*rows)
+    labels = {"business": source, "business_type": business_type, "tax_type": tax_type, "month": month}
+    revenue, expenses = np.array(revenue, dtype=np.float64), np.array(expenses, dtype=np.float64)
+    business_codes = _codes(business_type, BusinessType, BUSINESS_TYPE_CODES)
+    tax_codes = _codes(tax_type, TaxType, TAX_TYPE_CODES)
+
+    # Months without a matching rule pay no tax
+    rates = np.nan_to_num(tax_index.rates_at(tax_index.find_positions(business_codes, tax_codes, revenue - expenses)))
+    taxable = taxable_base(tax_codes, revenue, np.array(service_revenue, dtype=np.float64),
+                           np.array(product_revenue, dtype=np.float64))
+    measures = {
+        "records": np.array(records, dtype=np.float64),
+        "revenue": revenue,
+        "expenses": expenses,
+        "tax": (taxable - expenses) * rates
+    }
+
+    values, codes = [], []
+    for dimension in group_by:
+        distinct, inverse = np.unique(np.asarray(labels[dimension]), return_inverse=True)
+        values.append(distinct.tolist())
+        codes.append(inverse.ravel())
+    if group_by:
+        keys = np.ravel_multi_index(codes, [len(v) for v in values])
+        groups, inverse = np.unique(keys, return_inverse=True)
+        group_codes = [c.tolist() for c in np.unravel_index(groups, [len(v) for v in values])]
+    else:
+        groups, inverse, group_codes = np.zeros(1), np.zeros(len(revenue), dtype=np.int64), []
+    sums = {name: np.bincount(inverse.ravel(), weights=column, minlength=len(groups)).tolist()
+            for name, column in measures.items()}
+
+    benchmark_margins = {}
+    for b in benchmarks:
+        benchmark_margins.setdefault(b.business_type.value, b.avg_profit_margin * 100)
+    result = []
+    for g in range(len(groups)):
+        group = {dimension: values[d][group_codes[d][g]] for d, dimension in enumerate(group_by)}
+        group.update(_figures({name: sums[name][g] for name in _MEASURES}))
+        if "business_type" in group:
+            benchmark = benchmark_margins.get(group["business_type"])
+            group["benchmark_margin"] = benchmark
+            group["margin_vs_benchmark"] = group["margin"] - benchmark if benchmark is not None else None
+        result.append(group)
+    return {
+        "group_by": group_by,
+        "groups": result,
+        "totals": _figures({name: float(measures[name].sum()) for name in _MEASURES})
+    }
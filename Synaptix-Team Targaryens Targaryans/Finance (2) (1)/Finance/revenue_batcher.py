@@ -0,0 +1,123 @@
+import asyncio
+from collections import Counter, defaultdict
+from typing import Dict
+from models import RevenueData
+
+# A group is committed when it reaches MAX_GROUP_SIZE records or MAX_GROUP_DELAY
+# after its first record arrived, whichever comes first
+MAX_GROUP_SIZE = 256
+MAX_GROUP_DELAY = 0.005  # seconds
+# Insights are regenerated once submissions for a tenant have paused this long
+INSIGHT_DEBOUNCE = 1.0  # seconds
+
+
+class RevenueBatcher:
+    """Groups concurrent single-record submissions into one commit and analysis pass.
+
+    Each caller awaits the commit of its record and gets the resulting data
+    version. A lone request waits at most MAX_GROUP_DELAY; under load, many
+    requests share one transaction. Groups are formed per tenant, since each
+    is applied to one tenant's agent. Insights are not generated per group:
+    they are regenerated once the tenant's submissions pause for
+    `analysis_delay`, or sooner if a page asks for them.
+    """
+
+    def __init__(self, tenants, blocking, max_size=MAX_GROUP_SIZE, max_delay=MAX_GROUP_DELAY,
+                 analysis_delay=INSIGHT_DEBOUNCE):
+        self.tenants = tenants
+        self.blocking = blocking
+        self.max_size = max_size
+        self.max_delay = max_delay
+        self.analysis_delay = analysis_delay
+        self._pending = defaultdict(list)  # tenant -> [(record, future)]
+        self._timers = {}
+        self._analysis_timers = {}  # tenant -> (timer, agent)
+        # A tenant's groups are applied in arrival order; its lock lives only while
+        # groups are committing, so idle and evicted tenants leave nothing behind
+        self._commit_locks: Dict[int, asyncio.Lock] = {}
+        self._committing = Counter()  # tenant -> groups holding or awaiting its lock
+        self._tasks = set()  # running commits and analyses, referenced until they finish
+        self.groups = 0
+        self.records = 0
+        self.analyses = 0
+
+    async def submit(self, record: RevenueData, tenant_id: int) -> int:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        pending = self._pending[tenant_id]
+        pending.append((record, future))
+        if len(pending) >= self.max_size:
+            self._dispatch(tenant_id)
+        elif tenant_id not in self._timers:
+            self._timers[tenant_id] = loop.call_later(self.max_delay, self._dispatch, tenant_id)
+        return await future
+
+    def _dispatch(self, tenant_id):
+        timer = self._timers.pop(tenant_id, None)
+        if timer is not None:
+            timer.cancel()
+        group = self._pending.pop(tenant_id, [])
+        if group:
+            self._spawn(self._commit(tenant_id, group))
+
+    def _spawn(self, coroutine):
+        # The loop only keeps weak references to tasks
+        task = asyncio.ensure_future(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _commit(self, tenant_id, group):
+        lock = self._commit_locks.setdefault(tenant_id, asyncio.Lock())
+        self._committing[tenant_id] += 1
+        try:
+            async with lock:
+                agent = self.tenants.loaded(tenant_id) or await self.blocking.run(self.tenants.get, tenant_id)
+                version = await self.blocking.run(agent.ingest_revenue_group, [record for record, _ in group])
+        except Exception as e:
+            for _, future in group:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._committing[tenant_id] -= 1
+            if not self._committing[tenant_id]:
+                del self._committing[tenant_id]
+                del self._commit_locks[tenant_id]
+        self.groups += 1
+        self.records += len(group)
+        self._schedule_analysis(tenant_id, agent)
+        for _, future in group:
+            if not future.done():
+                future.set_result(version)
+
+    def _schedule_analysis(self, tenant_id, agent):
+        # Each commit pushes the tenant's analysis back; the timer holds the agent
+        # so an eviction in the meantime doesn't lose it
+        scheduled = self._analysis_timers.pop(tenant_id, None)
+        if scheduled is not None:
+            scheduled[0].cancel()
+        loop = asyncio.get_running_loop()
+        timer = loop.call_later(self.analysis_delay, lambda: self._spawn(self._analyze(tenant_id, agent)))
+        self._analysis_timers[tenant_id] = (timer, agent)
+
+    async def _analyze(self, tenant_id, agent):
+        self._analysis_timers.pop(tenant_id, None)
+        await self.blocking.run(agent.analyze_pending)
+        self.analyses += 1
+
+    def flush_analyses(self):
+        """Run every scheduled analysis now, e.g. at shutdown"""
+        for timer, agent in self._analysis_timers.values():
+            timer.cancel()
+            agent.analyze_pending()
+        self._analysis_timers.clear()
+
+    def metrics(self):
+        return {
+            "groups_committed": self.groups,
+            "records_committed": self.records,
+            "avg_group_size": round(self.records / self.groups, 2) if self.groups else 0.0,
+            "pending": sum(len(group) for group in self._pending.values()),
+            "analyses_run": self.analyses,
+            "analyses_scheduled": len(self._analysis_timers)
+        }
@@ -0,0 +1,197 @@
+import re
+from typing import Iterable, Iterator, List
+import numpy as np
+from models import RevenueData, BusinessType, TaxType
+
+# Categorical codes: position in these tuples
+BUSINESS_TYPES = tuple(BusinessType)
+TAX_TYPES = tuple(TaxType)
+BUSINESS_TYPE_CODES = {member: code for code, member in enumerate(BUSINESS_TYPES)}
+TAX_TYPE_CODES = {member: code for code, member in enumerate(TAX_TYPES)}
+
+MONTH_PATTERN = re.compile(r'^(\d{4})-(\d{2})$')
+# Month ordinal for labels that are not YYYY-MM
+UNKNOWN_MONTH = -1
+
+INITIAL_CAPACITY = 1024
+
+# (attribute, dtype) of every column
+COLUMNS = (
+    ("_month_code", np.int32),  # index into the month label table
+    ("_month", np.int32),  # month ordinal
+    ("_revenue", np.float64),
+    ("_expenses", np.float64),
+    ("_service_revenue", np.float64),
+    ("_product_revenue", np.float64),
+    ("_business_type", np.int8),
+    ("_tax_type", np.int8),
+)
+
+# Every RevenueData rebuilt from the store gets the model's default timestamp
+_DEFAULT_TIMESTAMP = RevenueData.model_fields['timestamp'].default
+
+
+def month_ordinal(month: str) -> int:
+    """year * 12 + (month - 1) for a YYYY-MM label, so months compare and subtract as integers"""
+    match = MONTH_PATTERN.match(month)
+    if not match:
+        return UNKNOWN_MONTH
+    return int(match.group(1)) * 12 + int(match.group(2)) - 1
+
+
+class RevenueStore:
+    """Revenue history as NumPy columns, with the list interface the agent used before.
+
+    Indexing and iteration rebuild RevenueData models on demand; analytics
+    should use the column properties (`revenue`, `expenses`, ...) instead,
+    which are views over the filled part of each column. Appends grow the
+    columns geometrically, so they are amortised O(1).
+    """
+
+    def __init__(self, records: Iterable[RevenueData] = (), capacity=INITIAL_CAPACITY):
+        self._size = 0
+        self._capacity = capacity
+        self._month_labels: List[str] = []  # month code -> label, e.g. "2024-03"
+        self._month_codes = {}
+        for name, dtype in COLUMNS:
+            setattr(self, name, np.empty(capacity, dtype=dtype))
+        self.extend(records)
+
+    def _allocate(self, capacity):
+        for name, dtype in COLUMNS:
+            resized = np.empty(capacity, dtype=dtype)
+            resized[:self._size] = getattr(self, name)[:self._size]
+            setattr(self, name, resized)
+        self._capacity = capacity
+
+    def _reserve(self, count):
+        needed = self._size + count
+        if needed > self._capacity:
+            self._allocate(max(needed, self._capacity * 2, INITIAL_CAPACITY))
+
+    def _month_label_code(self, month: str) -> int:
+        code = self._month_codes.get(month)
+        if code is None:
+            code = self._month_codes[month] = len(self._month_labels)
+            self._month_labels.append(month)
+        return code
+
+    def _write(self, index, record: RevenueData):
+        self._month_code[index] = self._month_label_code(record.month)
+        self._month[index] = month_ordinal(record.month)
+        self._revenue[index] = record.revenue
+        self._expenses[index] = record.expenses
+        self._service_revenue[index] = record.service_revenue
+        self._product_revenue[index] = record.product_revenue
+        self._business_type[index] = BUSINESS_TYPE_CODES[record.business_type]
+        self._tax_type[index] = TAX_TYPE_CODES[record.tax_type]
+
+    def append(self, record: RevenueData):
+        self._reserve(1)
+        self._write(self._size, record)
+        self._size += 1
+
+    def extend(self, records: Iterable[RevenueData]):
+        records = list(records)
+        self._reserve(len(records))
+        for record in records:
+            self._write(self._size, record)
+            self._size += 1
+
+    def _record(self, index) -> RevenueData:
+        return RevenueData.model_construct(
+            month=self._month_labels[self._month_code[index]],
+            revenue=float(self._revenue[index]),
+            expenses=float(self._expenses[index]),
+            business_type=BUSINESS_TYPES[self._business_type[index]],
+            tax_type=TAX_TYPES[self._tax_type[index]],
+            service_revenue=float(self._service_revenue[index]),
+            product_revenue=float(self._product_revenue[index]),
+            timestamp=_DEFAULT_TIMESTAMP
+        )
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._record(i) for i in range(*index.indices(self._size))]
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("revenue index out of range")
+        return self._record(index)
+
+    def __setitem__(self, index, record: RevenueData):
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("revenue index out of range")
+        self._write(index, record)
+
+    def __iter__(self) -> Iterator[RevenueData]:
+        for index in range(self._size):
+            yield self._record(index)
+
+    def filter(self, mask: np.ndarray) -> "RevenueStore":
+        """New store with the rows where `mask` is true, in order"""
+        size = int(np.count_nonzero(mask))
+        kept = RevenueStore(capacity=max(size, INITIAL_CAPACITY))
+        kept._month_labels = list(self._month_labels)
+        kept._month_codes = dict(self._month_codes)
+        for name, _ in COLUMNS:
+            getattr(kept, name)[:size] = getattr(self, name)[:self._size][mask]
+        kept._size = size
+        return kept
+
+    def copy(self) -> "RevenueStore":
+        """Snapshot of every row, unaffected by later appends or corrections"""
+        return self.filter(np.ones(self._size, dtype=bool))
+
+    # Column views over the filled rows; do not keep them across appends
+    @property
+    def month(self) -> np.ndarray:
+        """Month ordinals (see month_ordinal)"""
+        return self._month[:self._size]
+
+    @property
+    def revenue(self) -> np.ndarray:
+        return self._revenue[:self._size]
+
+    @property
+    def expenses(self) -> np.ndarray:
+        return self._expenses[:self._size]
+
+    @property
+    def service_revenue(self) -> np.ndarray:
+        return self._service_revenue[:self._size]
+
+    @property
+    def product_revenue(self) -> np.ndarray:
+        return self._product_revenue[:self._size]
+
+    @property
+    def business_type(self) -> np.ndarray:
+        """Codes into BUSINESS_TYPES"""
+        return self._business_type[:self._size]
+
+    @property
+    def tax_type(self) -> np.ndarray:
+        """Codes into TAX_TYPES"""
+        return self._tax_type[:self._size]
+
+    def month_labels(self, start=0, stop=None) -> List[str]:
+        """Month labels of rows [start, stop)"""
+        labels = self._month_labels
+        return [labels[code] for code in self._month_code[:self._size][start:stop].tolist()]
+
+    def distinct_month_labels(self, mask: np.ndarray = None) -> List[str]:
+        """Month labels that occur in the rows selected by `mask` (all rows by default)"""
+        codes = self._month_code[:self._size]
+        if mask is not None:
+            codes = codes[mask]
+        return [self._month_labels[code] for code in np.unique(codes).tolist()]
+
+    def nbytes(self) -> int:
+        """Memory held by the columns (allocated capacity, not just filled rows)"""
+        return sum(getattr(self, name).nbytes for name, _ in COLUMNS)
@@ -37,10 +37,9 @@ def load_sample_dataset(agent, dataset_type="comprehensive"):
         ]
     
     # Load data into agent
-    total_insights = 0
-    for data in sample_data:
-        insights = agent.ingest_revenue_data(data)
-        total_insights += len(insights) if insights else 0
+    agent.ingest_batch(sample_data, source_file=f"sample:{dataset_type}")
+    insights = agent.analyze_pending()
+    total_insights = len(insights)
     
     return {
         "loaded_months": len(sample_data),
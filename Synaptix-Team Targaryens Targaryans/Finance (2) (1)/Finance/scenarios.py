@@ -0,0 +1,143 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from models import CompetitorBenchmark, ScenarioGrid, TaxType
+from revenue_store import RevenueStore, BUSINESS_TYPES, BUSINESS_TYPE_CODES, TAX_TYPE_CODES
+from tax_index import TaxRuleIndex, taxable_base
+
+MAX_SCENARIOS = 100_000
+# Monthly tax amounts evaluated per request: scenarios × months of history
+MAX_SCENARIO_CELLS = 20_000_000
+MAX_TOP = 1000
+
+# What each ranking sorts on, and whether higher is better
+RANKINGS = {"net_income": True, "margin": True, "tax": False}
+
+
+def _benchmark_margin(store: RevenueStore, benchmarks: List[CompetitorBenchmark]) -> Optional[float]:
+    """Competitors' profit margin, weighted by the revenue of each business type in the history"""
+    margins = {}
+    for b in benchmarks:
+        margins.setdefault(BUSINESS_TYPE_CODES[b.business_type], b.avg_profit_margin)
+    weights = np.bincount(store.business_type, weights=store.revenue, minlength=len(BUSINESS_TYPES))
+    covered = [code for code in margins if weights[code] > 0]
+    total = float(weights[covered].sum()) if covered else 0.0
+    if not total:
+        return None
+    return sum(float(weights[code]) * margins[code] for code in covered) / total
+
+
+def _validate(grid: ScenarioGrid, rule_sets: int, months: int):
+    axes = (grid.revenue_growth, grid.expense_change, grid.service_share)
+    if not all(axes):
+        raise ValueError("revenue_growth, expense_change and service_share each need at least one value")
+    if any(g <= -1 for g in grid.revenue_growth):
+        raise ValueError("revenue_growth must be above -1 (revenue falling to nothing)")
+    if any(e < -1 for e in grid.expense_change):
+        raise ValueError("expense_change cannot be below -1 (cutting every expense)")
+    if any(share is not None and not 0 <= share <= 1 for share in grid.service_share):
+        raise ValueError("service_share must be between 0 and 1")
+    if grid.rank_by not in RANKINGS:
+        raise ValueError(f"rank_by must be one of: {', '.join(RANKINGS)}")
+    if not 1 <= grid.top <= MAX_TOP:
+        raise ValueError(f"top must be between 1 and {MAX_TOP}")
+    count = rule_sets * len(grid.revenue_growth) * len(grid.expense_change) * len(grid.service_share)
+    if count > MAX_SCENARIOS:
+        raise ValueError(f"{count:,} scenarios requested; at most {MAX_SCENARIOS:,} are evaluated at once")
+    if count * months > MAX_SCENARIO_CELLS:
+        raise ValueError("Too many scenarios for this much history; split the grid into several requests")
+
+
+def evaluate_scenarios(store: RevenueStore, grid: ScenarioGrid, rule_sets: Sequence[Tuple[str, TaxRuleIndex]],
+                       benchmarks: List[CompetitorBenchmark]) -> Dict:
+    """Revenue, expenses, tax and net income over the whole history for every combination in `grid`, ranked.
+
+    `rule_sets` are (label, rules) pairs; the first is the rules in force,
+    which the baseline uses. Each month's tax is the first matching
+    bracket's rate applied to the taxable amount less expenses, floored at
+    zero. An explicit service share splits each month's revenue into the
+    service and product parts its tax type is charged on. The rate lookup
+    is done once per (growth, expense change) pair for every share.
+    """
+    _validate(grid, len(rule_sets), len(store))
+    revenue, expenses = store.revenue, store.expenses
+    business_codes, tax_codes = store.business_type, store.tax_type
+    growth = 1 + np.array(grid.revenue_growth, dtype=np.float64)
+    change = 1 + np.array(grid.expense_change, dtype=np.float64)
+    shares = list(grid.service_share)
+
+    # Taxable amount of each month before growth, per service share: (shares, months)
+    is_service = tax_codes == TAX_TYPE_CODES[TaxType.SERVICE_TAX]
+    taxable = np.stack([
+        taxable_base(tax_codes, revenue, store.service_revenue, store.product_revenue) if share is None
+        else np.where(is_service, share, 1 - share) * revenue
+        for share in shares
+    ])
+
+    # Net income of every month under every (growth, expense change) pair decides its bracket
+    net = growth[:, None, None] * revenue - change[None, :, None] * expenses
+    cell_business = np.broadcast_to(business_codes, net.shape).ravel()
+    cell_tax = np.broadcast_to(tax_codes, net.shape).ravel()
+    tax = np.empty((len(rule_sets), len(growth), len(change), len(shares)))
+    for r, (_, index) in enumerate(rule_sets):
+        positions = index.find_positions(cell_business, cell_tax, net.ravel())
+        rates = np.nan_to_num(index.rates_at(positions)).reshape(net.shape)  # months without a rule pay none
+        for s in range(len(shares)):
+            taxed = np.maximum(growth[:, None, None] * taxable[s] - change[None, :, None] * expenses, 0.0)
+            tax[r, :, :, s] = np.einsum("gcm,gcm->gc", rates, taxed)
+
+    revenue_total = (growth * float(revenue.sum()))[None, :, None, None]
+    expenses_total = (change * float(expenses.sum()))[None, None, :, None]
+    net_income = revenue_total - expenses_total - tax
+    margin = np.divide(net_income * 100, revenue_total, out=np.zeros_like(net_income), where=revenue_total != 0)
+    metric = {"net_income": net_income, "margin": margin, "tax": tax}[grid.rank_by].ravel()
+
+    # Best `top` without sorting every scenario
+    order = -metric if RANKINGS[grid.rank_by] else metric
+    top = min(grid.top, len(order))
+    best = np.argpartition(order, top - 1)[:top]
+    best = best[np.argsort(order[best], kind="stable")]
+
+    baseline_rates = np.nan_to_num(rule_sets[0][1].rates_at(
+        rule_sets[0][1].find_positions(business_codes, tax_codes, revenue - expenses)))
+    baseline_taxable = taxable_base(tax_codes, revenue, store.service_revenue, store.product_revenue)
+    baseline_tax = float((np.maximum(baseline_taxable - expenses, 0.0) * baseline_rates).sum())
+    baseline_net = float(revenue.sum() - expenses.sum()) - baseline_tax
+    benchmark_margin = _benchmark_margin(store, benchmarks)
+
+    shape = net_income.shape
+    revenue_all = np.broadcast_to(revenue_total, shape).ravel()
+    expenses_all = np.broadcast_to(expenses_total, shape).ravel()
+    net_all, margin_all, tax_all = net_income.ravel(), margin.ravel(), tax.ravel()
+    results = []
+    for rank, flat in enumerate(best.tolist(), 1):
+        r, g, e, s = np.unravel_index(flat, shape)
+        results.append({
+            "rank": rank,
+            "revenue_growth": grid.revenue_growth[g],
+            "expense_change": grid.expense_change[e],
+            "service_share": shares[s],
+            "tax_rules": rule_sets[r][0],
+            "revenue": float(revenue_all[flat]),
+            "expenses": float(expenses_all[flat]),
+            "tax": float(tax_all[flat]),
+            "net_income": float(net_all[flat]),
+            "net_income_change": float(net_all[flat]) - baseline_net,
+            "margin": float(margin_all[flat]),
+            "margin_vs_benchmark": float(margin_all[flat]) - benchmark_margin * 100 if benchmark_margin is not None else None
+        })
+
+    baseline_revenue = float(revenue.sum())
+    return {
+        "scenarios_evaluated": int(net_income.size),
+        "months": len(store),
+        "rank_by": grid.rank_by,
+        "baseline": {
+            "revenue": baseline_revenue,
+            "expenses": float(expenses.sum()),
+            "tax": baseline_tax,
+            "net_income": baseline_net,
+            "margin": baseline_net * 100 / baseline_revenue if baseline_revenue else 0.0
+        },
+        "benchmark_margin": benchmark_margin * 100 if benchmark_margin is not None else None,
+        "results": results
+    }
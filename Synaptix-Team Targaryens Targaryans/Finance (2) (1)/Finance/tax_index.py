@@ -0,0 +1,190 @@
+import math
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Optional, Sequence, Set, Tuple
+import numpy as np
+from models import TaxRule, BusinessType, TaxType
+from revenue_store import BUSINESS_TYPE_CODES, TAX_TYPE_CODES
+
+NO_RULE = -1
+
+# Per-month tax results kept by TaxResultMemo
+TAX_MEMO_SIZE = 65536
+
+
+def taxable_base(tax_codes: np.ndarray, revenue, service_revenue, product_revenue):
+    """Amount tax is charged on, for single values or whole columns.
+
+    Service tax is charged on service revenue and product tax on product
+    revenue, falling back to total revenue when the split is not recorded.
+    """
+    split = np.where(tax_codes == TAX_TYPE_CODES[TaxType.SERVICE_TAX], service_revenue, product_revenue)
+    return np.where(split != 0, split, revenue)
+
+
+def _between(low: float, high: float) -> float:
+    """A value strictly inside the open interval (low, high)"""
+    if math.isinf(low) and math.isinf(high):
+        return 0.0
+    if math.isinf(low):
+        return high - 1.0
+    if math.isinf(high):
+        return low + 1.0
+    return (low + high) / 2
+
+
+class _BracketTable:
+    """Rules of one (business_type, tax_type), compiled into disjoint income segments.
+
+    The sorted bracket boundaries b0 < b1 < ... < bk split the income line
+    into 2k + 1 segments: (-inf, b0), [b0], (b0, b1), [b1], ..., (bk, inf).
+    Each segment maps to the first rule (in rule-list order) covering it, so
+    lookups give the same answer as scanning the rules in order.
+    """
+
+    def __init__(self, rules: List[Tuple[int, TaxRule]]):
+        bounds = sorted({b for _, rule in rules for b in (rule.income_bracket_min, rule.income_bracket_max)})
+        self.bounds = bounds
+        self.bounds_array = np.array(bounds, dtype=np.float64)
+
+        def first_match(income):
+            for position, rule in rules:
+                if rule.income_bracket_min <= income <= rule.income_bracket_max:
+                    return position
+            return NO_RULE
+
+        segments = [first_match(_between(-math.inf, bounds[0]))]
+        for i, bound in enumerate(bounds):
+            segments.append(first_match(bound))
+            segments.append(first_match(_between(bound, bounds[i + 1] if i + 1 < len(bounds) else math.inf)))
+        self.segments = segments
+        self.segments_array = np.array(segments, dtype=np.int64)
+
+    def lookup(self, income: float) -> int:
+        i = bisect_left(self.bounds, income)
+        on_bound = i < len(self.bounds) and self.bounds[i] == income
+        return self.segments[2 * i + on_bound]
+
+    def lookup_array(self, income: np.ndarray) -> np.ndarray:
+        i = np.searchsorted(self.bounds_array, income, side="left")
+        on_bound = self.bounds_array[np.minimum(i, len(self.bounds) - 1)] == income
+        return self.segments_array[2 * i + on_bound]
+
+
+class TaxRuleIndex:
+    """Compiled lookup for "first rule matching business type, tax type and income bracket".
+
+    Rules are hashed by (business_type, tax_type); within a group the
+    brackets are searched by bisection, so a lookup costs O(log rules)
+    instead of a scan over every rule.
+    """
+
+    def __init__(self, rules: Sequence[TaxRule]):
+        self.rules = tuple(rules)
+        self.rates = np.array([rule.tax_rate for rule in self.rules], dtype=np.float64)
+        groups: Dict[Tuple[BusinessType, TaxType], List[Tuple[int, TaxRule]]] = {}
+        for position, rule in enumerate(self.rules):
+            groups.setdefault((rule.business_type, rule.tax_type), []).append((position, rule))
+        self._tables = {key: _BracketTable(group) for key, group in groups.items()}
+        # What decides a lookup's result within a group; descriptions don't
+        self._signatures = {
+            key: tuple((rule.income_bracket_min, rule.income_bracket_max, rule.tax_rate) for _, rule in group)
+            for key, group in groups.items()
+        }
+        self._tables_by_code = {
+            (BUSINESS_TYPE_CODES[business_type], TAX_TYPE_CODES[tax_type]): table
+            for (business_type, tax_type), table in self._tables.items()
+        }
+
+    def find(self, business_type: BusinessType, tax_type: TaxType, net_income: float) -> Optional[TaxRule]:
+        """The first rule matching, or None"""
+        table = self._tables.get((business_type, tax_type))
+        if table is None or net_income != net_income:  # NaN matches no bracket
+            return None
+        position = table.lookup(net_income)
+        return self.rules[position] if position != NO_RULE else None
+
+    def find_positions(self, business_codes: np.ndarray, tax_codes: np.ndarray, net_income: np.ndarray) -> np.ndarray:
+        """Vectorised find over whole columns: the matching rule's position in `rules`, or NO_RULE"""
+        positions = np.full(len(net_income), NO_RULE, dtype=np.int64)
+        if not len(net_income):
+            return positions
+        # One pass per (business_type, tax_type) group that actually occurs
+        group_keys = business_codes.astype(np.int64) * len(TAX_TYPE_CODES) + tax_codes
+        for key in np.unique(group_keys).tolist():
+            table = self._tables_by_code.get(divmod(key, len(TAX_TYPE_CODES)))
+            if table is None:
+                continue
+            rows = np.flatnonzero(group_keys == key)
+            positions[rows] = table.lookup_array(net_income[rows])
+        positions[np.isnan(net_income)] = NO_RULE
+        return positions
+
+    def rates_at(self, positions: np.ndarray) -> np.ndarray:
+        """Tax rate of the rule at each position, NaN for NO_RULE"""
+        # NO_RULE (-1) picks the trailing NaN
+        return np.append(self.rates, np.nan)[positions]
+
+    def changed_groups(self, previous: "TaxRuleIndex") -> Set[Tuple[BusinessType, TaxType]]:
+        """(business_type, tax_type) groups whose brackets or rates differ from `previous`"""
+        keys = self._signatures.keys() | previous._signatures.keys()
+        return {key for key in keys if self._signatures.get(key) != previous._signatures.get(key)}
+
+    def changed_rows(self, previous: "TaxRuleIndex", business_codes: np.ndarray, tax_codes: np.ndarray,
+                     net_income: np.ndarray) -> np.ndarray:
+        """Mask of the rows whose applicable rate differs from `previous` (gaining or losing a rule counts).
+
+        Only rows in groups whose rules changed are looked up.
+        """
+        changed = np.zeros(len(net_income), dtype=bool)
+        groups = self.changed_groups(previous)
+        if not groups or not len(net_income):
+            return changed
+        group_keys = business_codes.astype(np.int64) * len(TAX_TYPE_CODES) + tax_codes
+        codes = [BUSINESS_TYPE_CODES[bt] * len(TAX_TYPE_CODES) + TAX_TYPE_CODES[tt] for bt, tt in groups]
+        rows = np.flatnonzero(np.isin(group_keys, codes))
+        if not len(rows):
+            return changed
+        args = (business_codes[rows], tax_codes[rows], net_income[rows])
+        old_positions, new_positions = previous.find_positions(*args), self.find_positions(*args)
+        old_rates, new_rates = previous.rates_at(old_positions), self.rates_at(new_positions)
+        same = (old_rates == new_rates) | (np.isnan(old_rates) & np.isnan(new_rates))
+        changed[rows[~same]] = True
+        return changed
+
+
+class TaxResultMemo:
+    """Bounded LRU of per-month tax results.
+
+    Keys carry the tax rule version alongside the month's figures, so a rule
+    change never serves a stale result, and switching back to an earlier
+    version reuses what was computed under it. Callers hold the agent lock.
+    """
+
+    def __init__(self, maxsize=TAX_MEMO_SIZE):
+        self.maxsize = maxsize
+        self._entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key: Hashable, compute: Callable):
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            value = self._entries[key] = compute()
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            return value
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return value
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        self._entries.clear()
+
+    def metrics(self) -> Dict:
+        return {"entries": len(self._entries), "max_entries": self.maxsize, "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,162 @@
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Dict, Optional
+from database import FinancialDB
+from financial_agent import LiveFinancialAgent
+from insight_writer import InsightWriter
+from analyzers import AnalysisPipeline
+from models import RuleSet
+
+# Estimated in-memory state of loaded tenants before idle ones are evicted
+TENANT_MEMORY_BUDGET = 512 * 2**20
+
+
+class TenantRegistry:
+    """One agent per tenant, loaded from the database on first use.
+
+    Agents are kept in least-recently-used order. When the loaded agents'
+    estimated memory exceeds the budget, the idlest ones are dropped; their
+    data stays in the database and is loaded again on their next request.
+    All agents share one database connection pool, one insight writer and
+    one analysis pipeline.
+    """
+
+    def __init__(self, db: FinancialDB = None, memory_budget=TENANT_MEMORY_BUDGET, pipeline: AnalysisPipeline = None):
+        self.db = db or FinancialDB()
+        self.memory_budget = memory_budget
+        self.insight_writer = InsightWriter(self.db)
+        self.pipeline = pipeline or AnalysisPipeline()
+        self._agents: "OrderedDict[int, LiveFinancialAgent]" = OrderedDict()
+        # Evicted agents that a request is still using; handed out again rather
+        # than loading a second copy that could miss that request's writes
+        self._in_use = weakref.WeakValueDictionary()
+        self._loading: Dict[int, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.rule_version = None  # Last rule set version activated through the registry
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+        self.last_load_ms = 0.0
+
+    def loaded(self, tenant_id: int) -> Optional[LiveFinancialAgent]:
+        """The tenant's agent if it is in memory, without touching the database"""
+        with self._lock:
+            agent = self._agents.get(tenant_id) or self._in_use.get(tenant_id)
+            if agent is not None:
+                self._agents[tenant_id] = agent
+                self._agents.move_to_end(tenant_id)
+                self.hits += 1
+            return agent
+
+    def get(self, tenant_id: int) -> LiveFinancialAgent:
+        """The tenant's agent, loading its history from the database if needed"""
+        agent = self.loaded(tenant_id)
+        if agent is not None:
+            return agent
+        with self._lock:
+            loading = self._loading.setdefault(tenant_id, threading.Lock())
+        with loading:
+            # Another request may have loaded it while we waited
+            agent = self.loaded(tenant_id)
+            if agent is not None:
+                return agent
+            start = time.perf_counter()
+            agent = LiveFinancialAgent(tenant_id, self.db, self.insight_writer, pipeline=self.pipeline)
+            with self._lock:
+                self._agents[tenant_id] = agent
+                self._in_use[tenant_id] = agent
+                self._loading.pop(tenant_id, None)
+                self.loads += 1
+                self.last_load_ms = round((time.perf_counter() - start) * 1000, 3)
+                self._evict()
+                # A rule set activated while the agent was loading, after it read the active one
+                version = self.rule_version
+            if version is not None and agent.rule_version != version:
+                stored = self.db.get_rule_set(version)
+                agent.apply_rule_set(version, stored['tax_rules'], stored['competitor_benchmarks'])
+        return agent
+
+    def trim(self):
+        """Evict idle tenants if loaded ones have grown past the budget, e.g. after an import"""
+        with self._lock:
+            self._evict()
+
+    def _evict(self):
+        # The most recently used tenant always stays, even if it alone is over budget
+        total = sum(agent.memory_bytes() for agent in self._agents.values())
+        while total > self.memory_budget and len(self._agents) > 1:
+            _, agent = self._agents.popitem(last=False)
+            total -= agent.memory_bytes()
+            self.evictions += 1
+
+    def agents(self):
+        """Agents currently in memory"""
+        with self._lock:
+            return list(self._agents.values())
+
+    def _live_agents(self):
+        """Agents in memory, including evicted ones a request is still using"""
+        agents = {id(agent): agent for agent in self._agents.values()}
+        agents.update((id(agent), agent) for agent in self._in_use.values())
+        return list(agents.values())
+
+    def load_rule_set(self, rule_set: RuleSet, source="api") -> Dict:
+        """Store a rule set as a new version and switch every tenant to it"""
+        active = self.db.get_rule_set()
+        tax_rules = rule_set.tax_rules if rule_set.tax_rules is not None else active['tax_rules']
+        benchmarks = (rule_set.competitor_benchmarks if rule_set.competitor_benchmarks is not None
+                      else active['competitor_benchmarks'])
+        version = self.db.save_rule_set(tax_rules, benchmarks, source)
+        return self.activate_rule_set(version)
+
+    def activate_rule_set(self, version: int) -> Dict:
+        """Switch every tenant to a stored rule set version.
+
+        Agents in memory, including evicted ones still serving a request,
+        recompute their affected months now; the others pick up the active
+        version when they are next loaded.
+        """
+        stored = self.db.get_rule_set(version)
+        if stored is None:
+            raise KeyError(f"Rule set version {version} not found")
+        self.db.activate_rule_set(version)
+        with self._lock:
+            self.rule_version = version
+            agents = self._live_agents()
+        results = [
+            agent.apply_rule_set(version, stored['tax_rules'], stored['competitor_benchmarks'])
+            for agent in agents
+        ]
+        return {
+            "version": version,
+            "tenants_recomputed": len(results),
+            "tax_months_recomputed": sum(r["tax_months_recomputed"] for r in results),
+            "benchmark_months_recomputed": sum(r["benchmark_months_recomputed"] for r in results),
+            "insights_generated": sum(r["insights_generated"] for r in results)
+        }
+
+    def clear_all(self):
+        """Drop every tenant's stored and in-memory data"""
+        for agent in self.agents():
+            agent.clear_all_data()
+        self.db.clear_all_tenants()
+
+    def close(self):
+        """Flush queued insights and close the shared connections"""
+        self.insight_writer.close()
+        self.db.close()
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            memory = sum(agent.memory_bytes() for agent in self._agents.values())
+            return {
+                "tenants_loaded": len(self._agents),
+                "memory_bytes": memory,
+                "memory_budget_bytes": self.memory_budget,
+                "hits": self.hits,
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "last_load_ms": self.last_load_ms
+            }
@@ -0,0 +1,45 @@
+import os
+import sys
+import pytest
+
+# The app's modules live next to this directory rather than in a package
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from database import FinancialDB
+
+
+@pytest.fixture
+def db(tmp_path):
+    """A fresh, fully migrated database"""
+    database = FinancialDB(str(tmp_path / "financial_data.db"))
+    yield database
+    database.close()
+
+
+@pytest.fixture(scope="session")
+def app(tmp_path_factory):
+    """The main module, running against a database in a scratch directory"""
+    workdir = tmp_path_factory.mktemp("app")
+    os.symlink(os.path.join(APP_DIR, "templates"), workdir / "templates")
+    previous = os.getcwd()
+    os.chdir(workdir)
+    import main
+    yield main
+    os.chdir(previous)
+
+
+@pytest.fixture
+def login(app):
+    """Log a new, verified user in: login(email, admin=False) returns the session cookies"""
+    from auth import UserRegistration, UserLogin
+
+    def login(email, admin=False):
+        registered = app.auth.register_user(UserRegistration(
+            name="Test", mobile=email, email=email, address="-", gst_number=email, password="secret"
+        ))
+        app.auth.verify_email(registered["verification_token"])
+        if admin:
+            app.auth.admin_emails.add(email)
+        return {"session_token": app.auth.login_user(UserLogin(email=email, password="secret"))["session_token"]}
+    return login
@@ -0,0 +1,95 @@
+import random
+from datetime import datetime, timedelta
+import pytest
+from aggregates import InsightCounter
+from financial_agent import LiveFinancialAgent
+from models import RevenueData, BusinessType, TaxType, FinancialInsight
+
+
+def _random_records(count, seed):
+    rng = random.Random(seed)
+    return [
+        RevenueData(month=f"2024-{rng.randint(1, 12):02d}", revenue=rng.uniform(1000, 9000),
+                    expenses=rng.uniform(1000, 9000), business_type=rng.choice(list(BusinessType)),
+                    tax_type=rng.choice(list(TaxType)))
+        for _ in range(count)
+    ]
+
+
+def _recomputed(records):
+    """What get_financial_summary reports, from a full scan"""
+    by_type = {}
+    for r in records:
+        group = by_type.setdefault(r.business_type.value, {"count": 0, "total_revenue": 0.0, "total_expenses": 0.0,
+                                                            "latest_month": r.month})
+        group["count"] += 1
+        group["total_revenue"] += r.revenue
+        group["total_expenses"] += r.expenses
+        group["latest_month"] = max(group["latest_month"], r.month)
+    return {
+        "total_revenue": sum(r.revenue for r in records),
+        "total_expenses": sum(r.expenses for r in records),
+        "months_tracked": len(records),
+        "by_business_type": by_type
+    }
+
+
+def _assert_summary_matches_scan(agent):
+    summary = agent.get_financial_summary()
+    expected = _recomputed(list(agent.revenue_memory))
+    assert summary["months_tracked"] == expected["months_tracked"]
+    assert summary["total_revenue"] == pytest.approx(expected["total_revenue"])
+    assert summary["total_expenses"] == pytest.approx(expected["total_expenses"])
+    assert summary["by_business_type"].keys() == expected["by_business_type"].keys()
+    for business_type, group in expected["by_business_type"].items():
+        assert summary["by_business_type"][business_type] == pytest.approx(group)
+
+
+@pytest.fixture
+def agent(db):
+    agent = LiveFinancialAgent(1, db)
+    yield agent
+    agent.insight_writer.close()
+
+
+def test_running_totals_follow_inserts_and_corrections(agent):
+    for seed in range(5):
+        # Later batches repeat months of earlier ones, so some rows correct stored months
+        agent.ingest_batch(_random_records(40, seed), source_file=f"upload-{seed % 2}.csv")
+        _assert_summary_matches_scan(agent)
+
+
+def test_running_totals_follow_the_clear_endpoints(agent):
+    agent.ingest_batch(_random_records(60, 1), source_file="upload.csv")
+    agent.clear_loss_data()
+    assert all(r.revenue >= r.expenses for r in agent.revenue_memory)
+    _assert_summary_matches_scan(agent)
+    agent.clear_all_data()
+    assert agent.get_financial_summary() == {"status": "No data available"}
+    assert (agent.aggregates.count, agent.aggregates.total_revenue, agent.aggregates.by_business_type) == (0, 0.0, {})
+
+
+def _insight(insight_type, timestamp):
+    return FinancialInsight(insight_type=insight_type, title="-", description="-", impact="-", recommendation="-",
+                            confidence=0.5, timestamp=timestamp)
+
+
+def test_insight_counts_age_out_of_the_window():
+    now = datetime(2024, 6, 1, 12, 0)
+    counter = InsightCounter([
+        _insight("tax_analysis", now - timedelta(days=40)),
+        _insight("tax_analysis", now - timedelta(days=29, hours=23)),
+        _insight("trend_analysis", now - timedelta(days=10)),
+        _insight("trend_analysis", now - timedelta(minutes=1)),
+    ])
+    assert counter.recent(now) == 3
+    assert counter.recent(now + timedelta(hours=2)) == 2
+    assert counter.recent(now + timedelta(days=31)) == 0
+
+
+def test_insight_counts_drop_cleared_types():
+    now = datetime.now()
+    counter = InsightCounter([_insight("tax_analysis", now), _insight("competitive_analysis", now)])
+    counter.add_all([_insight("trend_analysis", now)])
+    counter.remove_types(["competitive_analysis", "trend_analysis"])
+    assert counter.recent() == 1
@@ -0,0 +1,17 @@
+from financial_agent import LiveFinancialAgent
+from models import RevenueData, BusinessType, TaxType
+
+
+def test_tax_efficiency_compares_the_latest_month(db):
+    agent = LiveFinancialAgent(1, db)
+    # Services pay 18% on this income, under their 22% benchmark
+    agent.ingest_revenue_data(RevenueData(month="2024-03", revenue=30000, expenses=20000,
+                                          business_type=BusinessType.SERVICES, tax_type=TaxType.SERVICE_TAX,
+                                          service_revenue=30000))
+    # An earlier retail month arrives last; it pays 18% against retail's 15%
+    agent.ingest_revenue_data(RevenueData(month="2024-01", revenue=200000, expenses=100000,
+                                          business_type=BusinessType.RETAIL, tax_type=TaxType.PRODUCT_TAX,
+                                          product_revenue=200000))
+
+    assert agent.get_tax_analysis()["tax_efficiency"] == "Better"
+    agent.insight_writer.close()
@@ -0,0 +1,84 @@
+import threading
+import pytest
+from analyzers import ANALYZERS, ANALYZERS_VARIABLE, DEFAULT_ANALYZERS, AnalysisPipeline, configured_analyzers
+from financial_agent import LiveFinancialAgent
+from models import RevenueData, BusinessType, TaxType
+
+
+def _record(month, revenue, business_type=BusinessType.RETAIL):
+    tax_type = TaxType.SERVICE_TAX if business_type == BusinessType.SERVICES else TaxType.PRODUCT_TAX
+    return RevenueData(month=month, revenue=revenue, expenses=revenue / 2, business_type=business_type,
+                       tax_type=tax_type)
+
+
+@pytest.fixture
+def agent(db):
+    agent = LiveFinancialAgent(1, db, pipeline=AnalysisPipeline(["revenue_anomaly"]))
+    yield agent
+    agent.insight_writer.close()
+
+
+def _anomalies(agent):
+    return [insight for insight in agent.analyze_pending() if insight.insight_type == "anomaly_detection"]
+
+
+def test_anomaly_compares_months_of_the_same_business_type(agent):
+    # A year of steady retail months, interleaved with much larger services months and arriving newest first
+    history = []
+    for month in range(12, 0, -1):
+        history += [_record(f"2024-{month:02d}", 1000 + 10 * (month % 2)),
+                    _record(f"2024-{month:02d}", 100000, BusinessType.SERVICES)]
+    agent.ingest_batch(history, source_file="history.csv")
+    agent.analyze_pending()
+
+    agent.ingest_revenue_data(_record("2025-01", 1005))
+    assert _anomalies(agent) == []
+    agent.ingest_revenue_data(_record("2025-02", 5000))
+    assert [insight.title.startswith("Unusual Revenue: +") for insight in _anomalies(agent)] == [True]
+
+
+def test_anomaly_waits_for_a_full_window_of_months(agent):
+    # Plenty of records, but only two months of them
+    agent.ingest_batch([_record("2024-01", 1000 + i) for i in range(20)], source_file="history.csv")
+    agent.ingest_revenue_data(_record("2024-02", 90000))
+    assert _anomalies(agent) == []
+
+
+def test_heavy_analyzers_run_on_the_worker_pool(agent, monkeypatch):
+    threads = {}
+
+    def recording(name, func):
+        def run(context):
+            threads[name] = threading.current_thread().name
+            return func(context)
+        return run
+
+    for name in ("revenue_anomaly", "revenue_outlook", "revenue_trend"):
+        monkeypatch.setattr(ANALYZERS[name], "func", recording(name, ANALYZERS[name].func))
+    agent.pipeline = AnalysisPipeline(["revenue_trend", "revenue_anomaly", "revenue_outlook"])
+    agent.ingest_batch([_record(f"2024-{month:02d}", 1000 * month) for month in range(1, 13)] +
+                       [_record("2025-01", 13000)], source_file="history.csv")
+    agent.analyze_pending()
+
+    assert threads["revenue_anomaly"].startswith("analysis")
+    assert threads["revenue_outlook"].startswith("analysis")
+    assert threads["revenue_trend"] == threading.current_thread().name
+
+
+def test_outlook_reports_a_projected_rise(agent):
+    agent.pipeline = AnalysisPipeline(["revenue_outlook"])
+    agent.ingest_batch([_record(f"2024-{month:02d}", 1000 * month) for month in range(1, 13)],
+                       source_file="history.csv")
+    [outlook] = agent.analyze_pending()
+    assert outlook.insight_type == "forecast"
+    assert outlook.title.startswith("Revenue Outlook: +")
+
+
+def test_deployment_chooses_its_analyzers(monkeypatch):
+    monkeypatch.delenv(ANALYZERS_VARIABLE, raising=False)
+    assert configured_analyzers() == list(DEFAULT_ANALYZERS)
+    monkeypatch.setenv(ANALYZERS_VARIABLE, "tax_impact, revenue_anomaly,")
+    assert AnalysisPipeline(configured_analyzers()).enabled == ["tax_impact", "revenue_anomaly"]
+    monkeypatch.setenv(ANALYZERS_VARIABLE, "tax_impact,no_such_analyzer")
+    with pytest.raises(ValueError):
+        AnalysisPipeline(configured_analyzers())
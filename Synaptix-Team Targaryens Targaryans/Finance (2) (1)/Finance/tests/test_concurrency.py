@@ -0,0 +1,70 @@
+import asyncio
+import io
+import threading
+import time
+import httpx
+from dataset_parser import ingest_stream
+from models import RevenueData, BusinessType, TaxType
+
+UPLOAD_ROWS = 30000  # six batches
+COMMIT_SECONDS = 0.5  # added to every batch's database write, as on a slow disk
+SUMMARY_BOUND = COMMIT_SECONDS / 2  # slowest /api/summary allowed while the upload runs
+
+
+def _large_csv(rows=UPLOAD_ROWS):
+    lines = ["month,revenue,expenses,business_type,tax_type,service_revenue,product_revenue"]
+    for i in range(rows):
+        month = f"{2000 + (i // 12) % 100}-{i % 12 + 1:02d}"
+        lines.append(f"{month},{1000 + i},400,retail,product_tax,0,{1000 + i}")
+    return "\n".join(lines) + "\n"
+
+
+async def _poll_summary(app, cookies, uploading: threading.Event, finished: threading.Event):
+    """Latencies of /api/summary requests made one after another while the upload runs"""
+    latencies = []
+    transport = httpx.ASGITransport(app=app.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", cookies=cookies) as client:
+        while not uploading.is_set():
+            await asyncio.sleep(0.01)
+        while not finished.is_set():
+            start = time.perf_counter()
+            response = await client.get("/api/summary")
+            if not finished.is_set():
+                latencies.append(time.perf_counter() - start)
+            assert response.status_code == 200
+            await asyncio.sleep(0.02)
+    return latencies
+
+
+def test_summary_latency_stays_flat_during_a_large_upload(app, login, monkeypatch):
+    cookies = login("uploader@example.com")
+    agent = app.tenants.get(app.auth.get_user_by_session(cookies["session_token"]).id)
+    agent.ingest_revenue_data(RevenueData(month="1999-12", revenue=1000, expenses=400,
+                                          business_type=BusinessType.RETAIL, tax_type=TaxType.PRODUCT_TAX))
+    save = agent.db.save_revenue_batch
+    uploading, finished = threading.Event(), threading.Event()
+
+    def slow_save(records, source_file):
+        uploading.set()
+        time.sleep(COMMIT_SECONDS)
+        return save(records, source_file)
+
+    monkeypatch.setattr(agent.db, "save_revenue_batch", slow_save)
+    result = {}
+
+    def upload():
+        try:
+            result.update(ingest_stream(agent, io.BytesIO(_large_csv().encode()), "large.csv"))
+        finally:
+            finished.set()
+
+    uploader = threading.Thread(target=upload)
+    uploader.start()
+    try:
+        latencies = asyncio.run(_poll_summary(app, cookies, uploading, finished))
+    finally:
+        uploader.join()
+
+    assert result["rows_accepted"] == UPLOAD_ROWS
+    assert len(latencies) >= 5
+    assert max(latencies) < SUMMARY_BOUND
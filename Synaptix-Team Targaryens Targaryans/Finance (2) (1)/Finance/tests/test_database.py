@@ -0,0 +1,66 @@
+import sqlite3
+import threading
+import time
+import pytest
+from models import RevenueData, BusinessType, TaxType
+
+
+def _record(month):
+    return RevenueData(month=month, revenue=1000, expenses=400, business_type=BusinessType.RETAIL,
+                       tax_type=TaxType.PRODUCT_TAX)
+
+
+def _on_thread(func):
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(value=func()))
+    thread.start()
+    thread.join(timeout=10)
+    return result["value"]
+
+
+def test_connections_use_wal_and_tuned_pragmas(db):
+    conn = db._pool.connection()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+    assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+
+
+def test_each_thread_keeps_one_connection_shared_by_tenant_views(db):
+    conn = db._pool.connection()
+    assert db.for_tenant(7)._pool.connection() is conn
+    assert db._pool.connection() is conn
+    other = _on_thread(db._pool.connection)
+    assert other is not conn
+    assert len(db._pool._connections) == 2
+
+
+def test_readers_are_not_blocked_by_an_open_write(db):
+    db.for_tenant(1).save_revenue_batch([_record("2024-01")])
+    writer = db._pool.connection()
+    writer.execute("BEGIN IMMEDIATE")
+    writer.execute("UPDATE revenue_data SET revenue = 5 WHERE tenant_id = 1")
+
+    start = time.perf_counter()
+    revenue = _on_thread(lambda: [r.revenue for r in db.for_tenant(1).get_all_revenue_data()])
+    assert time.perf_counter() - start < 1
+    assert revenue == [1000]  # the uncommitted update is not visible
+    writer.rollback()
+
+
+def test_failed_transaction_is_rolled_back(db):
+    with pytest.raises(sqlite3.IntegrityError):
+        with db._transaction() as cursor:
+            cursor.execute("INSERT INTO revenue_data (tenant_id, month, revenue, expenses, business_type, tax_type) "
+                           "VALUES (1, '2024-01', 1, 1, 'retail', 'product_tax')")
+            cursor.execute("INSERT INTO revenue_data (id, tenant_id) SELECT id, tenant_id FROM revenue_data")
+    assert db.for_tenant(1).get_all_revenue_data() == []
+
+
+def test_close_closes_every_thread_connection(db):
+    connections = [db._pool.connection(), _on_thread(db._pool.connection)]
+    db.close()
+    for conn in connections:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+    # A later call opens a fresh connection
+    assert db.for_tenant(1).get_all_revenue_data() == []
@@ -0,0 +1,108 @@
+import io
+import json
+import tracemalloc
+import pytest
+import dataset_parser
+from dataset_parser import MAX_REPORTED_ERRORS, ingest_stream, iter_csv_frames, iter_json_records
+from financial_agent import LiveFinancialAgent
+
+HEADER = b"month,revenue,expenses,business_type,tax_type,service_revenue,product_revenue\n"
+
+
+class _GeneratedCSV:
+    """A CSV upload of `rows` rows, produced as it is read so the whole file never exists in memory"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.written = 0
+        self.buffer = HEADER
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        size = size if size and size > 0 else 64 * 1024
+        while len(self.buffer) < size and self.written < self.rows:
+            i = self.written
+            self.buffer += (f"{2000 + (i // 12) % 100}-{i % 12 + 1:02d},{1000 + i},400,retail,product_tax,,"
+                            f"{1000 + i}\n").encode()
+            self.written += 1
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        self.bytes_read += len(data)
+        return data
+
+
+ELEMENTS = [
+    {"month": "2024-01", "revenue": 1000, "note": "brackets ] [ and commas , inside strings"},
+    {"month": "2024-02", "revenue": 2000.5, "note": "₹ split across chunk boundaries"},
+    {"month": "2024-03", "revenue": 3000, "nested": {"items": [1, 2, {"deep": "]"}]}},
+]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 64 * 1024])
+def test_json_elements_are_streamed_whatever_the_chunking(chunk_size):
+    payload = json.dumps(ELEMENTS, ensure_ascii=False, indent=2).encode()
+    assert list(iter_json_records(io.BytesIO(payload), chunk_size=chunk_size)) == ELEMENTS
+
+
+def test_json_elements_arrive_before_the_upload_is_read():
+    stream = io.BytesIO(("[" + ",".join(json.dumps(e) for e in ELEMENTS * 1000) + "]").encode())
+    records = iter_json_records(stream, chunk_size=256)
+    assert next(records) == ELEMENTS[0]
+    assert stream.tell() == 256
+
+
+@pytest.mark.parametrize("payload, message", [
+    (b'{"month": "2024-01"}', "must be an array"),
+    (b'[{"month": "2024-01"}, {"month": ', "Malformed JSON"),
+    (b'[{"month": "2024-01"}', "unterminated array"),
+])
+def test_malformed_json_is_rejected(payload, message):
+    with pytest.raises(ValueError, match=message):
+        list(iter_json_records(io.BytesIO(payload), chunk_size=4))
+
+
+def test_oversized_json_element_is_rejected(monkeypatch):
+    monkeypatch.setattr(dataset_parser, "MAX_JSON_ELEMENT_SIZE", 100)
+    payload = json.dumps([{"note": "x" * 500}]).encode()
+    with pytest.raises(ValueError, match="exceeds maximum size"):
+        list(iter_json_records(io.BytesIO(payload), chunk_size=16))
+
+
+def test_csv_is_read_in_fixed_size_frames():
+    sizes = [len(frame) for frame in iter_csv_frames(_GeneratedCSV(2500), batch_size=1000)]
+    assert sizes == [1000, 1000, 500]
+
+
+def test_csv_parsing_memory_stays_flat():
+    def peak(rows):
+        stream = _GeneratedCSV(rows)
+        tracemalloc.start()
+        try:
+            for _ in iter_csv_frames(stream, batch_size=1000):
+                pass
+            return tracemalloc.get_traced_memory()[1], stream.bytes_read
+        finally:
+            tracemalloc.stop()
+
+    small, _ = peak(5_000)
+    large, size = peak(100_000)
+    assert size > 4 * 2**20
+    assert large < 2 * small  # 20x the rows, about the same peak
+
+
+def test_upload_reports_accepted_and_rejected_rows(db):
+    agent = LiveFinancialAgent(1, db)
+    lines = [HEADER.decode().strip()]
+    for i in range(60):
+        revenue = "n/a" if i % 2 else str(1000 + i)
+        lines.append(f"{2000 + i // 12}-{i % 12 + 1:02d},{revenue},400,retail,product_tax,,")
+    payload = ("\n".join(lines) + "\n").encode()
+
+    progress = []
+    result = ingest_stream(agent, io.BytesIO(payload), "upload.csv", batch_size=25,
+                           on_progress=lambda accepted, rejected, insights: progress.append((accepted, rejected)))
+    assert (result["rows_accepted"], result["rows_rejected"]) == (30, 30)
+    assert len(result["errors"]) == MAX_REPORTED_ERRORS
+    assert result["errors"][0] == {"row": 2, "error": "revenue must be a number"}
+    assert progress[:3] == [(13, 12), (25, 25), (30, 30)]
+    assert len(agent.revenue_memory) == 30
+    agent.insight_writer.close()
@@ -0,0 +1,72 @@
+import asyncio
+import os
+import httpx
+import pytest
+import document_extractor
+from document_extractor import extract_document, POOL_START_METHOD
+
+MONTHS = 6
+PAGES_PER_MONTH = 8
+
+
+def _statement_pdf(path, months=MONTHS, pages_per_month=PAGES_PER_MONTH):
+    """A statement with each month's summary on its first page, followed by transaction pages"""
+    from reportlab.pdfgen import canvas
+
+    pdf = canvas.Canvas(str(path))
+    for month in range(months):
+        pdf.drawString(50, 800, f"Monthly statement 2022-{month + 1:02d}")
+        pdf.drawString(50, 780, f"Revenue: {50000 + month * 1000:,}.00")
+        pdf.drawString(50, 760, f"Expenses: {30000 + month * 500:,}.00")
+        pdf.showPage()
+        for page in range(pages_per_month - 1):
+            pdf.drawString(50, 800, f"Txn {month}-{page}  Invoice payment  amount 1,234.56")
+            pdf.showPage()
+    pdf.save()
+    return str(path)
+
+
+EXPECTED = {
+    f"2022-{month + 1:02d}": {"revenue": 50000.0 + month * 1000, "expenses": 30000.0 + month * 500}
+    for month in range(MONTHS)
+}
+
+
+@pytest.fixture
+def statement(tmp_path):
+    return _statement_pdf(tmp_path / "statement.pdf")
+
+
+def test_pages_are_extracted_on_the_process_pool(statement, monkeypatch):
+    monkeypatch.setattr(os, "cpu_count", lambda: 2)
+    try:
+        months, pages = extract_document(statement, "statement.pdf")
+        pool = document_extractor._pool
+        assert pool is not None
+        assert pool._mp_context.get_start_method() == POOL_START_METHOD != "fork"
+    finally:
+        document_extractor.shutdown_pool()
+    assert (months, pages) == (EXPECTED, MONTHS * PAGES_PER_MONTH)
+
+
+def test_extraction_stops_once_the_required_months_are_found(statement):
+    months, pages = extract_document(statement, "statement.pdf", required_months=["2022-01", "2022-02"])
+    assert pages == PAGES_PER_MONTH + 1  # the page with February's summary
+    assert months == {month: EXPECTED[month] for month in ("2022-01", "2022-02")}
+
+
+async def _upload_document(app, path, months):
+    transport = httpx.ASGITransport(app=app.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        with open(path, "rb") as document:
+            response = await client.post("/api/upload-document", files={"file": ("early.pdf", document)},
+                                         data={"business_type": "retail", "tax_type": "product_tax", "months": months})
+    return response.json()
+
+
+def test_document_upload_stops_at_the_requested_months(app, statement):
+    accepted = asyncio.run(_upload_document(app, statement, "2022-01, 2022-02"))
+    job = app.ingest_jobs.jobs[accepted["job_id"]]
+    assert job.done.wait(timeout=30)
+    assert job.status == "completed"
+    assert job.result == {"months": ["2022-01", "2022-02"], "pages_scanned": PAGES_PER_MONTH + 1}
@@ -0,0 +1,139 @@
+import random
+import numpy as np
+import pytest
+from financial_agent import LiveFinancialAgent
+from forecast import CHANNELS, EXPENSES, MAX_FORECAST_MONTHS, REVENUE, RevenueForecaster, SeriesModel, _fit
+from models import RevenueData, BusinessType, TaxType
+from revenue_store import RevenueStore, month_ordinal
+from tax_index import TaxRuleIndex
+
+
+def _series(months, seed):
+    """Ascending month ordinals with gaps, and noisy (months, channels) totals"""
+    rng = random.Random(seed)
+    ordinals = sorted(rng.sample(range(month_ordinal("2018-01"), month_ordinal("2024-12") + 1), months))
+    totals = np.array([[rng.uniform(1000, 9000) for _ in range(CHANNELS)] for _ in ordinals])
+    return np.array(ordinals), totals
+
+
+def _state(model):
+    return {name: getattr(model, name) for name in SeriesModel.__slots__}
+
+
+def _assert_same_model(actual, expected):
+    for name, value in _state(expected).items():
+        assert np.allclose(getattr(actual, name), value), name
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_trend_is_the_least_squares_line(seed):
+    ordinals, totals = _series(40, seed)
+    model = SeriesModel(int(ordinals[0]))
+    for ordinal, values in zip(ordinals.tolist(), totals):
+        assert model.add(ordinal, values)
+
+    intercept, slope = _fit(model.n, model.sx, model.sxx, model.sy, model.sxy)
+    x = ordinals - model.origin
+    for channel in range(CHANNELS):
+        expected_slope, expected_intercept = np.polyfit(x, totals[:, channel], 1)
+        assert slope[channel] == pytest.approx(expected_slope)
+        assert intercept[channel] == pytest.approx(expected_intercept)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_incremental_model_matches_a_fit_from_the_totals(seed):
+    ordinals, totals = _series(30, seed)
+    model = SeriesModel(int(ordinals[0]))
+    for ordinal, values in zip(ordinals.tolist(), totals):
+        # Each month's total arrives as several records
+        model.add(ordinal, values * 0.25)
+        model.add(ordinal, values * 0.75)
+    _assert_same_model(model, SeriesModel.fit(ordinals, totals))
+
+
+def test_closed_months_are_refused():
+    model = SeriesModel(100)
+    model.add(105, np.ones(CHANNELS))
+    assert not model.add(104, np.ones(CHANNELS))
+    assert model.add(105, np.ones(CHANNELS))
+
+
+def test_a_straight_line_is_extended():
+    model = SeriesModel.fit(np.arange(24), np.array([[1000 + 50 * x, 400 + 10 * x, 1000 + 50 * x] for x in range(24)]))
+    projected = model.project(np.arange(24, 30))
+    assert projected[:, REVENUE] == pytest.approx([1000 + 50 * x for x in range(24, 30)])
+    assert projected[:, EXPENSES] == pytest.approx([400 + 10 * x for x in range(24, 30)])
+
+
+def _random_records(count, seed):
+    rng = random.Random(seed)
+    return [
+        RevenueData(month=f"{rng.randint(2020, 2024)}-{rng.randint(1, 12):02d}", revenue=rng.uniform(20000, 90000),
+                    expenses=rng.uniform(5000, 60000), business_type=rng.choice(list(BusinessType)),
+                    tax_type=rng.choice(list(TaxType)), service_revenue=rng.choice([0, rng.uniform(0, 20000)]))
+        for _ in range(count)
+    ]
+
+
+@pytest.fixture
+def tax_index(db):
+    agent = LiveFinancialAgent(1, db)
+    agent.insight_writer.close()
+    return agent._tax_index
+
+
+def _assert_same_forecast(actual, expected):
+    assert actual.keys() == expected.keys()
+    for key, value in expected.items():
+        if key != "by_business_type":
+            assert actual[key] == pytest.approx(value)
+    assert actual["by_business_type"].keys() == expected["by_business_type"].keys()
+    for business_type, series in expected["by_business_type"].items():
+        for key, value in series.items():
+            assert actual["by_business_type"][business_type][key] == pytest.approx(value)
+
+
+def test_forecast_updated_in_month_order_matches_a_rebuild(tax_index):
+    records = sorted(_random_records(300, 1), key=lambda r: r.month)
+    forecaster = RevenueForecaster()
+    for record in records:
+        forecaster.add(record)
+    assert not forecaster._stale
+    rebuilt = RevenueForecaster(RevenueStore(records))
+    _assert_same_forecast(forecaster.forecast(12, tax_index), rebuilt.forecast(12, tax_index))
+
+
+def test_forecast_after_out_of_order_records_and_corrections_matches_a_rebuild(tax_index):
+    records = _random_records(300, 2)
+    store = RevenueStore(records[:200])
+    forecaster = RevenueForecaster(store)
+    first = forecaster.forecast(6, tax_index)
+    for record in records[200:]:
+        store.append(record)
+        forecaster.add(record)
+    corrected = records[3].model_copy(update={"revenue": records[3].revenue * 2})
+    store[3] = corrected
+    forecaster.replace(records[3], corrected)
+    assert forecaster._stale  # closed months changed, so the next forecast refits
+
+    latest = forecaster.forecast(6, tax_index)
+    assert latest is not first  # new records drop the cached forecast
+    assert forecaster.forecast(6, tax_index) is latest
+    _assert_same_forecast(latest, RevenueForecaster(store).forecast(6, tax_index))
+
+
+def test_forecast_follows_the_tax_rules(tax_index):
+    forecaster = RevenueForecaster(RevenueStore(_random_records(100, 3)))
+    before = forecaster.forecast(6, tax_index)
+    untaxed = forecaster.forecast(6, TaxRuleIndex([]))
+    assert untaxed["revenue"] == before["revenue"]
+    assert untaxed["tax_liability"] == [0.0] * 6
+    assert any(before["tax_liability"])
+
+
+def test_forecast_horizon_is_bounded(tax_index):
+    forecaster = RevenueForecaster()
+    assert forecaster.forecast(3, tax_index)["months"] == []
+    for months in (0, MAX_FORECAST_MONTHS + 1):
+        with pytest.raises(ValueError):
+            forecaster.forecast(months, tax_index)
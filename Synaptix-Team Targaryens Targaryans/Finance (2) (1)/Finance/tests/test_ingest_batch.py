@@ -0,0 +1,79 @@
+import threading
+import pytest
+from database import FinancialDB
+from financial_agent import LiveFinancialAgent
+from models import RevenueData, BusinessType, TaxType
+from sample_datasets import load_sample_dataset
+
+
+def _history(months=24):
+    business_types = [BusinessType.RETAIL, BusinessType.SERVICES]
+    return [
+        RevenueData(month=f"{2022 + m // 12}-{m % 12 + 1:02d}", revenue=40000 + 1500 * m, expenses=30000 + 800 * m,
+                    business_type=business_types[m % 2],
+                    tax_type=TaxType.PRODUCT_TAX if m % 2 == 0 else TaxType.SERVICE_TAX)
+        for m in range(months)
+    ]
+
+
+@pytest.fixture
+def agents(tmp_path):
+    """Two agents on separate databases, for comparing ways of ingesting the same rows"""
+    databases = [FinancialDB(str(tmp_path / f"{name}.db")) for name in ("batch", "rows")]
+    agents = [LiveFinancialAgent(1, database) for database in databases]
+    yield agents
+    for agent, database in zip(agents, databases):
+        agent.insight_writer.close()
+        database.close()
+
+
+@pytest.fixture
+def transactions(monkeypatch):
+    """Tenants of the FinancialDB transactions opened by the test's own thread"""
+    opened = []
+    original = FinancialDB._transaction
+
+    def counting(self):
+        # Background writers (insights, other tests' agents) use their own threads
+        if threading.current_thread() is threading.main_thread():
+            opened.append(self.tenant_id)
+        return original(self)
+
+    monkeypatch.setattr(FinancialDB, "_transaction", counting)
+    return opened
+
+
+def test_batch_is_written_in_one_transaction(db, transactions):
+    agent = LiveFinancialAgent(1, db)
+    transactions.clear()
+    agent.ingest_batch(_history(1000), source_file="big.csv")
+    assert transactions == [1]
+    assert len(db.for_tenant(1).get_all_revenue_data()) == 1000
+    agent.insight_writer.close()
+
+
+def test_batch_insights_match_row_by_row_ingest(agents):
+    batch, rows = agents
+    batch.ingest_batch(_history(), source_file="upload.csv")
+    from_batch = batch.analyze_pending()
+    for record in _history():
+        rows.ingest_revenue_data(record, source_file="upload.csv")
+        from_rows = rows.analyze_pending()
+
+    assert [(i.insight_type, i.title) for i in from_batch] == [(i.insight_type, i.title) for i in from_rows]
+    assert {i.insight_type for i in from_batch} == {"tax_analysis", "trend_analysis", "competitive_analysis"}
+    # The same data, though row-by-row analysis also generated an insight set for every earlier row
+    summaries = [agent.get_financial_summary() for agent in agents]
+    assert [summary.pop("recent_insights") for summary in summaries] == [3, 3 * len(_history()) - 2]
+    assert summaries[0] == summaries[1]
+
+
+def test_sample_dataset_loads_as_one_batch(db, transactions):
+    agent = LiveFinancialAgent(1, db)
+    transactions.clear()
+    result = load_sample_dataset(agent, "comprehensive")
+    assert result["loaded_months"] == 8
+    assert result["total_insights"] > 0
+    assert transactions == [1]
+    assert len(agent.revenue_memory) == 8
+    agent.insight_writer.close()
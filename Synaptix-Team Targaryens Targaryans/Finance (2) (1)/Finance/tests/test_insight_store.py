@@ -0,0 +1,94 @@
+import random
+import pytest
+from financial_agent import LiveFinancialAgent
+from insight_store import InsightStore
+from models import FinancialInsight
+
+TYPES = ["tax_analysis", "trend_analysis", "competitive_analysis", "anomaly_detection"]
+
+
+def _insights(count, seed=0):
+    rng = random.Random(seed)
+    return [FinancialInsight(insight_type=rng.choice(TYPES), title=f"insight {i}", description="-", impact="-",
+                             recommendation="-", confidence=0.5) for i in range(count)]
+
+
+def _titles(insights):
+    return [insight.title for insight in insights]
+
+
+def _latest_by_scan(insights, limit, insight_type=None):
+    matching = [i for i in insights if insight_type is None or i.insight_type == insight_type]
+    return _titles(matching[::-1][:limit])
+
+
+def test_latest_per_type_matches_a_scan():
+    insights = _insights(200, 1)
+    store = InsightStore(insights)
+    for insight_type in [None, *TYPES, "unknown"]:
+        for limit in (0, 1, 7, 500):
+            assert _titles(store.latest(limit, insight_type)) == _latest_by_scan(insights, limit, insight_type)
+        assert store.count(insight_type) == len(_latest_by_scan(insights, 500, insight_type))
+
+
+def test_retention_drops_the_oldest_insights():
+    insights = _insights(50, 2)
+    store = InsightStore(insights[:5], retention=20)
+    assert store.complete
+    for start in range(5, 50, 9):
+        store.extend(insights[start:start + 9])
+    assert len(store) == 20
+    assert not store.complete
+    assert _titles(store) == _titles(insights[-20:])
+    for insight_type in TYPES:
+        assert _titles(store.latest(50, insight_type)) == _latest_by_scan(insights[-20:], 50, insight_type)
+
+
+def test_removed_types_are_gone():
+    insights = _insights(60, 3)
+    store = InsightStore(insights)
+    removed = store.remove_types(["tax_analysis", "trend_analysis", "unknown"])
+    kept = [i for i in insights if i.insight_type not in ("tax_analysis", "trend_analysis")]
+    assert removed == len(insights) - len(kept)
+    assert _titles(store) == _titles(kept)
+    assert _titles(store.latest(10)) == _latest_by_scan(kept, 10)
+    store.clear()
+    assert (len(store), store.latest(5), store.complete) == (0, [], True)
+
+
+@pytest.fixture
+def agent(db):
+    agent = LiveFinancialAgent(1, db, insight_retention=10)
+    yield agent
+    agent.insight_writer.close()
+
+
+def test_requests_past_retention_are_read_from_the_database(agent):
+    insights = _insights(40, 4)
+    for start in range(0, 40, 8):
+        agent._record_insights(insights[start:start + 8])
+    assert len(agent.insights_history) == 10
+
+    # Served from memory, then from the database once the writer has caught up
+    assert _titles(agent.get_latest_insights(5)) == _latest_by_scan(insights, 5)
+    assert _titles(agent.get_latest_insights(25)) == _latest_by_scan(insights, 25)
+    for insight_type in TYPES:
+        assert _titles(agent.get_latest_insights(40, insight_type)) == _latest_by_scan(insights, 40, insight_type)
+
+
+def test_a_reloaded_agent_knows_whether_memory_is_complete(agent, db):
+    agent._record_insights(_insights(4, 5))
+    agent.insight_writer.flush()
+    reloaded = LiveFinancialAgent(1, db, insight_retention=10)
+    assert reloaded.insights_history.complete
+    assert _titles(reloaded.get_latest_insights(10)) == _latest_by_scan(_insights(4, 5), 10)
+    reloaded.insight_writer.close()
+
+    agent._record_insights(_insights(20, 6))
+    agent.insight_writer.flush()
+    reloaded = LiveFinancialAgent(1, db, insight_retention=10)
+    assert len(reloaded.insights_history) == 10
+    assert not reloaded.insights_history.complete
+    everything = _insights(4, 5) + _insights(20, 6)
+    assert _titles(reloaded.get_latest_insights(15)) == _latest_by_scan(everything, 15)
+    reloaded.insight_writer.close()
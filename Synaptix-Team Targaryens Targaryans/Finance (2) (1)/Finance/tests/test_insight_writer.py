@@ -0,0 +1,56 @@
+import pytest
+from insight_writer import InsightWriter
+from models import FinancialInsight
+
+
+class _FlakyDB:
+    """Stands in for FinancialDB: fails every write until `failing` is cleared"""
+
+    def __init__(self):
+        self.failing = True
+        self.saved = []
+
+    def save_tenant_insights(self, batch):
+        if self.failing:
+            raise OSError("disk I/O error")
+        self.saved.extend(batch)
+
+
+def _insight(title):
+    return FinancialInsight(insight_type="tax_analysis", title=title, description="-", impact="-",
+                            recommendation="-", confidence=0.9)
+
+
+@pytest.fixture
+def writer():
+    # A long interval keeps the background thread out of the way; the tests flush themselves
+    writer = InsightWriter(_FlakyDB(), interval=60, max_attempts=3)
+    yield writer
+    writer.db.failing = False
+    writer.close()
+
+
+def test_failed_batch_is_retried(writer):
+    writer.submit([_insight("a")], tenant_id=1)
+    with pytest.raises(OSError):
+        writer.flush()
+    writer.db.failing = False
+    writer.flush()
+    assert [insight.title for _, insight in writer.db.saved] == ["a"]
+    assert writer.metrics()["insights_dropped"] == 0
+
+
+def test_batch_is_dropped_after_max_attempts(writer, caplog):
+    writer.submit([_insight("a"), _insight("b")], tenant_id=1)
+    for _ in range(3):
+        with pytest.raises(OSError):
+            writer.flush()
+    assert writer.metrics()["queue_depth"] == 0
+    assert writer.metrics()["insights_dropped"] == 2
+    assert "Dropping 2 insights after 3 failed flushes" in caplog.text
+
+    # Later insights are written once the database recovers
+    writer.db.failing = False
+    writer.submit([_insight("c")], tenant_id=1)
+    writer.flush()
+    assert [insight.title for _, insight in writer.db.saved] == ["c"]
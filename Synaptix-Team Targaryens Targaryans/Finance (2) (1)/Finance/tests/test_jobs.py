@@ -0,0 +1,125 @@
+import asyncio
+import io
+import httpx
+import pytest
+from blocking import BlockingExecutor
+from jobs import IngestJobQueue
+from tenants import TenantRegistry
+
+HEADER = "month,revenue,expenses,business_type,tax_type,service_revenue,product_revenue\n"
+
+
+class _Upload:
+    """The parts of UploadFile that IngestJobQueue reads"""
+
+    def __init__(self, filename, content: str):
+        self.filename = filename
+        self.stream = io.BytesIO(content.encode())
+
+    async def read(self, size=-1):
+        return self.stream.read(size)
+
+
+def _csv(january_revenue):
+    return (HEADER + f"2024-01,{january_revenue},400,retail,product_tax,0,{january_revenue}\n"
+            "2024-02,500,400,retail,product_tax,0,500\n")
+
+
+@pytest.fixture
+def queue(db):
+    tenants = TenantRegistry(db)
+    blocking = BlockingExecutor()
+    queue = IngestJobQueue(tenants, blocking)
+    yield queue
+    queue.shutdown()
+    blocking.shutdown()
+    tenants.insight_writer.close()
+
+
+def _upload(queue, filename, content, wait=True):
+    result = asyncio.run(queue.submit_upload(_Upload(filename, content), tenant_id=1))
+    if wait and not result["duplicate"]:
+        queue.jobs[result["job_id"]].done.wait(timeout=10)
+    return result
+
+
+def _january(queue):
+    stored = {r.month: r.revenue for r in queue.tenants.db.for_tenant(1).get_all_revenue_data()}
+    in_memory = {r.month: r.revenue for r in queue.tenants.get(1).revenue_memory}
+    assert stored == in_memory
+    return stored["2024-01"]
+
+
+def test_identical_reupload_is_a_duplicate(queue):
+    first = _upload(queue, "sales.csv", _csv(1000))
+    again = _upload(queue, "sales.csv", _csv(1000))
+    assert again["duplicate"]
+    assert again["job_id"] == first["job_id"]
+
+
+def test_reverting_to_an_earlier_version_is_imported(queue):
+    _upload(queue, "sales.csv", _csv(1000))
+    _upload(queue, "sales.csv", _csv(2000))
+    assert _january(queue) == 2000
+    reverted = _upload(queue, "sales.csv", _csv(1000))
+    assert not reverted["duplicate"]
+    assert _january(queue) == 1000
+
+
+def test_imports_of_one_file_apply_in_submission_order(queue):
+    jobs = [_upload(queue, "sales.csv", _csv(revenue), wait=False) for revenue in (1000, 2000, 3000, 1000)]
+    for job in jobs:
+        queue.jobs[job["job_id"]].done.wait(timeout=10)
+    assert _january(queue) == 1000
+
+
+def test_finished_job_reports_counts_and_throughput(queue):
+    content = _csv(1000) + "2024-03,oops,400,retail,product_tax,0,0\n"
+    job = _upload(queue, "sales.csv", content)
+    progress = queue.get(job["job_id"], tenant_id=1)
+    assert progress["status"] == "completed"
+    assert (progress["rows_accepted"], progress["rows_rejected"]) == (2, 1)
+    assert progress["errors"] == [{"row": 3, "error": "revenue must be a number"}]
+    assert progress["progress"] == 1.0
+    assert progress["progress_done"] == progress["progress_total"] == len(content)
+    assert progress["rows_per_second"] > 0
+    assert queue.get(job["job_id"], tenant_id=2) is None
+
+    [upload] = queue.tenants.db.for_tenant(1).get_file_uploads_page()["items"]
+    assert (upload["status"], upload["records_count"], upload["rows_rejected"]) == ("completed", 2, 1)
+
+
+def test_failed_import_is_recorded_for_the_history(queue):
+    job = _upload(queue, "sales.json", '{"not": "an array"}')
+    assert queue.get(job["job_id"], tenant_id=1)["status"] == "failed"
+    [upload] = queue.tenants.db.for_tenant(1).get_file_uploads_page()["items"]
+    assert upload["status"] == "failed"
+    assert "must be an array" in upload["error"]
+
+
+def test_forgotten_job_is_reported_from_its_upload_record(queue):
+    job = _upload(queue, "sales.csv", _csv(1000))
+    queue.jobs.clear()
+    assert queue.get(job["job_id"], tenant_id=1) == {
+        "job_id": job["job_id"], "filename": "sales.csv", "status": "completed", "rows_accepted": 2,
+        "rows_rejected": 0, "insights_generated": 3, "error": None
+    }
+
+
+async def _upload_through_the_api(app, content):
+    transport = httpx.ASGITransport(app=app.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        accepted = await client.post("/api/upload-dataset", files={"file": ("api.csv", content)})
+        app.ingest_jobs.jobs[accepted.json()["job_id"]].done.wait(timeout=10)
+        progress = await client.get(accepted.json()["status_url"])
+        missing = await client.get("/api/jobs/no-such-job")
+    return accepted, progress, missing
+
+
+def test_upload_is_accepted_at_once_and_tracked_by_job_id(app):
+    accepted, progress, missing = asyncio.run(_upload_through_the_api(app, _csv(1234)))
+    assert accepted.status_code == 202
+    assert accepted.json()["status"] == "accepted"
+    assert progress.json()["status"] == "completed"
+    assert progress.json()["rows_accepted"] == 2
+    assert missing.status_code == 404
@@ -0,0 +1,75 @@
+import pytest
+from financial_agent import LiveFinancialAgent
+from models import RevenueData, BusinessType, TaxType
+
+
+def _records(months, revenue=50000):
+    return [RevenueData(month=f"2024-{m:02d}", revenue=revenue + 1000 * m, expenses=30000,
+                        business_type=BusinessType.RETAIL, tax_type=TaxType.PRODUCT_TAX) for m in months]
+
+
+@pytest.fixture
+def agent(db, monkeypatch):
+    agent = LiveFinancialAgent(1, db)
+    agent.analyzed = []
+    analyze = agent._analyze_record
+
+    def recording(index):
+        agent.analyzed.append(agent.revenue_memory[index].month)
+        return analyze(index)
+
+    monkeypatch.setattr(agent, "_analyze_record", recording)
+    yield agent
+    agent.insight_writer.close()
+
+
+def test_ingest_only_bumps_the_data_version(agent):
+    version = agent.ingest_batch(_records(range(1, 13)), source_file="upload.csv")
+    assert version == agent.data_version == 1
+    assert agent.insights_version == 0
+    assert agent.insights_stale
+    assert agent.analyzed == []
+    assert len(agent.insights_history) == 0
+
+
+def test_insights_are_generated_once_when_first_requested(agent):
+    agent.ingest_batch(_records(range(1, 13)), source_file="upload.csv")
+    first = agent.get_insights()
+    assert (first["status"], first["data_version"]) == ("fresh", 1)
+    assert first["insights"]
+    assert agent.analyzed == ["2024-12"]  # only the newest record of the bulk load
+
+    second = agent.get_insights()
+    assert (second["status"], second["data_version"]) == ("cached", 1)
+    assert [i.title for i in second["insights"]] == [i.title for i in first["insights"]]
+    assert agent.analyzed == ["2024-12"]
+
+
+def test_several_loads_between_requests_are_analysed_once(agent):
+    agent.ingest_batch(_records(range(1, 7)), source_file="first.csv")
+    agent.ingest_batch(_records(range(7, 10)), source_file="second.csv")
+    # A correction to an earlier row does not move the analysis off the newest change
+    agent.ingest_batch(_records([2], revenue=90000), source_file="first.csv")
+    assert agent.data_version == 3
+    assert agent.get_insights()["data_version"] == 3
+    assert agent.analyzed == ["2024-09"]
+
+
+def test_unchanged_data_is_not_reanalysed(agent):
+    agent.ingest_batch(_records(range(1, 4)), source_file="upload.csv")
+    agent.analyze_pending()
+    agent.ingest_batch(_records(range(1, 4)), source_file="upload.csv")
+    assert not agent.insights_stale
+    assert agent.analyze_pending() == []
+    assert agent.analyzed == ["2024-03"]
+
+
+def test_dropping_the_pending_record_leaves_nothing_to_analyse(agent):
+    agent.ingest_batch(_records(range(1, 4)), source_file="upload.csv")
+    agent.analyze_pending()
+    agent.ingest_batch([RevenueData(month="2024-04", revenue=1000, expenses=5000, business_type=BusinessType.RETAIL,
+                                    tax_type=TaxType.PRODUCT_TAX)], source_file="upload.csv")
+    agent.clear_loss_data()
+    assert not agent.insights_stale
+    assert agent.get_insights()["status"] == "cached"
+    assert agent.analyzed == ["2024-03"]
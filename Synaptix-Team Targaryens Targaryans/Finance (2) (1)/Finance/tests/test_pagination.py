@@ -0,0 +1,78 @@
+import pytest
+from models import RevenueData, BusinessType, TaxType
+from pagination import MAX_PAGE_SIZE, DEFAULT_PAGE_SIZE, clamp_limit, decode_cursor, encode_cursor
+
+
+def _records(months, business_type=BusinessType.RETAIL):
+    return [RevenueData(month=f"2024-{m:02d}", revenue=1000 + m, expenses=400, business_type=business_type,
+                        tax_type=TaxType.PRODUCT_TAX) for m in months]
+
+
+def _walk(fetch, limit):
+    """Every item of every page, following next_cursor until the last page"""
+    items, cursor, pages = [], None, 0
+    while True:
+        result = fetch(cursor=cursor, limit=limit)
+        items += result["items"]
+        pages += 1
+        cursor = result["next_cursor"]
+        if cursor is None:
+            return items, pages
+
+
+@pytest.fixture
+def tenant(db):
+    tenant = db.for_tenant(1)
+    # Several rows per month, stored out of month order
+    tenant.save_revenue_batch(_records([7, 3, 12, 1, 5]), "sales.csv")
+    tenant.save_revenue_batch(_records([3, 9, 1], BusinessType.SERVICES), "sales.csv")
+    tenant.save_revenue_batch(_records([2, 3, 4]), "branch.csv")
+    db.for_tenant(2).save_revenue_batch(_records(range(1, 13)), "sales.csv")
+    return tenant
+
+
+def test_pages_cover_every_row_once_in_month_order(tenant):
+    items, pages = _walk(tenant.get_revenue_page, limit=3)
+    assert pages == 4
+    assert [r["id"] for r in items] == [r["id"] for r in sorted(items, key=lambda r: (r["month"], r["id"]))]
+    assert len({r["id"] for r in items}) == len(items) == 11
+
+
+def test_pages_of_one_file(tenant):
+    items, _ = _walk(lambda **page: tenant.get_revenue_page(source_file="branch.csv", **page), limit=2)
+    assert [(r["month"], r["source_file"]) for r in items] == [("2024-02", "branch.csv"), ("2024-03", "branch.csv"),
+                                                              ("2024-04", "branch.csv")]
+
+
+def test_rows_added_behind_the_cursor_do_not_shift_later_pages(tenant):
+    first = tenant.get_revenue_page(limit=4)
+    tenant.save_revenue_batch(_records([1]), "late.csv")  # sorts before the cursor
+    rest, _ = _walk(lambda cursor, limit: tenant.get_revenue_page(cursor=cursor or first["next_cursor"], limit=limit),
+                    limit=4)
+    seen = [r["id"] for r in first["items"] + rest]
+    assert len(seen) == len(set(seen)) == 11
+
+
+def test_upload_history_pages_newest_first(db):
+    tenant = db.for_tenant(1)
+    ids = [tenant.claim_upload(f"file{i}.csv", "csv", f"job{i}", f"hash{i}")[0] for i in range(5)]
+    uploads, pages = _walk(tenant.get_file_uploads_page, limit=2)
+    assert pages == 3
+    assert [u["id"] for u in uploads] == ids[::-1]
+    assert db.for_tenant(2).get_file_uploads_page()["items"] == []
+
+
+def test_limits_are_clamped():
+    assert clamp_limit(None) == DEFAULT_PAGE_SIZE
+    assert clamp_limit(0) == DEFAULT_PAGE_SIZE
+    assert clamp_limit(-5) == 1
+    assert clamp_limit(10_000) == MAX_PAGE_SIZE
+
+
+@pytest.mark.parametrize("token", ["not base64!", encode_cursor("2024-01"), encode_cursor("2024-01", 3, 4),
+                                   encode_cursor()[:-1] + "{"])
+def test_malformed_cursors_are_rejected(tenant, token):
+    with pytest.raises(ValueError):
+        decode_cursor(token, 2)
+    with pytest.raises(ValueError):
+        tenant.get_revenue_page(cursor=token)
@@ -0,0 +1,123 @@
+import random
+import pytest
+from financial_agent import LiveFinancialAgent
+from models import RevenueData, BusinessType, TaxType
+from portfolio import portfolio_rollup
+
+
+def _random_records(count, seed, revenue=(20000, 90000)):
+    rng = random.Random(seed)
+    records = []
+    for _ in range(count):
+        amount = rng.uniform(*revenue)
+        service = rng.choice([0.0, round(amount * rng.random(), 2)])
+        records.append(RevenueData(
+            month=f"{rng.randint(2022, 2024)}-{rng.randint(1, 12):02d}", revenue=amount,
+            expenses=rng.uniform(10000, 80000), business_type=rng.choice(list(BusinessType)),
+            tax_type=rng.choice(list(TaxType)), service_revenue=service, product_revenue=amount - service if service else 0
+        ))
+    return records
+
+
+@pytest.fixture
+def agent(db):
+    agent = LiveFinancialAgent(1, db)
+    for seed, source in enumerate(["north.csv", "south.csv", "manual"]):
+        agent.ingest_batch(_random_records(80, seed), source_file=source)
+    # Corrections: same months and sources with new figures
+    agent.ingest_batch(_random_records(80, 0, revenue=(1000, 5000)), source_file="north.csv")
+    yield agent
+    agent.insight_writer.close()
+
+
+def _rows_by_scan(db):
+    """What revenue_rollups should hold, summed from the stored records"""
+    rows = {}
+    for record, source in db.get_revenue_with_sources():
+        key = (source, record.business_type.value, record.tax_type.value, record.month)
+        sums = rows.setdefault(key, [0, 0.0, 0.0, 0.0, 0.0])
+        for i, value in enumerate((1, record.revenue, record.expenses, record.service_revenue, record.product_revenue)):
+            sums[i] += value
+    return rows
+
+
+def test_rollup_rows_follow_inserts_and_corrections(agent, db):
+    tenant = db.for_tenant(1)
+    expected = _rows_by_scan(tenant)
+    stored = {tuple(row[:4]): list(row[4:]) for row in tenant.get_revenue_rollups()}
+    assert stored.keys() == expected.keys()
+    for key, sums in expected.items():
+        assert stored[key] == pytest.approx(sums)
+
+    agent.clear_all_data()
+    assert tenant.get_revenue_rollups() == []
+
+
+def _tax_by_scan(agent, record):
+    net_income = record.revenue - record.expenses
+    rule = next((rule for rule in agent.tax_rules
+                 if rule.business_type == record.business_type and rule.tax_type == record.tax_type
+                 and rule.income_bracket_min <= net_income <= rule.income_bracket_max), None)
+    if rule is None:
+        return 0.0
+    split = record.service_revenue if record.tax_type == TaxType.SERVICE_TAX else record.product_revenue
+    return ((split or record.revenue) - record.expenses) * rule.tax_rate
+
+
+def _portfolio_by_scan(agent, group_by, start="0000-00", stop="9999-99"):
+    groups = {}
+    for record, source in agent.db.get_revenue_with_sources():
+        if not start <= record.month <= stop:
+            continue
+        labels = {"business": source, "business_type": record.business_type.value,
+                  "tax_type": record.tax_type.value, "month": record.month}
+        sums = groups.setdefault(tuple(labels[d] for d in group_by), {"records": 0, "revenue": 0.0, "expenses": 0.0,
+                                                                        "tax": 0.0})
+        sums["records"] += 1
+        sums["revenue"] += record.revenue
+        sums["expenses"] += record.expenses
+        sums["tax"] += _tax_by_scan(agent, record)
+    return groups
+
+
+@pytest.mark.parametrize("group_by", [["business"], ["business_type", "tax_type"], ["month"],
+                                      ["business", "business_type", "month"], []])
+def test_groups_match_a_loop_over_the_records(agent, group_by):
+    portfolio = agent.get_portfolio(group_by)
+    expected = _portfolio_by_scan(agent, group_by)
+    actual = {tuple(group[d] for d in group_by): group for group in portfolio["groups"]}
+    assert actual.keys() == expected.keys()
+    for key, sums in expected.items():
+        group = actual[key]
+        assert group["records"] == sums["records"]
+        assert [group["revenue"], group["expenses"], group["tax"]] == pytest.approx(
+            [sums["revenue"], sums["expenses"], sums["tax"]])
+        profit = sums["revenue"] - sums["expenses"]
+        assert group["profit"] == pytest.approx(profit)
+        assert group["margin"] == pytest.approx(profit * 100 / sums["revenue"])
+        assert group["net_income"] == pytest.approx(profit - sums["tax"])
+    assert portfolio["totals"]["records"] == len(agent.revenue_memory)
+
+
+def test_month_range_limits_the_rollup(agent):
+    portfolio = agent.get_portfolio(["month"], "2023-03..2023-08")
+    expected = _portfolio_by_scan(agent, ["month"], "2023-03", "2023-08")
+    assert [group["month"] for group in portfolio["groups"]] == sorted(month for month, in expected)
+    assert portfolio["totals"]["revenue"] == pytest.approx(sum(sums["revenue"] for sums in expected.values()))
+    assert agent.get_portfolio(["month"], "..2022-02")["groups"] == [
+        group for group in agent.get_portfolio(["month"])["groups"] if group["month"] <= "2022-02"]
+
+
+def test_business_types_are_compared_with_their_benchmark(agent):
+    margins = {b.business_type.value: b.avg_profit_margin * 100 for b in agent.competitor_benchmarks}
+    for group in agent.get_portfolio(["business_type"])["groups"]:
+        assert group["benchmark_margin"] == pytest.approx(margins[group["business_type"]])
+        assert group["margin_vs_benchmark"] == pytest.approx(group["margin"] - margins[group["business_type"]])
+
+
+def test_unknown_dimensions_and_empty_portfolios(agent):
+    with pytest.raises(ValueError, match="Cannot group by region"):
+        portfolio_rollup([], ["region"], agent._tax_index, [])
+    empty = portfolio_rollup([], ["business"], agent._tax_index, [])
+    assert empty["groups"] == []
+    assert (empty["totals"]["records"], empty["totals"]["revenue"], empty["totals"]["margin"]) == (0, 0.0, 0.0)
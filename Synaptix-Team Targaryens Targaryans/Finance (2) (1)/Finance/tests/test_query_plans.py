@@ -0,0 +1,35 @@
+import pytest
+
+# Hot queries and the index each one must use
+HOT_QUERIES = [
+    # Every per-tenant query is scoped by tenant_id first
+    ("SELECT id FROM revenue_data WHERE tenant_id = ? ORDER BY month", (1,), "idx_revenue_tenant_month"),
+    ("SELECT id FROM revenue_data WHERE tenant_id = ? AND source_file = ? ORDER BY month", (1, "sales.csv"),
+     "idx_revenue_tenant_source_month"),
+    ("SELECT id FROM insights WHERE tenant_id = ? ORDER BY created_at DESC, id DESC LIMIT ?", (1, 10),
+     "idx_insights_tenant_created"),
+    ("SELECT id FROM insights WHERE tenant_id = ? AND insight_type = ? ORDER BY created_at DESC, id DESC LIMIT ?",
+     (1, "tax_analysis", 10), "idx_insights_tenant_type_created"),
+    # Keyset pages: later pages must seek, not scan past the earlier ones
+    ("SELECT id FROM revenue_data WHERE tenant_id = ? AND (month, id) > (?, ?) ORDER BY month, id LIMIT ?",
+     (1, "2024-06", 100, 51), "idx_revenue_tenant_month"),
+    ("SELECT id FROM revenue_data WHERE tenant_id = ? AND source_file = ? AND (month, id) > (?, ?) "
+     "ORDER BY month, id LIMIT ?", (1, "sales.csv", "2024-06", 100, 51), "idx_revenue_tenant_source_month"),
+    ("SELECT id FROM file_uploads WHERE tenant_id = ? AND id < ? ORDER BY id DESC LIMIT ?", (1, 100, 51),
+     "idx_uploads_tenant"),
+    ("SELECT id FROM file_uploads WHERE tenant_id = ? AND filename = ? ORDER BY id DESC LIMIT 1", (1, "sales.csv"),
+     "idx_uploads_tenant_filename"),
+    ("SELECT row_hash FROM revenue_row_keys WHERE tenant_id = ? AND source_file = ?", (1, "sales.csv"),
+     "sqlite_autoindex_revenue_row_keys_1"),
+    ("SELECT row_hash FROM revenue_row_keys WHERE tenant_id = ? AND source_file = ? AND month = ? AND business_type = ?",
+     (1, "manual", "2024-06", "retail"), "sqlite_autoindex_revenue_row_keys_1"),
+    ("SELECT revenue FROM revenue_rollups WHERE tenant_id = ?", (1,), "sqlite_autoindex_revenue_rollups_1"),
+]
+
+
+@pytest.mark.parametrize("query, params, index", HOT_QUERIES)
+def test_hot_query_uses_its_index(db, query, params, index):
+    plan = db.explain(query, params)
+    assert any(index in step for step in plan), plan
+    assert not any("TEMP B-TREE" in step for step in plan), plan
+
@@ -0,0 +1,58 @@
+import asyncio
+import pytest
+from blocking import BlockingExecutor
+from models import RevenueData, BusinessType, TaxType
+from revenue_batcher import RevenueBatcher
+from tenants import TenantRegistry
+
+TENANTS = 20
+
+
+def _record(month):
+    return RevenueData(month=month, revenue=1000, expenses=400, business_type=BusinessType.RETAIL,
+                       tax_type=TaxType.PRODUCT_TAX)
+
+
+@pytest.fixture
+def batcher(db):
+    tenants = TenantRegistry(db)
+    blocking = BlockingExecutor()
+    yield RevenueBatcher(tenants, blocking, analysis_delay=0.01)
+    blocking.shutdown()
+    tenants.insight_writer.close()
+
+
+async def _submit_and_settle(batcher, submissions):
+    versions = await asyncio.gather(*(batcher.submit(_record(month), tenant) for tenant, month in submissions))
+    while batcher._analysis_timers or batcher._tasks:  # the debounced analyses
+        await asyncio.sleep(0.01)
+    return versions
+
+
+def test_a_tenants_submissions_share_one_commit(batcher):
+    versions = asyncio.run(_submit_and_settle(batcher, [(1, f"2024-{m:02d}") for m in range(1, 13)]))
+    assert versions == [1] * 12
+    assert batcher.metrics()["groups_committed"] == 1
+    assert len(batcher.tenants.get(1).revenue_memory) == 12
+
+
+def test_nothing_is_kept_per_tenant_once_commits_finish(batcher):
+    submissions = [(tenant, f"2024-{m:02d}") for tenant in range(1, TENANTS + 1) for m in (1, 2)]
+    asyncio.run(_submit_and_settle(batcher, submissions))
+    assert batcher.metrics()["records_committed"] == 2 * TENANTS
+    assert batcher.metrics()["analyses_run"] == TENANTS
+    assert batcher._commit_locks == {}
+    assert not batcher._committing
+    assert batcher._tasks == set()
+
+
+def test_failed_commit_releases_its_lock(batcher, monkeypatch):
+    agent = batcher.tenants.get(1)
+
+    def fail(records, source_file="manual"):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(agent, "ingest_revenue_group", fail)
+    with pytest.raises(RuntimeError):
+        asyncio.run(_submit_and_settle(batcher, [(1, "2024-01")]))
+    assert batcher._commit_locks == {}
@@ -0,0 +1,121 @@
+import random
+import numpy as np
+import pytest
+from financial_agent import LiveFinancialAgent
+from models import RevenueData, BusinessType, TaxType
+from revenue_store import INITIAL_CAPACITY, UNKNOWN_MONTH, RevenueStore, month_ordinal
+
+
+def _random_records(count, seed):
+    rng = random.Random(seed)
+    records = []
+    for _ in range(count):
+        revenue = round(rng.uniform(1000, 90000), 2)
+        service = round(rng.choice([0, rng.uniform(0, revenue)]), 2)
+        records.append(RevenueData(
+            month=f"{rng.randint(2020, 2024)}-{rng.randint(1, 12):02d}", revenue=revenue,
+            expenses=round(rng.uniform(1000, 90000), 2), business_type=rng.choice(list(BusinessType)),
+            tax_type=rng.choice(list(TaxType)), service_revenue=service,
+            product_revenue=round(revenue - service, 2) if service else 0
+        ))
+    return records
+
+
+def _fields(record):
+    return record.model_dump(exclude={"timestamp"})
+
+
+def test_rows_round_trip_through_the_columns():
+    records = _random_records(50, 1)
+    store = RevenueStore(records[:10])
+    for record in records[10:30]:
+        store.append(record)
+    store.extend(records[30:])
+    assert len(store) == 50
+    assert [_fields(r) for r in store] == [_fields(r) for r in records]
+    assert _fields(store[-1]) == _fields(records[-1])
+    assert [_fields(r) for r in store[5:8]] == [_fields(r) for r in records[5:8]]
+    assert store.month_labels() == [r.month for r in records]
+    assert np.array_equal(store.revenue, [r.revenue for r in records])
+    with pytest.raises(IndexError):
+        store[50]
+
+
+def test_appends_grow_capacity_geometrically():
+    store = RevenueStore()
+    capacities = set()
+    for record in _random_records(10 * INITIAL_CAPACITY, 2):
+        store.append(record)
+        capacities.add(store._capacity)
+    assert sorted(capacities) == [INITIAL_CAPACITY * 2 ** i for i in range(5)]
+    assert len(store) == 10 * INITIAL_CAPACITY
+
+
+def test_filter_and_copy_are_independent_snapshots():
+    records = _random_records(20, 3)
+    store = RevenueStore(records)
+    profitable = store.filter(store.revenue >= store.expenses)
+    assert [_fields(r) for r in profitable] == [_fields(r) for r in records if r.revenue >= r.expenses]
+
+    snapshot = store.copy()
+    store[0] = records[1]
+    store.append(records[2])
+    assert len(snapshot) == 20
+    assert _fields(snapshot[0]) == _fields(records[0])
+
+
+def test_month_ordinals():
+    assert month_ordinal("2024-03") - month_ordinal("2023-03") == 12
+    assert month_ordinal("2024-01") - month_ordinal("2023-12") == 1
+    assert month_ordinal("March") == UNKNOWN_MONTH
+
+
+@pytest.fixture
+def agent(db):
+    agent = LiveFinancialAgent(1, db)
+    agent.ingest_batch(_random_records(300, 4), source_file="upload.csv")
+    yield agent
+    agent.insight_writer.close()
+
+
+def test_profit_and_loss_analyses_match_a_loop_over_the_rows(agent):
+    records = list(agent.revenue_memory)
+    by_month = sorted(range(len(records)), key=lambda i: records[i].month)
+    first, last = records[by_month[0]], records[by_month[-1]]
+    profits = [r.revenue - r.expenses for r in records]
+    first_profit, last_profit = first.revenue - first.expenses, last.revenue - last.expenses
+
+    profit = agent.get_profit_analysis()
+    assert profit["current_profit"] == pytest.approx(last_profit)
+    assert profit["average_profit"] == pytest.approx(sum(profits) / len(profits))
+    assert profit["profit_trend"] == pytest.approx((last_profit - first_profit) / first_profit * 100)
+
+    losses = [max(0.0, r.expenses - r.revenue) for r in records]
+    loss = agent.get_loss_analysis()
+    assert loss["total_losses"] == pytest.approx(sum(losses))
+    assert loss["loss_months_count"] == sum(1 for value in losses if value > 0)
+    assert loss["biggest_loss"] == pytest.approx(max(losses))
+
+
+def test_tax_analysis_matches_a_loop_over_the_rules(agent):
+    expected = []
+    for record in agent.revenue_memory:
+        net_income = record.revenue - record.expenses
+        rule = next((rule for rule in agent.tax_rules
+                     if rule.business_type == record.business_type and rule.tax_type == record.tax_type
+                     and rule.income_bracket_min <= net_income <= rule.income_bracket_max), None)
+        if rule is None:
+            continue
+        split = record.service_revenue if record.tax_type == TaxType.SERVICE_TAX else record.product_revenue
+        taxable = split if split != 0 else record.revenue
+        expected.append((record.month, (taxable - record.expenses) * rule.tax_rate, rule.tax_rate * 100,
+                         record.tax_type))
+
+    analysis = agent.get_tax_analysis()
+    breakdown = [(m["month"], m["tax_amount"], m["tax_rate"], m["tax_type"]) for m in analysis["monthly_breakdown"]]
+    assert len(breakdown) == len(expected) > 0
+    for actual, wanted in zip(breakdown, expected):
+        assert actual == pytest.approx(wanted)
+    assert analysis["total_tax_paid"] == pytest.approx(sum(amount for _, amount, _, _ in expected))
+    assert analysis["service_vs_product"]["service_months"] == sum(
+        1 for *_, tax_type in expected if tax_type == TaxType.SERVICE_TAX)
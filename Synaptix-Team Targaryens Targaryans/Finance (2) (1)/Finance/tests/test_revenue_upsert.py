@@ -0,0 +1,81 @@
+import pytest
+from financial_agent import LiveFinancialAgent
+from models import RevenueData, BusinessType, TaxType
+
+
+def _month(month, revenue, expenses=400.0, business_type=BusinessType.RETAIL):
+    return RevenueData(month=month, revenue=revenue, expenses=expenses, business_type=business_type,
+                       tax_type=TaxType.PRODUCT_TAX, product_revenue=revenue)
+
+
+@pytest.fixture
+def agent(db):
+    agent = LiveFinancialAgent(1, db)
+    yield agent
+    agent.insight_writer.close()
+
+
+def _assert_matches_database(agent, db):
+    stored = sorted((r.month, r.business_type, r.revenue) for r in db.for_tenant(1).get_all_revenue_data())
+    assert sorted((r.month, r.business_type, r.revenue) for r in agent.revenue_memory) == stored
+
+
+def test_corrected_month_replaces_the_manual_entry(agent, db):
+    agent.ingest_revenue_data(_month("2024-01", 1000))
+    agent.ingest_revenue_data(_month("2024-02", 500))
+    agent.ingest_revenue_data(_month("2024-01", 3000))
+
+    assert len(agent.revenue_memory) == 2
+    assert len(agent.months) == 2
+    summary = agent.get_financial_summary()
+    assert summary["total_revenue"] == 3500
+    assert summary["months_tracked"] == 2
+    assert agent.get_chart_data() == {"months": ["2024-01", "2024-02"], "revenue": [3000.0, 500.0],
+                                      "expenses": [400.0, 400.0]}
+    assert agent.get_trends([2])["windows"]["2"]["revenue_avg"] == 1750.0
+    _assert_matches_database(agent, db)
+
+
+def test_corrected_month_in_a_group_replaces_the_entry(agent, db):
+    agent.ingest_revenue_group([_month("2024-01", 1000), _month("2024-02", 500)])
+    agent.ingest_revenue_group([_month("2024-01", 2000), _month("2024-01", 3000)])
+
+    assert len(agent.revenue_memory) == 2
+    assert agent.get_financial_summary()["total_revenue"] == 3500
+    assert agent.get_chart_data()["revenue"] == [3000.0, 500.0]
+    _assert_matches_database(agent, db)
+
+
+def test_same_month_from_other_sources_or_business_types_is_kept(agent, db):
+    agent.ingest_revenue_data(_month("2024-01", 1000))
+    agent.ingest_revenue_data(_month("2024-01", 200, business_type=BusinessType.SERVICES))
+    agent.ingest_revenue_data(_month("2024-01", 30), source_file="branch.csv")
+
+    assert len(agent.revenue_memory) == 3
+    assert agent.get_chart_data()["revenue"] == [1230.0]
+    _assert_matches_database(agent, db)
+
+
+def test_unchanged_resubmission_keeps_the_data_version(agent):
+    version = agent.ingest_revenue_data(_month("2024-01", 1000))
+    assert agent.ingest_revenue_data(_month("2024-01", 1000)) == version
+
+
+def test_correction_after_reload_updates_memory(agent, db):
+    agent.ingest_batch([_month("2024-01", 1000), _month("2024-02", 500)], source_file="sales.csv")
+    reloaded = LiveFinancialAgent(1, db)
+    reloaded.ingest_batch([_month("2024-01", 9000)], source_file="sales.csv")
+
+    assert len(reloaded.revenue_memory) == 2
+    assert reloaded.get_financial_summary()["total_revenue"] == 9500
+    _assert_matches_database(reloaded, db)
+
+
+def test_profit_analysis_follows_month_order(agent):
+    agent.ingest_revenue_data(_month("2024-03", 5000, expenses=1000))
+    agent.ingest_revenue_data(_month("2024-01", 2000, expenses=1000))
+
+    analysis = agent.get_profit_analysis()
+    assert analysis["current_profit"] == 4000
+    assert analysis["profit_margin"] == 80
+    assert analysis["profit_trend"] == 300
@@ -0,0 +1,43 @@
+import pytest
+from fastapi.testclient import TestClient
+from database import FinancialDB
+from models import RuleSet
+from tenants import TenantRegistry
+
+
+def _cheaper_rules(rules):
+    rules = [rule.model_copy() for rule in rules]
+    rules[0].tax_rate = 0.05
+    return RuleSet(tax_rules=rules).model_dump(mode="json")
+
+
+@pytest.mark.parametrize("method, path", [
+    ("post", "/api/rules"),
+    ("post", "/api/rules/1/activate"),
+])
+def test_changing_rules_requires_an_admin(app, login, method, path):
+    client = TestClient(app.app)
+    body = _cheaper_rules(app.tenants.get(0).tax_rules)
+    assert client.request(method, path, json=body).status_code == 401
+    client.cookies.update(login(f"user-{path}@example.com"))
+    assert client.request(method, path, json=body).status_code == 403
+    client.cookies.update(login(f"admin-{path}@example.com", admin=True))
+    assert client.request(method, path, json=body).status_code == 200
+
+
+def test_rule_upload_requires_an_admin(app):
+    client = TestClient(app.app)
+    files = {"file": ("rules.json", b"{}", "application/json")}
+    assert client.post("/api/rules/upload", files=files).status_code == 401
+
+
+def test_activation_reaches_evicted_agents_still_in_use(tmp_path):
+    tenants = TenantRegistry(FinancialDB(str(tmp_path / "financial_data.db")), memory_budget=1)
+    busy = tenants.get(1)
+    tenants.get(2)  # over budget: tenant 1 is evicted while still referenced
+    assert busy not in tenants.agents()
+    result = tenants.load_rule_set(RuleSet.model_validate(_cheaper_rules(busy.tax_rules)))
+    assert busy.rule_version == result["version"]
+    assert busy.tax_rules[0].tax_rate == 0.05
+    assert tenants.loaded(1) is busy
+    tenants.close()
@@ -0,0 +1,50 @@
+import pytest
+from models import RevenueData, BusinessType, TaxType, TaxRule, ScenarioGrid
+from revenue_store import RevenueStore
+from scenarios import evaluate_scenarios
+from tax_index import TaxRuleIndex
+
+RETAIL_PRODUCT_TAX = TaxRuleIndex([
+    TaxRule(business_type=BusinessType.RETAIL, tax_type=TaxType.PRODUCT_TAX, income_bracket_min=0,
+            income_bracket_max=50000, tax_rate=0.12, description="small"),
+    TaxRule(business_type=BusinessType.RETAIL, tax_type=TaxType.PRODUCT_TAX, income_bracket_min=50000,
+            income_bracket_max=200000, tax_rate=0.18, description="medium"),
+])
+EPSILON = 1e-9
+
+
+def _history(months=3):
+    return RevenueStore(
+        RevenueData(month=f"2024-{m:02d}", revenue=60000, expenses=20000, business_type=BusinessType.RETAIL,
+                    tax_type=TaxType.PRODUCT_TAX, product_revenue=60000)
+        for m in range(1, months + 1)
+    )
+
+
+def _tax_by_share(shares, **grid):
+    result = evaluate_scenarios(_history(), ScenarioGrid(service_share=shares, top=len(shares), **grid),
+                                [("active", RETAIL_PRODUCT_TAX)], [])
+    return {r["service_share"]: r["tax"] for r in result["results"]}
+
+
+@pytest.mark.parametrize("share, expected", [
+    (0.0, 14400.0),  # all revenue is product revenue: 3 × (60000 - 20000) × 12%
+    (EPSILON, 14400.0),
+    (0.5, 3600.0),  # 3 × (30000 - 20000) × 12%
+    (1 - EPSILON, 0.0),  # product revenue below expenses pays nothing, not negative tax
+    (1.0, 0.0),  # no product revenue left to tax
+])
+def test_product_tax_follows_the_service_share(share, expected):
+    assert _tax_by_share([share])[share] == pytest.approx(expected, abs=0.01)
+
+
+def test_tax_never_goes_negative_across_the_grid():
+    grid = ScenarioGrid(revenue_growth=[-0.5, 0.0, 0.5], expense_change=[-0.5, 0.0, 1.0],
+                        service_share=[0.0, EPSILON, 0.25, 0.5, 0.75, 0.99, 1 - EPSILON, 1.0], top=72, rank_by="tax")
+    results = evaluate_scenarios(_history(), grid, [("active", RETAIL_PRODUCT_TAX)], [])["results"]
+    assert len(results) == 72
+    assert min(r["tax"] for r in results) >= 0
+
+
+def test_recorded_split_is_used_without_a_share():
+    assert _tax_by_share([None])[None] == pytest.approx(14400.0)
@@ -0,0 +1,128 @@
+import math
+import random
+import numpy as np
+import pytest
+from financial_agent import LiveFinancialAgent
+from models import RevenueData, TaxRule, BusinessType, TaxType
+from revenue_store import BUSINESS_TYPE_CODES, TAX_TYPE_CODES
+from tax_index import NO_RULE, TaxResultMemo, TaxRuleIndex
+
+
+def _random_rules(count, seed):
+    """Overlapping brackets that share boundaries, with open-ended ones"""
+    rng = random.Random(seed)
+    bounds = [-math.inf, -5000, 0, 10000, 25000, 50000, math.inf]
+    rules = []
+    for i in range(count):
+        low, high = sorted(rng.sample(bounds, 2))
+        rules.append(TaxRule(business_type=rng.choice(list(BusinessType)), tax_type=rng.choice(list(TaxType)),
+                             income_bracket_min=low, income_bracket_max=high, tax_rate=round(rng.random(), 3),
+                             description=f"rule {i}"))
+    return rules
+
+
+def _linear_scan(rules, business_type, tax_type, net_income):
+    for position, rule in enumerate(rules):
+        if (rule.business_type == business_type and rule.tax_type == tax_type
+                and rule.income_bracket_min <= net_income <= rule.income_bracket_max):
+            return position
+    return NO_RULE
+
+
+def _incomes(rng, count):
+    # Every bracket boundary and a point either side of it, plus random incomes
+    edges = [edge + offset for edge in (-5000, 0, 10000, 25000, 50000) for offset in (-0.5, 0, 0.5)]
+    return edges + [rng.uniform(-20000, 80000) for _ in range(count)] + [-math.inf, math.inf]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_index_matches_a_linear_scan(seed):
+    rng = random.Random(seed)
+    rules = _random_rules(20, seed)
+    index = TaxRuleIndex(rules)
+    rows = [(business_type, tax_type, income) for business_type in BusinessType for tax_type in TaxType
+            for income in _incomes(rng, 50)]
+
+    for business_type, tax_type, income in rows:
+        expected = _linear_scan(rules, business_type, tax_type, income)
+        found = index.find(business_type, tax_type, income)
+        assert found is (rules[expected] if expected != NO_RULE else None)
+
+    positions = index.find_positions(
+        np.array([BUSINESS_TYPE_CODES[bt] for bt, _, _ in rows], dtype=np.int8),
+        np.array([TAX_TYPE_CODES[tt] for _, tt, _ in rows], dtype=np.int8),
+        np.array([income for _, _, income in rows])
+    )
+    assert positions.tolist() == [_linear_scan(rules, *row) for row in rows]
+
+
+def test_nan_and_uncovered_groups_match_no_rule():
+    rules = _random_rules(3, 0)
+    index = TaxRuleIndex(rules)
+    covered = {(rule.business_type, rule.tax_type) for rule in rules}
+    uncovered = next((bt, tt) for bt in BusinessType for tt in TaxType if (bt, tt) not in covered)
+    assert index.find(*uncovered, 1000) is None
+    assert index.find(rules[0].business_type, rules[0].tax_type, math.nan) is None
+    codes = np.array([BUSINESS_TYPE_CODES[rules[0].business_type]], dtype=np.int8)
+    taxes = np.array([TAX_TYPE_CODES[rules[0].tax_type]], dtype=np.int8)
+    assert index.find_positions(codes, taxes, np.array([math.nan])).tolist() == [NO_RULE]
+    assert index.find_positions(codes[:0], taxes[:0], np.array([])).tolist() == []
+
+
+def test_memo_evicts_the_least_recently_used_result():
+    memo = TaxResultMemo(maxsize=2)
+    memo.get_or_compute("a", lambda: 1)
+    memo.get_or_compute("b", lambda: 2)
+    memo.get_or_compute("a", lambda: 3)  # hit: "a" becomes the most recent
+    memo.get_or_compute("c", lambda: 4)
+    assert memo.get_or_compute("a", lambda: 5) == 1
+    assert memo.get_or_compute("b", lambda: 6) == 6
+    assert memo.metrics() == {"entries": 2, "max_entries": 2, "hits": 2, "misses": 4}
+
+
+def _month():
+    return RevenueData(month="2024-01", revenue=60000, expenses=20000, business_type=BusinessType.RETAIL,
+                       tax_type=TaxType.PRODUCT_TAX)
+
+
+def _activate(agent, db, tax_rules, benchmarks=None, version=None):
+    benchmarks = benchmarks or agent.competitor_benchmarks
+    if version is None:
+        version = db.save_rule_set(tax_rules, benchmarks)
+    db.activate_rule_set(version)
+    agent.apply_rule_set(version, tax_rules, benchmarks)
+    return version
+
+
+def test_memo_is_invalidated_by_a_tax_rule_change(db):
+    agent = LiveFinancialAgent(1, db)
+    month = _month()
+    original = agent._analyze_tax_impact(month)
+    assert agent._analyze_tax_impact(month) is original
+    original_rules, original_version = list(agent.tax_rules), agent.tax_rules_version
+
+    cheaper = [rule.model_copy(update={"tax_rate": rule.tax_rate / 2}) for rule in original_rules]
+    cheaper_version = _activate(agent, db, cheaper)
+    assert agent.tax_rules_version == cheaper_version
+    halved = agent._analyze_tax_impact(month)
+    assert halved.title != original.title
+
+    # Reactivating the original version reuses what was computed under it
+    _activate(agent, db, original_rules, version=original_version)
+    assert agent.tax_rules_version == original_version
+    assert agent._analyze_tax_impact(month) is original
+    agent.insight_writer.close()
+
+
+def test_benchmark_change_keeps_memoised_tax_results(db):
+    agent = LiveFinancialAgent(1, db)
+    month = _month()
+    original = agent._analyze_tax_impact(month)
+    tax_rules_version = agent.tax_rules_version
+
+    benchmarks = [b.model_copy(update={"avg_tax_rate": 0.5}) for b in agent.competitor_benchmarks]
+    _activate(agent, db, list(agent.tax_rules), benchmarks)
+    assert agent.rule_version != tax_rules_version
+    assert agent.tax_rules_version == tax_rules_version
+    assert agent._analyze_tax_impact(month) is original
+    agent.insight_writer.close()
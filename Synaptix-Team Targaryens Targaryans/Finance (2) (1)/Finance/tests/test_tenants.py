@@ -0,0 +1,93 @@
+import gc
+import threading
+import pytest
+from models import RevenueData, BusinessType, TaxType
+from tenants import TenantRegistry
+
+
+def _record(month, revenue=1000):
+    return RevenueData(month=month, revenue=revenue, expenses=400, business_type=BusinessType.RETAIL,
+                       tax_type=TaxType.PRODUCT_TAX)
+
+
+@pytest.fixture
+def tenants(db):
+    # Room for two idle tenants
+    probe = TenantRegistry(db)
+    agent_bytes = probe.get(99).memory_bytes()
+    probe.insight_writer.close()
+    tenants = TenantRegistry(db, memory_budget=int(agent_bytes * 2.5))
+    yield tenants
+    tenants.insight_writer.close()
+
+
+def test_tenants_only_see_their_own_data(tenants):
+    tenants.get(1).ingest_batch([_record("2024-01")], source_file="upload.csv")
+    tenants.get(2).ingest_batch([_record("2024-01", 5000), _record("2024-02")], source_file="upload.csv")
+    assert [r.revenue for r in tenants.get(1).revenue_memory] == [1000]
+    assert tenants.get(2).get_financial_summary()["total_revenue"] == 6000
+    assert len(tenants.db.for_tenant(1).get_all_revenue_data()) == 1
+
+
+def test_least_recently_used_tenant_is_evicted(tenants):
+    tenants.get(1)
+    tenants.get(2)
+    tenants.get(1)
+    tenants.get(3)  # over budget: tenant 2 is the idlest
+    assert sorted(agent.tenant_id for agent in tenants.agents()) == [1, 3]
+    metrics = tenants.metrics()
+    assert (metrics["tenants_loaded"], metrics["loads"], metrics["evictions"], metrics["hits"]) == (2, 3, 1, 1)
+    assert metrics["memory_bytes"] <= metrics["memory_budget_bytes"]
+
+
+def test_the_current_tenant_stays_even_over_budget(tenants):
+    tenants.memory_budget = 1
+    agent = tenants.get(1)
+    tenants.get(2)
+    assert tenants.agents() == [tenants.loaded(2)]
+    assert agent not in tenants.agents()
+
+
+def test_eviction_hands_back_agents_still_in_use(tenants):
+    busy = tenants.get(1)
+    tenants.get(2)
+    tenants.get(3)
+    tenants.get(4)
+    assert busy not in tenants.agents()
+
+    # A request still holding the agent writes; the next request must see it
+    busy.ingest_batch([_record("2024-01")], source_file="upload.csv")
+    loads = tenants.loads
+    assert tenants.get(1) is busy
+    assert tenants.loads == loads
+    assert len(busy.revenue_memory) == 1
+
+
+def test_evicted_agents_are_reloaded_from_the_database(tenants):
+    tenants.get(1).ingest_batch([_record("2024-01"), _record("2024-02")], source_file="upload.csv")
+    for tenant_id in (2, 3, 4):
+        tenants.get(tenant_id)
+    gc.collect()  # nothing holds tenant 1's agent any more
+    assert tenants.loaded(1) is None
+
+    reloaded = tenants.get(1)
+    assert [r.month for r in reloaded.revenue_memory] == ["2024-01", "2024-02"]
+    assert reloaded.get_financial_summary()["total_revenue"] == 2000
+
+
+def test_concurrent_requests_load_a_tenant_once(tenants):
+    barrier = threading.Barrier(8)
+    agents = []
+
+    def request():
+        barrier.wait()
+        agents.append(tenants.get(1))
+
+    threads = [threading.Thread(target=request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    assert len(agents) == 8
+    assert all(agent is agents[0] for agent in agents)
+    assert tenants.loads == 1
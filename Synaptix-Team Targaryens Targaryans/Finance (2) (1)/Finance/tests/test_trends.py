@@ -0,0 +1,191 @@
+import random
+import statistics
+import pytest
+from financial_agent import LiveFinancialAgent
+from models import RevenueData, BusinessType, TaxType
+from month_index import FIRST_MONTH, LAST_MONTH, MonthIndex, parse_month_range
+from revenue_store import RevenueStore, month_ordinal
+from trends import RollingAnalytics, month_label
+
+
+def _random_records(count, seed, years=(2021, 2024)):
+    rng = random.Random(seed)
+    return [
+        RevenueData(month=f"{rng.randint(*years)}-{rng.randint(1, 12):02d}", revenue=round(rng.uniform(1000, 9000), 2),
+                    expenses=round(rng.uniform(500, 9500), 2), business_type=rng.choice(list(BusinessType)),
+                    tax_type=rng.choice(list(TaxType)))
+        for _ in range(count)
+    ]
+
+
+def _months_by_scan(records, business_type=None):
+    """{month ordinal: positions}, oldest month first, from a full scan"""
+    months = {}
+    for position, record in enumerate(records):
+        if business_type is None or record.business_type == business_type:
+            months.setdefault(month_ordinal(record.month), []).append(position)
+    return [(ordinal, months[ordinal]) for ordinal in sorted(months)]
+
+
+def test_month_index_built_out_of_order_matches_a_rebuild():
+    records = _random_records(400, 1)
+    store = RevenueStore(records)
+    index = MonthIndex()
+    for position, record in enumerate(records):
+        index.add(record, position)
+    rebuilt = MonthIndex(store)
+
+    for business_type in [None, *BusinessType]:
+        expected = _months_by_scan(records, business_type)
+        assert index.last(len(expected) + 5, business_type) == expected
+        assert rebuilt.last(len(expected) + 5, business_type) == expected
+        assert index.last(3, business_type) == expected[-3:]
+    assert len(index) == len(rebuilt) == 400
+
+
+def test_month_index_ranges_and_bounds():
+    records = _random_records(200, 2)
+    index = MonthIndex(RevenueStore(records))
+    expected = _months_by_scan(records)
+
+    start, stop = parse_month_range("2022-03..2023-06")
+    assert index.range(start, stop) == [(m, rows) for m, rows in expected if start <= m <= stop]
+    assert index.range(*parse_month_range("2023-11..")) == [(m, rows) for m, rows in expected
+                                                           if m >= month_ordinal("2023-11")]
+    upto = month_ordinal("2022-08")
+    assert index.last(4, upto=upto) == [(m, rows) for m, rows in expected if m <= upto][-4:]
+    assert index.last(0) == []
+
+    assert index.latest_position() == expected[-1][1][-1]
+    assert index.first_position() == expected[0][1][0]
+
+
+def test_months_that_are_not_yyyy_mm_are_not_indexed():
+    record = RevenueData(month="March", revenue=1, expenses=1, business_type=BusinessType.RETAIL,
+                         tax_type=TaxType.PRODUCT_TAX)
+    index = MonthIndex(RevenueStore([record]))
+    index.add(record, 1)
+    assert len(index) == 0
+    assert index.latest_position() is None
+
+
+@pytest.mark.parametrize("text, bounds", [
+    ("2024-01..2024-06", (month_ordinal("2024-01"), month_ordinal("2024-06"))),
+    ("..2024-06", (FIRST_MONTH, month_ordinal("2024-06"))),
+    ("2024-01..", (month_ordinal("2024-01"), LAST_MONTH)),
+    ("2024-05", (month_ordinal("2024-05"), month_ordinal("2024-05"))),
+])
+def test_month_ranges_are_parsed(text, bounds):
+    assert parse_month_range(text) == bounds
+
+
+@pytest.mark.parametrize("text", ["2024-13..2024-14", "2024-06..2024-01", "last year"])
+def test_bad_month_ranges_are_rejected(text):
+    with pytest.raises(ValueError):
+        parse_month_range(text)
+
+
+def _margin(revenue, expenses):
+    return (revenue - expenses) / revenue if revenue else 0.0
+
+
+def _trends_by_scan(records, windows):
+    """What RollingAnalytics.summary reports, recomputed from the records"""
+    totals = {}
+    for record in records:
+        month = totals.setdefault(month_ordinal(record.month), [0.0, 0.0])
+        month[0] += record.revenue
+        month[1] += record.expenses
+    months = sorted(totals)
+    latest = months[-1]
+    revenue, expenses = totals[latest]
+
+    def growth(ordinal):
+        previous = totals.get(ordinal, [0.0])[0]
+        return (revenue - previous) / abs(previous) * 100 if previous else None
+
+    result = {}
+    for size in windows:
+        def window(end):
+            return months[max(0, end - size + 1):end + 1]
+
+        last = window(len(months) - 1)
+        margins = [_margin(*totals[m]) for m in last]
+        result[str(size)] = {
+            "window": size,
+            "from_month": month_label(last[0]),
+            "to_month": month_label(latest),
+            "months": len(last),
+            "revenue_avg": statistics.fmean(totals[m][0] for m in last),
+            "revenue_min": min(totals[m][0] for m in last),
+            "revenue_max": max(totals[m][0] for m in last),
+            "expenses_avg": statistics.fmean(totals[m][1] for m in last),
+            "margin_avg": statistics.fmean(margins) * 100,
+            "margin_volatility": statistics.pstdev(margins) * 100,
+            "moving_average": [
+                {"month": month_label(months[end]),
+                 "revenue_avg": statistics.fmean(totals[m][0] for m in window(end)),
+                 "expenses_avg": statistics.fmean(totals[m][1] for m in window(end))}
+                for end in range(max(0, len(months) - 121), len(months))
+            ]
+        }
+    return {
+        "latest_month": month_label(latest),
+        "months_tracked": len(months),
+        "revenue": revenue,
+        "expenses": expenses,
+        "mom_growth": growth(latest - 1),
+        "yoy_growth": growth(latest - 12),
+        "windows": result
+    }
+
+
+def _assert_trends_match_scan(trends, records, windows):
+    summary = trends.summary(windows)
+    expected = _trends_by_scan(records, windows)
+    for key in ("latest_month", "months_tracked", "revenue", "expenses", "mom_growth", "yoy_growth"):
+        assert summary[key] == pytest.approx(expected[key])
+    assert summary["windows"].keys() == expected["windows"].keys()
+    for size, window in expected["windows"].items():
+        actual = summary["windows"][size]
+        assert actual["moving_average"] == [pytest.approx(point) for point in window.pop("moving_average")]
+        assert {k: v for k, v in actual.items() if k != "moving_average"} == pytest.approx(window)
+
+
+def test_rolling_windows_match_a_full_scan_as_records_arrive():
+    records = _random_records(300, 3)
+    trends = RollingAnalytics()
+    for count, record in enumerate(records, 1):
+        trends.add(record)
+        if count % 50 == 0:
+            # Arrival order is random, so earlier months keep changing too
+            _assert_trends_match_scan(trends, records[:count], (1, 3, 12))
+
+
+def test_new_window_sizes_and_corrections_match_a_full_scan():
+    records = _random_records(120, 4)
+    trends = RollingAnalytics(RevenueStore(records[:100]))
+    for record in records[100:]:
+        trends.add(record)
+    _assert_trends_match_scan(trends, records, (5, 24))
+
+    corrected = records[7].model_copy(update={"revenue": records[7].revenue + 5000})
+    trends.replace(records[7], corrected)
+    records[7] = corrected
+    _assert_trends_match_scan(trends, records, (3, 5))
+
+
+def test_window_sizes_are_bounded():
+    with pytest.raises(ValueError):
+        RollingAnalytics().summary([0])
+    with pytest.raises(ValueError):
+        RollingAnalytics().summary([121])
+
+
+def test_agent_trends_follow_ingest_and_clear(db):
+    agent = LiveFinancialAgent(1, db)
+    agent.ingest_batch(_random_records(150, 5), source_file="upload.csv")
+    _assert_trends_match_scan(agent.trends, list(agent.revenue_memory), (3, 6, 12))
+    agent.clear_loss_data()
+    _assert_trends_match_scan(agent.trends, list(agent.revenue_memory), (3, 6, 12))
+    agent.insight_writer.close()
@@ -0,0 +1,49 @@
+import io
+import pandas as pd
+from dataset_parser import ingest_stream
+from financial_agent import LiveFinancialAgent
+from models import RevenueData, BusinessType, TaxType
+from validation import validate_frame, records_from_frame
+
+UPLOAD = """month,revenue,expenses,business_type,tax_type,service_revenue,product_revenue
+2024-01,1000,400, Retail ,product_tax,,1000
+2024-13,1000,400,retail,product_tax,,
+2024-02,abc,400,retail,product_tax,,
+2024-03,2500.5,900,SERVICES,Service_Tax,2500.5,
+2024-04,700,100,farming,product_tax,,
+"""
+
+
+def test_invalid_rows_are_reported_and_the_rest_kept():
+    valid, errors = validate_frame(pd.read_csv(io.StringIO(UPLOAD)))
+    assert errors == [
+        {"row": 2, "error": "month must be in YYYY-MM format"},
+        {"row": 3, "error": "revenue must be a number"},
+        {"row": 5, "error": "business_type must be one of retail, services, manufacturing, technology"},
+    ]
+    assert valid["month"].tolist() == ["2024-01", "2024-03"]
+
+
+def test_validated_rows_match_models_built_one_by_one():
+    valid, _ = validate_frame(pd.read_csv(io.StringIO(UPLOAD)))
+    expected = [
+        RevenueData(month="2024-01", revenue=1000, expenses=400, business_type=BusinessType.RETAIL,
+                    tax_type=TaxType.PRODUCT_TAX, product_revenue=1000),
+        RevenueData(month="2024-03", revenue=2500.5, expenses=900, business_type=BusinessType.SERVICES,
+                    tax_type=TaxType.SERVICE_TAX, service_revenue=2500.5),
+    ]
+    rows = records_from_frame(valid)
+    assert [row._asdict() for row in rows] == [record.model_dump(exclude={"timestamp"}) for record in expected]
+
+
+def test_uploaded_rows_reach_memory_and_the_database(db):
+    agent = LiveFinancialAgent(1, db)
+    result = ingest_stream(agent, io.BytesIO(UPLOAD.encode()), "upload.csv")
+    assert (result["rows_accepted"], result["rows_rejected"]) == (2, 3)
+
+    in_memory = [record.model_dump(exclude={"timestamp"}) for record in agent.revenue_memory]
+    stored = [record.model_dump(exclude={"timestamp"}) for record in db.for_tenant(1).get_all_revenue_data()]
+    assert in_memory == stored
+    assert [record["business_type"] for record in stored] == [BusinessType.RETAIL, BusinessType.SERVICES]
+    assert agent.aggregates.total_revenue == 3500.5
+    agent.insight_writer.close()
@@ -0,0 +1,231 @@
+import math
+import threading
+from collections import deque
+from typing import Dict, Iterable, Optional
+import numpy as np
+from models import RevenueData
+from revenue_store import RevenueStore, month_ordinal, UNKNOWN_MONTH
+
+DEFAULT_TREND_WINDOWS = (3, 6, 12)
+MAX_TREND_WINDOW = 120  # months
+
+
+def month_label(ordinal: int) -> str:
+    """YYYY-MM for a month ordinal (the inverse of month_ordinal)"""
+    return f"{ordinal // 12:04d}-{ordinal % 12 + 1:02d}"
+
+
+def _growth(current: float, previous: Optional[float]) -> Optional[float]:
+    if not previous:
+        return None
+    return (current - previous) / abs(previous) * 100
+
+
+def _margin(revenue: float, expenses: float) -> float:
+    return (revenue - expenses) / revenue if revenue else 0.0
+
+
+class SlidingWindow:
+    """The last `size` values of a stream, with O(1) amortised push.
+
+    Sum and sum of squares are kept running; min and max come from
+    monotonic deques of (position, value), so none of them rescans the window.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._values = deque()
+        self._max = deque()  # values decreasing from the left
+        self._min = deque()  # values increasing from the left
+        self._pushed = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def __len__(self):
+        return len(self._values)
+
+    def push(self, value: float):
+        if not self.size:
+            return
+        position = self._pushed
+        self._pushed += 1
+        self._values.append(value)
+        self.total += value
+        self.total_sq += value * value
+        if len(self._values) > self.size:
+            old = self._values.popleft()
+            self.total -= old
+            self.total_sq -= old * old
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((position, value))
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((position, value))
+        expired = position - self.size
+        while self._max[0][0] <= expired:
+            self._max.popleft()
+        while self._min[0][0] <= expired:
+            self._min.popleft()
+
+    def stats_with(self, value: float) -> Dict:
+        """Count, mean, min, max and standard deviation of the window plus one more value"""
+        count = len(self._values) + 1
+        total = self.total + value
+        mean = total / count
+        variance = max(0.0, (self.total_sq + value * value) / count - mean * mean)
+        return {
+            "count": count,
+            "mean": mean,
+            "min": min(self._min[0][1], value) if self._min else value,
+            "max": max(self._max[0][1], value) if self._max else value,
+            "std": math.sqrt(variance)
+        }
+
+
+class _MonthWindow:
+    """Rolling statistics over `size` months.
+
+    Holds the size - 1 closed months before the latest one; the latest month
+    is still receiving records, so it is combined in when read. Each month's
+    moving average is recorded as the month closes.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.revenue = SlidingWindow(size - 1)
+        self.expenses = SlidingWindow(size - 1)
+        self.margin = SlidingWindow(size - 1)
+        self.first_month = deque(maxlen=max(size - 1, 1))
+        self.series = deque(maxlen=MAX_TREND_WINDOW)  # moving average of the most recent closed months
+
+    def stats(self, ordinal: int, revenue: float, expenses: float) -> Dict:
+        revenue_stats = self.revenue.stats_with(revenue)
+        margin_stats = self.margin.stats_with(_margin(revenue, expenses))
+        start = self.first_month[0] if self.size > 1 and self.first_month else ordinal
+        return {
+            "window": self.size,
+            "from_month": month_label(start),
+            "to_month": month_label(ordinal),
+            "months": revenue_stats["count"],
+            "revenue_avg": revenue_stats["mean"],
+            "revenue_min": revenue_stats["min"],
+            "revenue_max": revenue_stats["max"],
+            "expenses_avg": self.expenses.stats_with(expenses)["mean"],
+            "margin_avg": margin_stats["mean"] * 100,
+            "margin_volatility": margin_stats["std"] * 100
+        }
+
+    def close(self, ordinal: int, revenue: float, expenses: float):
+        stats = self.stats(ordinal, revenue, expenses)
+        self.series.append({
+            "month": stats["to_month"], "revenue_avg": stats["revenue_avg"], "expenses_avg": stats["expenses_avg"]
+        })
+        self.revenue.push(revenue)
+        self.expenses.push(expenses)
+        self.margin.push(_margin(revenue, expenses))
+        if self.size > 1:
+            self.first_month.append(ordinal)
+
+
+class RollingAnalytics:
+    """Monthly totals and rolling windows over them, kept up to date as records arrive.
+
+    Records are summed per calendar month. A record for the latest month or
+    a later one costs O(1) per window; one for an earlier month marks the
+    windows stale, and they are replayed from the monthly totals (not the
+    record history) on the next read.
+    """
+
+    def __init__(self, store: RevenueStore = None, windows: Iterable[int] = DEFAULT_TREND_WINDOWS):
+        self._lock = threading.Lock()  # read from request threads while ingest adds
+        self._sizes = sorted(set(windows))
+        self.rebuild(store if store is not None else RevenueStore())
+
+    def rebuild(self, store: RevenueStore):
+        """Recompute the monthly totals from the stored columns, e.g. after records were removed"""
+        count = len(store)
+        months = store.month[:count]
+        known = months != UNKNOWN_MONTH
+        ordinals, inverse = np.unique(months[known], return_inverse=True)
+        revenue = np.bincount(inverse, weights=store.revenue[:count][known], minlength=len(ordinals))
+        expenses = np.bincount(inverse, weights=store.expenses[:count][known], minlength=len(ordinals))
+        with self._lock:
+            self._monthly = {
+                ordinal: [r, e] for ordinal, r, e in zip(ordinals.tolist(), revenue.tolist(), expenses.tolist())
+            }
+            self._replay()
+
+    def _replay(self):
+        self._windows = {size: _MonthWindow(size) for size in self._sizes}
+        months = sorted(self._monthly)
+        self._latest = months[-1] if months else None
+        for ordinal in months[:-1]:
+            self._close(ordinal)
+        self._stale = False
+
+    def _close(self, ordinal: int):
+        revenue, expenses = self._monthly[ordinal]
+        for window in self._windows.values():
+            window.close(ordinal, revenue, expenses)
+
+    def add(self, record: RevenueData, sign=1):
+        ordinal = month_ordinal(record.month)
+        if ordinal == UNKNOWN_MONTH:
+            return
+        with self._lock:
+            totals = self._monthly.setdefault(ordinal, [0.0, 0.0])
+            totals[0] += sign * record.revenue
+            totals[1] += sign * record.expenses
+            if self._stale:
+                return
+            if self._latest is None or ordinal > self._latest:
+                if self._latest is not None:
+                    self._close(self._latest)
+                self._latest = ordinal
+            elif ordinal < self._latest:
+                self._stale = True  # a closed month changed
+
+    def replace(self, old: RevenueData, new: RevenueData):
+        """A stored month was corrected"""
+        self.add(old, sign=-1)
+        self.add(new)
+
+    def summary(self, windows: Iterable[int] = DEFAULT_TREND_WINDOWS) -> Dict:
+        """Latest value of each requested window, its moving-average series, and MoM/YoY growth"""
+        windows = sorted(set(windows))
+        for size in windows:
+            if not 1 <= size <= MAX_TREND_WINDOW:
+                raise ValueError(f"Window must be between 1 and {MAX_TREND_WINDOW} months")
+        with self._lock:
+            missing = [size for size in windows if size not in self._windows]
+            if missing:
+                # First request for a window size: keep it up to date from now on
+                self._sizes = sorted(set(self._sizes) | set(missing))
+                self._stale = True
+            if self._stale:
+                self._replay()
+            if self._latest is None:
+                return {"latest_month": None, "months_tracked": 0, "windows": {}}
+            latest = self._latest
+            revenue, expenses = self._monthly[latest]
+            previous = self._monthly.get(latest - 1)
+            year_ago = self._monthly.get(latest - 12)
+            result = {}
+            for size in windows:
+                window = self._windows[size]
+                stats = window.stats(latest, revenue, expenses)
+                series = list(window.series) + [
+                    {"month": month_label(latest), "revenue_avg": stats["revenue_avg"],
+                     "expenses_avg": stats["expenses_avg"]}
+                ]
+                result[str(size)] = {**stats, "moving_average": series}
+            return {
+                "latest_month": month_label(latest),
+                "months_tracked": len(self._monthly),
+                "revenue": revenue,
+                "expenses": expenses,
+                "mom_growth": _growth(revenue, previous[0] if previous else None),
+                "yoy_growth": _growth(revenue, year_ago[0] if year_ago else None),
+                "windows": result
+            }
@@ -0,0 +1,154 @@
+import re
+import numpy as np
+import pandas as pd
+from typing import Dict, List, NamedTuple, Tuple
+from models import RevenueData, BusinessType, TaxType
+
+REQUIRED_COLUMNS = ["month", "revenue", "expenses", "business_type", "tax_type"]
+OPTIONAL_COLUMNS = ["service_revenue", "product_revenue"]
+
+MONTH_PATTERN = re.compile(r"\d{4}-(0[1-9]|1[0-2])")
+BUSINESS_TYPES = {b.value: b for b in BusinessType}
+TAX_TYPES = {t.value: t for t in TaxType}
+
+
+def _coerce_labels(column: pd.Series, normalise) -> Tuple[np.ndarray, np.ndarray]:
+    """Normalise a string column by checking each distinct value once.
+
+    `normalise` maps a raw value to its clean form or None when invalid.
+    Returns (values, invalid mask).
+    """
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        codes, uniques = column.cat.codes.to_numpy(), column.cat.categories
+    else:
+        codes, uniques = pd.factorize(column, use_na_sentinel=True)
+    cleaned = np.array([normalise(u) for u in uniques] + [None], dtype=object)
+    values = cleaned[codes]  # code -1 (missing) picks the trailing None
+    return values, values == None  # noqa: E711
+
+
+def _normalise_month(value):
+    text = str(value).strip()
+    return text if MONTH_PATTERN.fullmatch(text) else None
+
+
+def _normalise_choice(choices):
+    def normalise(value):
+        text = str(value).strip().lower()
+        return text if text in choices else None
+    return normalise
+
+
+def _coerce_amount(column: pd.Series, required: bool) -> Tuple[np.ndarray, np.ndarray]:
+    """Convert a column to float64; returns (values, invalid mask)"""
+    if pd.api.types.is_numeric_dtype(column):
+        values = column.to_numpy(dtype=np.float64, na_value=np.nan)
+        blank = np.isnan(values)
+    else:
+        blank = column.isna().to_numpy() | (column.astype(str).str.strip() == "").to_numpy()
+        values = pd.to_numeric(column.where(~blank), errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    if required:
+        return values, ~np.isfinite(values)
+    return np.where(blank, 0.0, values), ~blank & ~np.isfinite(values)
+
+
+def validate_frame(frame: pd.DataFrame, first_row: int = 1) -> Tuple[pd.DataFrame, List[Dict]]:
+    """Validate and coerce a batch of uploaded rows column by column.
+
+    Returns a frame holding only the valid rows (clean month, float amounts,
+    lower-case enum values) and a per-row error report for the rest.
+    `first_row` is the 1-based row number of the first record in `frame`.
+    """
+    count = len(frame)
+    messages = np.full(count, None, dtype=object)
+
+    def flag(invalid, message):
+        # Keep only the first problem reported for each row
+        messages[invalid & (messages == None)] = message  # noqa: E711
+
+    columns = {}
+    for column in REQUIRED_COLUMNS + OPTIONAL_COLUMNS:
+        if column in frame.columns:
+            columns[column] = frame[column]
+        else:
+            if column in REQUIRED_COLUMNS:
+                flag(np.ones(count, dtype=bool), f"missing field '{column}'")
+            columns[column] = pd.Series(np.full(count, np.nan))
+
+    months, invalid = _coerce_labels(columns["month"], _normalise_month)
+    flag(invalid, "month must be in YYYY-MM format")
+    revenue, invalid = _coerce_amount(columns["revenue"], required=True)
+    flag(invalid, "revenue must be a number")
+    expenses, invalid = _coerce_amount(columns["expenses"], required=True)
+    flag(invalid, "expenses must be a number")
+    business_types, invalid = _coerce_labels(columns["business_type"], _normalise_choice(BUSINESS_TYPES))
+    flag(invalid, f"business_type must be one of {', '.join(BUSINESS_TYPES)}")
+    tax_types, invalid = _coerce_labels(columns["tax_type"], _normalise_choice(TAX_TYPES))
+    flag(invalid, f"tax_type must be one of {', '.join(TAX_TYPES)}")
+    service_revenue, invalid = _coerce_amount(columns["service_revenue"], required=False)
+    flag(invalid, "service_revenue must be a number")
+    product_revenue, invalid = _coerce_amount(columns["product_revenue"], required=False)
+    flag(invalid, "product_revenue must be a number")
+
+    bad = messages != None  # noqa: E711
+    rows = np.flatnonzero(bad) + first_row
+    errors = [{"row": row, "error": message} for row, message in zip(rows.tolist(), messages[bad].tolist())]
+
+    good = ~bad
+    valid = pd.DataFrame({
+        "month": months[good],
+        "revenue": revenue[good],
+        "expenses": expenses[good],
+        "business_type": business_types[good],
+        "tax_type": tax_types[good],
+        "service_revenue": service_revenue[good],
+        "product_revenue": product_revenue[good],
+    })
+    return valid, errors
+
+
+def validate_records(raw_records: List, first_row: int = 1) -> Tuple[pd.DataFrame, List[Dict]]:
+    """Validate a list of raw (dict) records, e.g. JSON array elements"""
+    rows = []
+    positions = []
+    not_objects = []
+    for offset, record in enumerate(raw_records):
+        if isinstance(record, dict):
+            rows.append(record)
+            positions.append(first_row + offset)
+        else:
+            not_objects.append({"row": first_row + offset, "error": "Record must be an object"})
+
+    valid, errors = validate_frame(pd.DataFrame.from_records(rows) if rows else pd.DataFrame(), first_row=0)
+    # Map frame positions back to the original row numbers
+    for error in errors:
+        error["row"] = positions[error["row"]]
+    return valid, sorted(errors + not_objects, key=lambda e: e["row"])
+
+
+class RevenueRow(NamedTuple):
+    """A validated upload row, read by the agent and database like the RevenueData it stands in for"""
+    month: str
+    revenue: float
+    expenses: float
+    business_type: BusinessType
+    tax_type: TaxType
+    service_revenue: float
+    product_revenue: float
+
+
+def records_from_frame(frame: pd.DataFrame) -> List[RevenueRow]:
+    """Hand validated rows to the agent's memory and the database as plain tuples.
+
+    validate_frame already checked every column, so building (and validating
+    again) a RevenueData model per row would cost more than the validation.
+    """
+    return list(map(RevenueRow._make, zip(
+        frame["month"].tolist(),
+        frame["revenue"].tolist(),
+        frame["expenses"].tolist(),
+        frame["business_type"].map(BUSINESS_TYPES).tolist(),
+        frame["tax_type"].map(TAX_TYPES).tolist(),
+        frame["service_revenue"].tolist(),
+        frame["product_revenue"].tolist()
+    )))